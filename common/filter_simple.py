@@ -1,4 +1,5 @@
-import numpy as np
+from bisect import bisect_left, insort
+from collections import deque
 
 class FirstOrderFilter:
   # first order filter
@@ -20,26 +21,65 @@ class FirstOrderFilter:
     return self.x
 
 class StreamingMovingAverage:
+  """Mean or median of the last window_size values
+
+  The values are kept in a ring buffer with a running sum. For the median they're also kept
+  sorted, inserting and removing one value per update, once process() is first asked for it.
+  Results are the same floats as summing the window and taking np.median of it.
+  """
   def __init__(self, window_size):
     self.window_size = window_size
-    self.values = []
+    self.values = deque()
     self.sum = 0
     self.result = 0
+    # NaNs don't sort, they're counted instead. Any in the window make the median NaN, like np.median
+    self.sorted_values = None
+    self.nans = 0
 
   def set(self, value):
-    #for i in range(len(self.values)):
-    #  self.values[i] = value
-    #self.sum = value * len(self.values)
     self.values.clear()
     self.values.append(value)
     self.sum = value
     self.result = value
+    self.sorted_values = None
     return value
 
   def process(self, value, median = False):
     self.values.append(value)
     self.sum += value
+    if self.sorted_values is not None:
+      self._insert(value)
     if len(self.values) > self.window_size:
-      self.sum -= self.values.pop(0)
-    self.result = float(np.median(self.values)) if median else float(self.sum) / len(self.values)
+      removed = self.values.popleft()
+      self.sum -= removed
+      if self.sorted_values is not None:
+        self._remove(removed)
+    self.result = self._median() if median else float(self.sum) / len(self.values)
     return self.result
+
+  def _insert(self, value):
+    if value != value:
+      self.nans += 1
+    else:
+      insort(self.sorted_values, value)
+
+  def _remove(self, value):
+    if value != value:
+      self.nans -= 1
+    else:
+      del self.sorted_values[bisect_left(self.sorted_values, value)]
+
+  def _median(self):
+    if self.sorted_values is None:
+      self.sorted_values = []
+      self.nans = 0
+      for v in self.values:
+        self._insert(v)
+
+    if self.nans:
+      return float('nan')
+    n = len(self.sorted_values)
+    if n % 2:
+      return float(self.sorted_values[n // 2])
+    # np.median averages the middle two as float64
+    return (float(self.sorted_values[n // 2 - 1]) + float(self.sorted_values[n // 2])) / 2
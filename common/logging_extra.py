@@ -44,7 +44,9 @@ class SwagFormatter(logging.Formatter):
       except (ValueError, TypeError):
         record_dict['msg'] = [record.msg]+record.args
 
-    record_dict['ctx'] = self.swaglogger.get_ctx()
+    # captured when the record was queued to be formatted on another thread
+    ctx = getattr(record, 'swaglog_ctx', None)
+    record_dict['ctx'] = self.swaglogger.get_ctx() if ctx is None else ctx
 
     if record.exc_info:
       record_dict['exc_info'] = self.formatException(record.exc_info)
@@ -1,3 +1,8 @@
+from bisect import bisect_left
+
+import numpy as np
+
+
 def clip(x, lo, hi):
   return max(lo, min(hi, x))
 
@@ -17,3 +22,53 @@ def interp(x, xp, fp):
 
 def mean(x):
   return sum(x) / len(x)
+
+
+class InterpTable:
+  """interp() with constant breakpoints, built once and called every cycle
+
+  The breakpoint is found by bisection and the segment differences are precomputed. They're
+  kept as separate rises and runs, not divided into slopes, so every result is the same float
+  interp() returns, clipping at the ends included.
+  """
+  def __init__(self, xp, fp):
+    if len(xp) != len(fp) or len(xp) == 0:
+      raise ValueError("xp and fp must be non-empty and the same length")
+    if any(b < a for a, b in zip(xp, xp[1:], strict=False)):
+      raise ValueError("xp must be increasing")
+
+    self.xp = list(xp)
+    self.fp = list(fp)
+    self.n = len(self.xp)
+    self.first, self.last = self.fp[0], self.fp[-1]
+    # for segment i, between breakpoints i-1 and i
+    self.segments = [None] + [(self.xp[i - 1], self.fp[i] - self.fp[i - 1], self.xp[i] - self.xp[i - 1], self.fp[i - 1]) for i in range(1, self.n)]
+
+    self.xp_array = np.array(self.xp, dtype=np.float64)
+    self.fp_array = np.array(self.fp, dtype=np.float64)
+    self.rise_array = np.diff(self.fp_array, prepend=self.fp_array[0])
+    self.run_array = np.diff(self.xp_array, prepend=1.)
+
+  def get(self, xv):
+    # NaN compares false like in interp(), ending up in front
+    hi = bisect_left(self.xp, xv)
+    if hi == 0:
+      return self.first
+    if hi == self.n:
+      return self.last
+    x0, rise, run, f0 = self.segments[hi]
+    return (xv - x0) * rise / run + f0
+
+  def __call__(self, x):
+    return [self.get(v) for v in x] if hasattr(x, '__iter__') else self.get(x)
+
+  def batch(self, x):
+    """interp() over an array at once, as a float64 array"""
+    x = np.asarray(x, dtype=np.float64)
+    # searchsorted sorts NaN last, interp() returns fp[0] for it
+    hi = np.where(np.isnan(x), 0, np.searchsorted(self.xp_array, x, side='left'))
+    low = np.maximum(hi - 1, 0)
+    inner = np.minimum(hi, self.n - 1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+      out = (x - self.xp_array[low]) * self.rise_array[inner] / self.run_array[inner] + self.fp_array[low]
+    return np.where(hi == 0, self.fp_array[0], np.where(hi == self.n, self.fp_array[-1], out))
@@ -1,7 +1,9 @@
 import logging
 import os
+import threading
 import time
 import warnings
+from collections import deque
 from pathlib import Path
 from logging.handlers import BaseRotatingHandler
 
@@ -39,12 +41,10 @@ class SwaglogRotatingFileHandler(BaseRotatingHandler):
     return stream
 
   def get_existing_logfiles(self):
-    log_files = list()
+    # the directory can hold thousands of logs, check the name before the file type, which scandir already has
     base_dir = os.path.dirname(self.base_filename)
-    for fn in os.listdir(base_dir):
-      fp = os.path.join(base_dir, fn)
-      if fp.startswith(self.base_filename) and os.path.isfile(fp):
-        log_files.append(fp)
+    with os.scandir(base_dir) as it:
+      log_files = [e.path for e in it if e.path.startswith(self.base_filename) and e.is_file()]
     return sorted(log_files)
 
   def shouldRollover(self, record):
@@ -63,6 +63,19 @@ class SwaglogRotatingFileHandler(BaseRotatingHandler):
         if os.path.exists(to_delete): # just being safe, should always exist
           os.remove(to_delete)
 
+  def emit_batch(self, records):
+    """Writes records with one write and flush, checking for a rollover once"""
+    if not records:
+      return
+    with self.lock:
+      try:
+        if self.shouldRollover(records[0]):
+          self.doRollover()
+        self.stream.write("".join(self.format(record) + self.terminator for record in records))
+        self.flush()
+      except Exception:
+        self.handleError(records[-1])
+
 class UnixDomainSocketHandler(logging.Handler):
   def __init__(self, formatter):
     logging.Handler.__init__(self)
@@ -104,6 +117,110 @@ class UnixDomainSocketHandler(logging.Handler):
       pass
 
 
+class QueueLogHandler(logging.Handler):
+  """Hands records to a background thread that formats and emits them through handler
+
+  Logging from a hot loop only captures the log context and appends to a queue. Records
+  past max_queued are dropped and counted, and the count is logged once there's room again.
+  Records are emitted in batches, through handler.emit_batch if it has one.
+
+  Errors and exceptions are waited for: they're often the last thing a process logs before
+  it leaves through os._exit, which doesn't wait for the thread.
+  """
+  def __init__(self, handler: logging.Handler, swaglogger, max_queued: int = 1024, batch_size: int = 64):
+    logging.Handler.__init__(self)
+    self.handler = handler
+    self.swaglogger = swaglogger
+    self.max_queued = max_queued
+    self.batch_size = batch_size
+
+    self.queue: deque[logging.LogRecord] = deque()
+    self.wakeup = threading.Event()
+    self.busy = False
+    self.dropped = 0
+    self.reported_dropped = 0
+    self.pid = None
+    self.thread = None
+    self.closed = False
+
+  def start(self):
+    # the thread doesn't survive a fork, and the parent's records aren't ours to send
+    self.queue.clear()
+    self.wakeup = threading.Event()
+    self.busy = False
+    self.dropped = self.reported_dropped = 0
+    self.pid = os.getpid()
+    self.thread = threading.Thread(target=self.run, name="swaglog", daemon=True)
+    self.thread.start()
+
+  def emit(self, record):
+    if os.getpid() != self.pid:
+      self.start()
+
+    urgent = record.levelno >= logging.ERROR or record.exc_info is not None
+    if len(self.queue) >= self.max_queued and not urgent:
+      self.dropped += 1
+      return
+
+    # formatted on another thread, where the caller's log context isn't
+    record.swaglog_ctx = self.swaglogger.get_ctx()
+    self.queue.append(record)
+    if not self.wakeup.is_set():
+      self.wakeup.set()
+
+    if urgent and threading.current_thread() is not self.thread:
+      self.flush()
+
+  def run(self):
+    while not self.closed or self.queue:
+      self.wakeup.wait()
+      self.wakeup.clear()
+      self.busy = True
+      while self.queue:
+        batch = [self.queue.popleft() for _ in range(min(self.batch_size, len(self.queue)))]
+        if self.dropped != self.reported_dropped:
+          batch.append(self.dropped_record(batch[-1]))
+        self.emit_records(batch)
+      self.busy = False
+
+  def dropped_record(self, last_record):
+    dropped = self.dropped - self.reported_dropped
+    self.reported_dropped += dropped
+    record = logging.LogRecord(self.swaglogger.name, logging.WARNING, __file__, 0, "swaglog dropped %d records", (dropped,), None)
+    record.swaglog_ctx = last_record.swaglog_ctx
+    return record
+
+  def emit_records(self, records):
+    emit_batch = getattr(self.handler, 'emit_batch', None)
+    if emit_batch is not None:
+      try:
+        emit_batch(records)
+      except Exception:
+        self.handleError(records[-1])
+      return
+
+    for record in records:
+      try:
+        self.handler.handle(record)
+      except Exception:
+        # a record that fails to format mustn't take the thread down
+        self.handleError(record)
+
+  def flush(self, timeout=1.0):
+    """Waits up to timeout for the queued records to be emitted"""
+    if self.thread is not None and self.pid == os.getpid():
+      end = time.monotonic() + timeout
+      while (self.queue or self.busy) and time.monotonic() < end:
+        time.sleep(0.001)
+    self.handler.flush()
+
+  def close(self):
+    self.flush()
+    self.closed = True
+    self.wakeup.set()
+    logging.Handler.close(self)
+
+
 def add_file_handler(log):
   """
   Function to add the file log handler to swaglog.
@@ -131,5 +248,6 @@ elif print_level == 'warning':
 ipchandler = UnixDomainSocketHandler(SwagFormatter(log))
 
 log.addHandler(outhandler)
-# logs are sent through IPC before writing to disk to prevent disk I/O blocking
-log.addHandler(ipchandler)
+# logs are sent through IPC before writing to disk to prevent disk I/O blocking,
+# and formatted and sent from a background thread to keep it out of the caller's loop
+log.addHandler(QueueLogHandler(ipchandler, log))
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+import random
+import time
+
+from openpilot.common.filter_simple import StreamingMovingAverage
+from openpilot.common.tests.test_filter_simple import ListMovingAverage
+
+N = 100_000
+
+
+def per_update(cls, window_size, median):
+  f = cls(window_size)
+  t = time.perf_counter()
+  results = [f.process(v, median=median) for v in VALUES]
+  return (time.perf_counter() - t) / N, results
+
+
+if __name__ == "__main__":
+  random.seed(0)
+  VALUES = [random.uniform(0, 100) for _ in range(N)]
+  # the windows used in radard, long_mpc and the radar interfaces, and a long one
+  for window_size in (2, 4, 10, 15, 100):
+    for median in (False, True):
+      old_time, old = per_update(ListMovingAverage, window_size, median)
+      new_time, new = per_update(StreamingMovingAverage, window_size, median)
+      assert old == new
+      print(f"window {window_size:3d} {'median' if median else '  mean'}: list {old_time * 1e6:5.2f} us/update, ring buffer {new_time * 1e6:5.2f} us/update")
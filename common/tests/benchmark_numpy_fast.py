@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+import random
+import time
+
+import numpy as np
+
+from openpilot.common.numpy_fast import InterpTable, interp
+
+N = 200_000
+# speed tables like the planner's and a longer one like a tuning map
+TABLES = {
+  "4 points": ([0., 10.0, 25., 40.], [1.6, 1.2, 0.8, 0.6]),
+  "13 points": ([float(i * 3) for i in range(13)], [float(i % 5) for i in range(13)]),
+}
+
+
+def rate(fn, xs):
+  t = time.perf_counter()
+  for x in xs:
+    fn(x)
+  return len(xs) / (time.perf_counter() - t)
+
+
+if __name__ == "__main__":
+  random.seed(0)
+  for name, (xp, fp) in TABLES.items():
+    xs = [random.uniform(xp[0] - 5, xp[-1] + 5) for _ in range(N)]
+    table = InterpTable(xp, fp)
+    assert [table(x) for x in xs] == [interp(x, xp, fp) for x in xs]
+
+    results = {
+      "interp": rate(lambda x, xp=xp, fp=fp: interp(x, xp, fp), xs),
+      "np.interp": rate(lambda x, xp=xp, fp=fp: np.interp(x, xp, fp), xs[:N // 10]),
+      "InterpTable": rate(table, xs),
+    }
+    print(f"{name}, scalar:", ", ".join(f"{k} {v / 1e6:.2f} M calls/s" for k, v in results.items()))
+
+    array = np.array(xs)
+    t = time.perf_counter()
+    out = table.batch(array)
+    batch_time = time.perf_counter() - t
+    t = time.perf_counter()
+    expected = interp(xs, xp, fp)
+    list_time = time.perf_counter() - t
+    assert np.array_equal(out, expected)
+    print(f"{name}, {N} points: interp {list_time * 1e3:.1f} ms, InterpTable.batch {batch_time * 1e3:.1f} ms")
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+import numpy as np
+import zmq
+
+from openpilot.common.logging_extra import SwagFormatter, SwagLogger
+from openpilot.common.swaglog import QueueLogHandler, UnixDomainSocketHandler
+from openpilot.system.hardware.hw import Paths
+
+N = 20000
+BURST = 20
+
+
+def receive(sock, received, stop):
+  while not stop.is_set():
+    if sock.poll(100):
+      received.append(sock.recv())
+
+
+def measure(name, log, handler):
+  received = []
+  stop = threading.Event()
+  sock = zmq.Context.instance().socket(zmq.PULL)
+  sock.bind(Paths.swaglog_ipc())
+  thread = threading.Thread(target=receive, args=(sock, received, stop))
+  thread.start()
+
+  log.bind(daemon="benchmark")
+  times = np.empty(N)
+  for i in range(N):
+    t = time.perf_counter()
+    log.event("benchmark_event", i=i, value=i * 0.5, name="controlsd")
+    times[i] = time.perf_counter() - t
+    if i % BURST == 0:
+      # a 100 Hz loop logs a few records per iteration, not back to back
+      time.sleep(0.01)
+  handler.flush()
+  time.sleep(0.2)
+  stop.set()
+  thread.join()
+  sock.close()
+
+  p99 = np.percentile(times, 99)
+  print(f"{name:>6}: {times.mean() * 1e6:6.2f} us/call, p99 {p99 * 1e6:6.2f} us, max {times.max() * 1e6:8.2f} us, {len(received)}/{N} received")
+  return [json.loads(dat[1:])['msg'] for dat in received]
+
+
+if __name__ == "__main__":
+  os.environ["OPENPILOT_PREFIX"] = uuid.uuid4().hex[:8]
+
+  log = SwagLogger()
+  log.setLevel(logging.DEBUG)
+  sync_handler = UnixDomainSocketHandler(SwagFormatter(log))
+  log.addHandler(sync_handler)
+  sync = measure("sync", log, sync_handler)
+
+  log = SwagLogger()
+  log.setLevel(logging.DEBUG)
+  queue_handler = QueueLogHandler(UnixDomainSocketHandler(SwagFormatter(log)), log)
+  log.addHandler(queue_handler)
+  queued = measure("queue", log, queue_handler)
+  print(f"dropped by the queue: {queue_handler.dropped}")
+
+  # same records, in the same order
+  assert queued == sync
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import math
+import random
+import unittest
+
+import numpy as np
+
+from openpilot.common.filter_simple import StreamingMovingAverage
+
+
+class ListMovingAverage:
+  """StreamingMovingAverage as it was, with a list"""
+  def __init__(self, window_size):
+    self.window_size = window_size
+    self.values = []
+    self.sum = 0
+    self.result = 0
+
+  def set(self, value):
+    self.values.clear()
+    self.values.append(value)
+    self.sum = value
+    self.result = value
+    return value
+
+  def process(self, value, median = False):
+    self.values.append(value)
+    self.sum += value
+    if len(self.values) > self.window_size:
+      self.sum -= self.values.pop(0)
+    self.result = float(np.median(self.values)) if median else float(self.sum) / len(self.values)
+    return self.result
+
+
+def random_value(rng):
+  kind = rng.random()
+  if kind < 0.05:
+    return math.nan
+  if kind < 0.2:
+    return rng.randint(-5, 5)
+  if kind < 0.3:
+    # repeats
+    return 1.5
+  return rng.uniform(-100, 100)
+
+
+class TestStreamingMovingAverage(unittest.TestCase):
+  def assertSame(self, a, b, msg=None):
+    if isinstance(a, float) and math.isnan(a):
+      self.assertTrue(math.isnan(b), msg)
+    else:
+      self.assertEqual(a, b, msg)
+
+  def check(self, rng, window_size, steps, median):
+    new, old = StreamingMovingAverage(window_size), ListMovingAverage(window_size)
+    for i in range(steps):
+      value = random_value(rng)
+      if rng.random() < 0.02:
+        self.assertSame(new.set(value), old.set(value))
+        continue
+      use_median = median(rng)
+      self.assertSame(new.process(value, median=use_median), old.process(value, median=use_median), (window_size, i))
+      self.assertSame(new.result, old.result)
+
+  def test_mean(self):
+    rng = random.Random(0)
+    for window_size in range(1, 25):
+      self.check(rng, window_size, 500, lambda rng: False)
+
+  def test_median(self):
+    rng = random.Random(1)
+    with np.errstate(invalid='ignore'):
+      for window_size in range(1, 25):
+        self.check(rng, window_size, 500, lambda rng: True)
+
+  def test_mixed(self):
+    # median asked for only some of the time
+    rng = random.Random(2)
+    with np.errstate(invalid='ignore'):
+      for window_size in (1, 2, 3, 10, 15):
+        self.check(rng, window_size, 1000, lambda rng: rng.random() < 0.3)
+
+  def test_set(self):
+    f = StreamingMovingAverage(3)
+    for v in (1., 2., 3., 4.):
+      f.process(v, median=True)
+    self.assertEqual(f.set(10.), 10.)
+    self.assertEqual(f.process(20., median=True), 15.)
+    self.assertEqual(f.process(0.), 10.)
+
+
+if __name__ == "__main__":
+  unittest.main()
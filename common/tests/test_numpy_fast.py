@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import math
+import random
+import unittest
+
+import numpy as np
+
+from openpilot.common.numpy_fast import InterpTable, interp
+
+
+def random_table(rng):
+  n = rng.randint(1, 12)
+  xp = sorted(rng.choice([rng.uniform(-50, 50), rng.randint(-50, 50)]) for _ in range(n))
+  if n > 2 and rng.random() < 0.3:
+    # repeated breakpoints, a step
+    i = rng.randrange(1, n)
+    xp[i] = xp[i - 1]
+  fp = [rng.choice([rng.uniform(-10, 10), rng.randint(-10, 10)]) for _ in range(n)]
+  return xp, fp
+
+
+def sample_points(rng, xp):
+  points = list(xp) + [rng.uniform(xp[0] - 10, xp[-1] + 10) for _ in range(50)]
+  points += [xp[0] - 1, xp[-1] + 1, rng.randint(-60, 60), -math.inf, math.inf, math.nan]
+  return points
+
+
+class TestInterpTable(unittest.TestCase):
+  def test_same_as_interp(self):
+    rng = random.Random(0)
+    for _ in range(500):
+      xp, fp = random_table(rng)
+      table = InterpTable(xp, fp)
+      points = sample_points(rng, xp)
+      for x in points:
+        # identical floats, not just close
+        self.assertEqual(table(x), interp(x, xp, fp), (x, xp, fp))
+      self.assertEqual(table(points), interp(points, xp, fp))
+
+  def test_batch(self):
+    rng = random.Random(1)
+    for _ in range(500):
+      xp, fp = random_table(rng)
+      table = InterpTable(xp, fp)
+      points = [float(x) for x in sample_points(rng, xp)]
+      out = table.batch(np.array(points))
+      self.assertEqual(out.dtype, np.float64)
+      np.testing.assert_array_equal(out, np.array(interp(points, xp, fp), dtype=np.float64))
+      self.assertEqual(table.batch(points[3]), interp(points[3], xp, fp))
+
+  def test_clipping(self):
+    table = InterpTable([0., 10., 25., 40.], [1.6, 1.2, 0.8, 0.6])
+    self.assertEqual(table(-5.), 1.6)
+    self.assertEqual(table(100.), 0.6)
+    self.assertEqual(table(math.nan), 1.6)
+    self.assertEqual(table(10.), 1.2)
+    np.testing.assert_array_equal(table.batch([-5., 100., math.nan, 10.]), [1.6, 0.6, 1.6, 1.2])
+
+  def test_invalid(self):
+    with self.assertRaises(ValueError):
+      InterpTable([0., 2., 1.], [0., 1., 2.])
+    with self.assertRaises(ValueError):
+      InterpTable([0., 1.], [0.])
+    with self.assertRaises(ValueError):
+      InterpTable([], [])
+
+
+if __name__ == "__main__":
+  unittest.main()
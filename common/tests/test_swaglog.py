@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import unittest
+import uuid
+from unittest import mock
+
+import zmq
+
+from openpilot.common.logging_extra import SwagFormatter, SwagLogFileFormatter, SwagLogger
+from openpilot.common.swaglog import QueueLogHandler, SwaglogRotatingFileHandler, UnixDomainSocketHandler
+from openpilot.system.hardware.hw import Paths
+
+
+class ListHandler(logging.Handler):
+  def __init__(self, swaglogger, batched=False):
+    super().__init__()
+    self.setFormatter(SwagFormatter(swaglogger))
+    self.lines = []
+    self.batches = []
+    self.gate = threading.Event()
+    self.gate.set()
+    if batched:
+      self.emit_batch = self._emit_batch
+
+  def emit(self, record):
+    self.gate.wait()
+    self.lines.append(json.loads(self.format(record)))
+
+  def _emit_batch(self, records):
+    self.batches.append(len(records))
+    for record in records:
+      self.emit(record)
+
+
+class SlowStreamHandler(logging.StreamHandler):
+  def __init__(self, swaglogger, stream):
+    super().__init__(stream)
+    self.setFormatter(SwagFormatter(swaglogger))
+
+  def emit(self, record):
+    time.sleep(0.05)
+    super().emit(record)
+
+
+def make_logger(handler_factory, **kwargs):
+  log = SwagLogger()
+  log.setLevel(logging.DEBUG)
+  target = handler_factory(log)
+  handler = QueueLogHandler(target, log, **kwargs)
+  log.addHandler(handler)
+  return log, handler, target
+
+
+class TestQueueLogHandler(unittest.TestCase):
+  def test_records(self):
+    log, handler, target = make_logger(ListHandler)
+    log.bind_global(dongle_id="0123456789abcdef")
+    done = threading.Event()
+
+    def worker():
+      log.bind(daemon="worker")
+      for i in range(100):
+        log.event("worker_event", i=i)
+      done.set()
+
+    log.bind(daemon="main")
+    thread = threading.Thread(target=worker)
+    thread.start()
+    for i in range(100):
+      log.info("main %d", i)
+    thread.join()
+    handler.flush()
+
+    self.assertEqual(len(target.lines), 200)
+    main = [line for line in target.lines if line['ctx']['daemon'] == "main"]
+    worker_lines = [line for line in target.lines if line['ctx']['daemon'] == "worker"]
+    # the caller's context, not the sending thread's
+    self.assertEqual([line['msg'] for line in main], [f"main {i}" for i in range(100)])
+    self.assertEqual([line['msg']['i'] for line in worker_lines], list(range(100)))
+    self.assertTrue(all(line['ctx']['dongle_id'] == "0123456789abcdef" for line in target.lines))
+
+  def test_bounded(self):
+    log, handler, target = make_logger(lambda log: ListHandler(log, batched=True), max_queued=100, batch_size=16)
+    target.gate.clear()
+    for i in range(1000):
+      log.info("msg %d", i)
+    self.assertLessEqual(len(handler.queue), 100)
+    self.assertGreater(handler.dropped, 800)
+
+    target.gate.set()
+    handler.flush()
+    dropped = [line for line in target.lines if line['msg'].startswith("swaglog dropped")]
+    # usually one, two if the thread took a batch only after the queue had filled up
+    self.assertIn(len(dropped), (1, 2))
+    self.assertEqual(sum(int(line['msg'].split()[2]) for line in dropped), handler.dropped)
+    self.assertTrue(all(line['level'] == "WARNING" for line in dropped))
+    self.assertEqual(len(target.lines), 1000 - handler.dropped + len(dropped))
+    self.assertLessEqual(max(target.batches), 17)
+    self.assertGreater(max(target.batches), 1)
+
+  def test_bad_record(self):
+    log, handler, target = make_logger(ListHandler)
+    with mock.patch("sys.stderr"):
+      log.info("%d", "not a number")
+      handler.flush()
+    log.info("after")
+    handler.flush()
+    self.assertEqual(target.lines[-1]['msg'], "after")
+    self.assertTrue(handler.thread.is_alive())
+
+  def test_fork(self):
+    log, handler, target = make_logger(ListHandler)
+    target.gate.clear()
+    log.info("parent")
+    thread = handler.thread
+
+    # what a forked child sees: another pid, the parent's queue and no thread
+    with mock.patch("os.getpid", return_value=handler.pid + 1):
+      log.info("child")
+      target.gate.set()
+      handler.flush()
+    self.assertIsNot(handler.thread, thread)
+    self.assertEqual([line['msg'] for line in target.lines], ["parent", "child"][-len(target.lines):])
+    self.assertIn("child", [line['msg'] for line in target.lines])
+
+  def test_error_before_exit(self):
+    # a forked child that logs an exception and leaves through os._exit, like a manager process
+    r, w = os.pipe()
+    with os.fdopen(r) as reader, os.fdopen(w, 'w') as writer:
+      log, handler, _ = make_logger(lambda log: SlowStreamHandler(log, writer))
+      pid = os.fork()
+      if pid == 0:
+        log.info("before")
+        try:
+          raise ValueError("boom")
+        except ValueError:
+          log.exception("child got exception")
+        os._exit(1)
+
+      writer.close()
+      os.waitpid(pid, 0)
+      lines = [json.loads(line) for line in reader]
+    self.assertEqual([line['msg'] for line in lines], ["before", "child got exception"])
+    self.assertIn("ValueError: boom", lines[1]['exc_info'])
+
+  def test_error_past_max_queued(self):
+    log, handler, target = make_logger(ListHandler, max_queued=10)
+    target.gate.clear()
+    for i in range(20):
+      log.info("msg %d", i)
+    threading.Timer(0.1, target.gate.set).start()
+    log.error("bad")
+    # emitted by the time error() returns, after everything queued before it
+    msgs = [line['msg'] for line in target.lines if not line['msg'].startswith("swaglog dropped")]
+    self.assertGreater(handler.dropped, 0)
+    self.assertEqual(msgs[-1], "bad")
+    self.assertEqual(len(msgs), 21 - handler.dropped)
+
+  def test_ipc(self):
+    prefix = uuid.uuid4().hex[:8]
+    with mock.patch.dict(os.environ, {"OPENPILOT_PREFIX": prefix}):
+      ctx = zmq.Context()
+      sock = ctx.socket(zmq.PULL)
+      sock.bind(Paths.swaglog_ipc())
+      try:
+        log, handler, _ = make_logger(lambda log: UnixDomainSocketHandler(SwagFormatter(log)))
+        log.event("test_event", value=1)
+        log.error("bad")
+        handler.flush()
+        received = []
+        while len(received) < 2 and sock.poll(2000):
+          dat = sock.recv()
+          received.append((dat[0], json.loads(dat[1:])))
+        self.assertEqual([level for level, _ in received], [logging.INFO, logging.ERROR])
+        self.assertEqual(received[0][1]['msg'], {'event': 'test_event', 'value': 1})
+        self.assertEqual(received[1][1]['msg'], "bad")
+        handler.handler.close()
+      finally:
+        sock.close()
+        ctx.term()
+
+
+class TestSwaglogRotatingFileHandler(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.base_filename = os.path.join(self.tmpdir.name, "swaglog")
+
+  def tearDown(self):
+    self.tmpdir.cleanup()
+
+  def make_handler(self, **kwargs):
+    handler = SwaglogRotatingFileHandler(self.base_filename, **kwargs)
+    handler.setFormatter(SwagLogFileFormatter(None))
+    return handler
+
+  def read_logs(self, handler):
+    lines = []
+    for fn in sorted(handler.get_existing_logfiles()):
+      with open(fn) as f:
+        lines += [json.loads(line) for line in f]
+    for line in lines:
+      del line['id']
+    return lines
+
+  def test_emit_batch(self):
+    log = SwagLogger()
+    formatter = SwagFormatter(log)
+    records = [formatter.format(log.makeRecord("swaglog", logging.INFO, __file__, i, "msg %d", (i,), None)) for i in range(200)]
+
+    handler = self.make_handler()
+    for record in records:
+      handler.emit(record)
+    expected = self.read_logs(handler)
+    handler.close()
+    for fn in handler.get_existing_logfiles():
+      os.remove(fn)
+
+    handler = self.make_handler()
+    for i in range(0, len(records), 64):
+      handler.emit_batch(records[i:i + 64])
+    handler.emit_batch([])
+    self.assertEqual(self.read_logs(handler), expected)
+    handler.close()
+
+  def test_rollover(self):
+    log = SwagLogger()
+    formatter = SwagFormatter(log)
+    records = [formatter.format(log.makeRecord("swaglog", logging.INFO, __file__, i, "x" * 100, (), None)) for i in range(100)]
+
+    handler = self.make_handler(max_bytes=1000, backup_count=3)
+    for i in range(0, len(records), 10):
+      handler.emit_batch(records[i:i + 10])
+    handler.close()
+    self.assertEqual(len(handler.get_existing_logfiles()), 3)
+
+    # picks up where the last one left off
+    os.makedirs(self.base_filename + ".dir")
+    handler = self.make_handler()
+    self.assertEqual(handler.last_file_idx, 10)
+    self.assertEqual(len(handler.log_files), 4)
+    handler.close()
+
+
+if __name__ == "__main__":
+  unittest.main()
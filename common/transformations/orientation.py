@@ -33,12 +33,103 @@ def numpy_wrap(function, input_shape, output_shape) -> Callable[..., np.ndarray]
   return f
 
 
-euler2quat = numpy_wrap(euler2quat_single, (3,), (4,))
-quat2euler = numpy_wrap(quat2euler_single, (4,), (3,))
-quat2rot = numpy_wrap(quat2rot_single, (4,), (3, 3))
-rot2quat = numpy_wrap(rot2quat_single, (3, 3), (4,))
-euler2rot = numpy_wrap(euler2rot_single, (3,), (3, 3))
-rot2euler = numpy_wrap(rot2euler_single, (3, 3), (3,))
+def numpy_batch(single, batch, input_shape, output_shape) -> Callable[[np.ndarray], np.ndarray]:
+  """Like numpy_wrap, but a list of inputs goes through batch in one call instead of through single per row"""
+  def f(inp):
+    inp = np.asarray(inp, dtype=np.float64)
+    if inp.ndim == len(input_shape):
+      return np.asarray(single(inp)).reshape(output_shape)
+    batch_shape = inp.shape[:-len(input_shape)]
+    return batch(inp.reshape((-1,) + input_shape)).reshape(batch_shape + output_shape)
+  return f
+
+
+def ensure_unique_batch(quats: np.ndarray) -> np.ndarray:
+  # like the single version, any quaternion without a positive w is flipped
+  return np.where(quats[:, :1] > 0, quats, -quats)
+
+
+def euler2quat_batch(eulers: np.ndarray) -> np.ndarray:
+  half = eulers / 2
+  cx, cy, cz = np.cos(half).T
+  sx, sy, sz = np.sin(half).T
+  # yaw, then pitch, then roll: q_z * q_y * q_x
+  w1, x1, y1, z1 = cz * cy, -sz * sy, cz * sy, cy * sz
+  quats = np.stack([w1 * cx - x1 * sx, w1 * sx + x1 * cx, y1 * cx + z1 * sx, z1 * cx - y1 * sx], axis=1)
+  return ensure_unique_batch(quats)
+
+
+def quat2euler_batch(quats: np.ndarray) -> np.ndarray:
+  w, x, y, z = quats.T
+  gamma = np.arctan2(2 * (w * x + y * z), 1 - 2 * (x * x + y * y))
+  theta = np.arcsin(np.clip(2 * (w * y - z * x), -1.0, 1.0))
+  psi = np.arctan2(2 * (w * z + x * y), 1 - 2 * (y * y + z * z))
+  return np.stack([gamma, theta, psi], axis=1)
+
+
+def quat2rot_batch(quats: np.ndarray) -> np.ndarray:
+  # same as Eigen's toRotationMatrix, which doesn't normalize either
+  w, x, y, z = quats.T
+  tx, ty, tz = 2 * x, 2 * y, 2 * z
+  twx, twy, twz = tx * w, ty * w, tz * w
+  txx, txy, txz = tx * x, ty * x, tz * x
+  tyy, tyz, tzz = ty * y, tz * y, tz * z
+  rots = np.empty((len(quats), 3, 3))
+  rots[:, 0, 0] = 1 - (tyy + tzz)
+  rots[:, 0, 1] = txy - twz
+  rots[:, 0, 2] = txz + twy
+  rots[:, 1, 0] = txy + twz
+  rots[:, 1, 1] = 1 - (txx + tzz)
+  rots[:, 1, 2] = tyz - twx
+  rots[:, 2, 0] = txz - twy
+  rots[:, 2, 1] = tyz + twx
+  rots[:, 2, 2] = 1 - (txx + tyy)
+  return rots
+
+
+def rot2quat_batch(rots: np.ndarray) -> np.ndarray:
+  # Eigen's conversion: from the trace if it's positive, otherwise from the largest diagonal element
+  quats = np.empty((len(rots), 4))
+  trace = np.trace(rots, axis1=1, axis2=2)
+  pos = trace > 0
+  m = rots[pos]
+  t = np.sqrt(trace[pos] + 1.0)
+  quats[pos, 0] = 0.5 * t
+  t = 0.5 / t
+  quats[pos, 1] = (m[:, 2, 1] - m[:, 1, 2]) * t
+  quats[pos, 2] = (m[:, 0, 2] - m[:, 2, 0]) * t
+  quats[pos, 3] = (m[:, 1, 0] - m[:, 0, 1]) * t
+
+  diag = np.diagonal(rots, axis1=1, axis2=2)
+  largest = np.where(diag[:, 1] > diag[:, 0], 1, 0)
+  largest = np.where(diag[:, 2] > diag[np.arange(len(rots)), largest], 2, largest)
+  for i in range(3):
+    j, k = (i + 1) % 3, (i + 2) % 3
+    sel = ~pos & (largest == i)
+    m = rots[sel]
+    t = np.sqrt(m[:, i, i] - m[:, j, j] - m[:, k, k] + 1.0)
+    quats[sel, 1 + i] = 0.5 * t
+    t = 0.5 / t
+    quats[sel, 0] = (m[:, k, j] - m[:, j, k]) * t
+    quats[sel, 1 + j] = (m[:, j, i] + m[:, i, j]) * t
+    quats[sel, 1 + k] = (m[:, k, i] + m[:, i, k]) * t
+  return ensure_unique_batch(quats)
+
+
+def euler2rot_batch(eulers: np.ndarray) -> np.ndarray:
+  return quat2rot_batch(euler2quat_batch(eulers))
+
+
+def rot2euler_batch(rots: np.ndarray) -> np.ndarray:
+  return quat2euler_batch(rot2quat_batch(rots))
+
+
+euler2quat = numpy_batch(euler2quat_single, euler2quat_batch, (3,), (4,))
+quat2euler = numpy_batch(quat2euler_single, quat2euler_batch, (4,), (3,))
+quat2rot = numpy_batch(quat2rot_single, quat2rot_batch, (4,), (3, 3))
+rot2quat = numpy_batch(rot2quat_single, rot2quat_batch, (3, 3), (4,))
+euler2rot = numpy_batch(euler2rot_single, euler2rot_batch, (3,), (3, 3))
+rot2euler = numpy_batch(rot2euler_single, rot2euler_batch, (3, 3), (3,))
 ecef_euler_from_ned = numpy_wrap(ecef_euler_from_ned_single, (3,), (3,))
 ned_euler_from_ecef = numpy_wrap(ned_euler_from_ecef_single, (3,), (3,))
 
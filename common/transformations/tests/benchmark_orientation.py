@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+import time
+
+import numpy as np
+
+from openpilot.common.transformations import orientation
+from openpilot.common.transformations.orientation import numpy_wrap
+from openpilot.common.transformations.tests.test_orientation import random_eulers
+
+N = 1_000_000
+FUNCTIONS = {
+  "euler2quat": ((3,), (4,), "eulers"),
+  "quat2euler": ((4,), (3,), "quats"),
+  "quat2rot": ((4,), (3, 3), "quats"),
+  "rot2quat": ((3, 3), (4,), "rots"),
+  "euler2rot": ((3,), (3, 3), "eulers"),
+  "rot2euler": ((3, 3), (3,), "rots"),
+}
+
+
+def timed(fn, inputs):
+  t = time.perf_counter()
+  out = fn(inputs)
+  return time.perf_counter() - t, out
+
+
+if __name__ == "__main__":
+  eulers = random_eulers(np.random.default_rng(0), N)
+  inputs = {"eulers": eulers, "quats": orientation.euler2quat(eulers), "rots": orientation.euler2rot(eulers)}
+
+  for name, (input_shape, output_shape, kind) in FUNCTIONS.items():
+    # a Python call per row into the single version, like before
+    per_row = numpy_wrap(getattr(orientation, f"{name}_single"), input_shape, output_shape)
+    row_time, expected = timed(per_row, inputs[kind])
+    batch_time, out = timed(getattr(orientation, name), inputs[kind])
+    assert np.allclose(out, expected, rtol=0, atol=1e-12)
+    print(f"{name:>10}: per row {row_time:6.2f} s, batch {batch_time * 1e3:7.1f} ms, {row_time / batch_time:5.0f}x")
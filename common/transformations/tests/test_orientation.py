@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+import unittest
+
+import numpy as np
+
+from openpilot.common.transformations.orientation import (euler2quat, quat2euler, quat2rot, rot2quat, euler2rot, rot2euler,
+                                                          euler2quat_single, quat2euler_single, quat2rot_single, rot2quat_single,
+                                                          euler2rot_single, rot2euler_single)
+
+N = 2000
+
+
+def random_eulers(rng, n):
+  eulers = rng.uniform(-np.pi, np.pi, (n, 3))
+  eulers[:, 1] /= 2
+  # gimbal lock and half turns, where rot2quat can't go by the trace
+  eulers[:10, 1] = np.pi / 2
+  eulers[10:20] = [np.pi, 0, 0]
+  eulers[20:30] = [0, 0, np.pi]
+  eulers[30:40] = [np.pi * 0.9, 0.1, np.pi * 0.95]
+  return eulers
+
+
+class TestOrientation(unittest.TestCase):
+  def setUp(self):
+    self.rng = np.random.default_rng(0)
+    self.eulers = random_eulers(self.rng, N)
+    self.quats = np.array([euler2quat_single(e) for e in self.eulers])
+    self.rots = np.array([euler2rot_single(e) for e in self.eulers])
+
+  def check(self, batch_fn, single_fn, inputs):
+    expected = np.array([single_fn(inp) for inp in inputs])
+    out = batch_fn(inputs)
+    self.assertEqual(out.shape, expected.shape)
+    np.testing.assert_allclose(out, expected, rtol=0, atol=1e-12)
+    # single inputs still go through the single version
+    np.testing.assert_array_equal(batch_fn(inputs[0]), expected[0])
+    np.testing.assert_allclose(batch_fn(inputs.tolist()), expected, rtol=0, atol=1e-12)
+
+  def test_euler2quat(self):
+    self.check(euler2quat, euler2quat_single, self.eulers)
+
+  def test_quat2euler(self):
+    self.check(quat2euler, quat2euler_single, self.quats)
+    # not normalized, the arcsin argument gets clipped
+    self.check(quat2euler, quat2euler_single, self.quats * 1.1)
+
+  def test_quat2rot(self):
+    self.check(quat2rot, quat2rot_single, self.quats)
+    self.check(quat2rot, quat2rot_single, self.quats * 1.1)
+
+  def test_rot2quat(self):
+    self.check(rot2quat, rot2quat_single, self.rots)
+    self.assertTrue((np.trace(self.rots, axis1=1, axis2=2) <= 0).any())
+
+  def test_euler2rot(self):
+    self.check(euler2rot, euler2rot_single, self.eulers)
+
+  def test_rot2euler(self):
+    self.check(rot2euler, rot2euler_single, self.rots)
+
+  def test_shapes(self):
+    self.assertEqual(euler2quat(np.zeros((0, 3))).shape, (0, 4))
+    self.assertEqual(quat2rot(np.zeros((5, 7, 4))).shape, (5, 7, 3, 3))
+    self.assertEqual(rot2euler(np.eye(3)).shape, (3,))
+    np.testing.assert_allclose(euler2rot([0, 0, 0]), np.eye(3))
+
+  def test_round_trip(self):
+    np.testing.assert_allclose(rot2euler(euler2rot(self.eulers[40:])), self.eulers[40:], rtol=0, atol=1e-9)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -5,8 +5,9 @@ from cython.operator cimport dereference as deref, preincrement as preinc
 from libcpp.pair cimport pair
 from libcpp.string cimport string
 from libcpp.vector cimport vector
+from libcpp.unordered_map cimport unordered_map
 from libcpp.unordered_set cimport unordered_set
-from libc.stdint cimport uint32_t
+from libc.stdint cimport int64_t, uint32_t, uint64_t
 
 from .common cimport CANParser as cpp_CANParser
 from .common cimport dbc_lookup, SignalValue, DBC
@@ -14,21 +15,37 @@ from .common cimport dbc_lookup, SignalValue, DBC
 import numbers
 from collections import defaultdict
 
+import numpy as np
+
+# values of one signal kept per update in array mode, older values of the same update are overwritten
+ALL_VALUES_RING_LEN = 16
+
 
 cdef class CANParser:
   cdef:
     cpp_CANParser *can
     const DBC *dbc
     vector[SignalValue] can_values
+    unordered_map[uint32_t, unordered_map[string, int]] signal_slots
 
   cdef readonly:
     dict vl
     dict vl_all
     dict ts_nanos
     string dbc_name
-
-  def __init__(self, dbc_name, messages, bus=0):
+    bint use_arrays
+    dict slots
+    object values
+    object ts
+    object all_values
+    object all_counts
+
+  def __init__(self, dbc_name, messages, bus=0, use_arrays=False):
+    # use_arrays: signals are stored by slot (see slots) in the values, ts, all_values and all_counts arrays,
+    # which are updated in place, instead of in the vl, vl_all and ts_nanos dicts. Without it, slots stays
+    # empty and the arrays are None
     self.dbc_name = dbc_name
+    self.use_arrays = use_arrays
     self.dbc = dbc_lookup(dbc_name)
     if not self.dbc:
       raise RuntimeError(f"Can't find DBC: {dbc_name}")
@@ -36,8 +53,10 @@ cdef class CANParser:
     self.vl = {}
     self.vl_all = {}
     self.ts_nanos = {}
+    self.slots = {}
     msg_name_to_address = {}
     address_to_msg_name = {}
+    address_to_msg_index = {}
 
     for i in range(self.dbc[0].msgs.size()):
       msg = self.dbc[0].msgs[i]
@@ -45,9 +64,11 @@ cdef class CANParser:
 
       msg_name_to_address[name] = msg.address
       address_to_msg_name[msg.address] = name
+      address_to_msg_index[msg.address] = i
 
     # Convert message names into addresses and check existence in DBC
     cdef vector[pair[uint32_t, int]] message_v
+    cdef int num_slots = 0
     for i in range(len(messages)):
       c = messages[i]
       address = c[0] if isinstance(c[0], numbers.Number) else msg_name_to_address.get(c[0])
@@ -63,6 +84,23 @@ cdef class CANParser:
       self.ts_nanos[address] = {}
       self.ts_nanos[name] = self.ts_nanos[address]
 
+      # one slot per signal, looked up by (message name or address, signal name)
+      # a message can be listed more than once, by name or address, its signals keep their first slots
+      if use_arrays and not self.signal_slots.count(address):
+        msg = self.dbc[0].msgs[address_to_msg_index[address]]
+        for j in range(msg.sigs.size()):
+          self.signal_slots[address][msg.sigs[j].name] = num_slots
+          sig_name = msg.sigs[j].name.decode("utf8")
+          self.slots[(address, sig_name)] = num_slots
+          self.slots[(name, sig_name)] = num_slots
+          num_slots += 1
+
+    if use_arrays:
+      self.values = np.zeros(num_slots, dtype=np.float64)
+      self.ts = np.zeros(num_slots, dtype=np.uint64)
+      self.all_values = np.zeros((num_slots, ALL_VALUES_RING_LEN), dtype=np.float64)
+      self.all_counts = np.zeros(num_slots, dtype=np.int64)
+
     self.can = new cpp_CANParser(bus, dbc_name, message_v)
     self.update_strings([])
 
@@ -71,6 +109,9 @@ cdef class CANParser:
       del self.can
 
   def update_strings(self, strings, sendcan=False):
+    if self.use_arrays:
+      return self._update_arrays(strings, sendcan)
+
     for v in self.vl_all.values():
       for l in v.values():  # no-cython-lint
         l.clear()
@@ -93,6 +134,44 @@ cdef class CANParser:
 
     return updated_addrs
 
+  def _update_arrays(self, strings, sendcan):
+    cdef double[::1] values = self.values
+    cdef uint64_t[::1] ts = self.ts
+    cdef double[:, ::1] all_values = self.all_values
+    cdef int64_t[::1] all_counts = self.all_counts
+    cdef size_t ring_len = ALL_VALUES_RING_LEN
+    cdef int slot
+    cdef size_t j, n
+    all_counts[:] = 0
+
+    cdef vector[SignalValue] new_vals
+    cdef unordered_set[uint32_t] updated_addrs
+
+    self.can.update_strings(strings, new_vals, sendcan)
+    cdef vector[SignalValue].iterator it = new_vals.begin()
+    cdef SignalValue* cv
+    while it != new_vals.end():
+      cv = &deref(it)
+      slot = self.signal_slots[cv.address][cv.name]
+      values[slot] = cv.value
+      ts[slot] = cv.ts_nanos
+      n = cv.all_values.size()
+      for j in range(n):
+        all_values[slot, j % ring_len] = cv.all_values[j]
+      all_counts[slot] = n
+      updated_addrs.insert(cv.address)
+      preinc(it)
+
+    return updated_addrs
+
+  def get_all_values(self, int slot):
+    """Values of a signal received in the last update, oldest first, like vl_all (at most ALL_VALUES_RING_LEN)"""
+    n = self.all_counts[slot]
+    if n <= ALL_VALUES_RING_LEN:
+      return self.all_values[slot, :n].tolist()
+    start = n % ALL_VALUES_RING_LEN
+    return self.all_values[slot, start:].tolist() + self.all_values[slot, :start].tolist()
+
   @property
   def can_valid(self):
     return self.can.can_valid
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import random
+import sys
+import time
+
+from opendbc.can.packer import CANPacker
+from opendbc.can.parser import CANParser
+from opendbc.can.tests.test_parser_arrays import DBC, MESSAGES, random_can_strings
+
+N = 5000
+
+
+def recorded_can_strings(rlog_path):
+  from openpilot.tools.lib.logreader import LogReader
+  return [[msg.as_builder().to_bytes()] for msg in LogReader(rlog_path) if msg.which() == 'can']
+
+
+def benchmark(parser, updates, read):
+  t = time.perf_counter()
+  for strings in updates:
+    parser.update_strings(strings)
+    read(parser)
+  return (time.perf_counter() - t) / len(updates)
+
+
+if __name__ == "__main__":
+  # usage: benchmark_parser.py [rlog dbc message ...] to run on a recorded log instead of generated CAN
+  random.seed(0)
+  if len(sys.argv) > 3:
+    updates = recorded_can_strings(sys.argv[1])
+    dbc, messages = sys.argv[2], [(m, 0) for m in sys.argv[3:]]
+  else:
+    packer = CANPacker(DBC)
+    signals = {name: list(CANParser(DBC, MESSAGES, 0).vl[name]) for name, _ in MESSAGES}
+    nanos, updates = 0, []
+    for _ in range(N):
+      strings, nanos = random_can_strings(packer, signals, nanos)
+      updates.append(strings)
+    dbc, messages = DBC, MESSAGES
+
+  parser = CANParser(dbc, messages, 0)
+  array_parser = CANParser(dbc, messages, 0, use_arrays=True)
+  keys = [(msg, sig) for msg, _ in messages for sig in parser.vl[msg]]
+  slots = [array_parser.slots[k] for k in keys]
+
+  def read_dicts(p):
+    # what carstate does: one nested lookup per signal
+    return [p.vl[msg][sig] for msg, sig in keys]
+
+  def read_arrays(p):
+    return p.values[slots]
+
+  for name, p, read in (("dicts", parser, read_dicts), ("arrays", array_parser, read_arrays)):
+    t = benchmark(p, updates, read)
+    print(f"{name:>6}: {t * 1e6:6.1f} us per update + read of {len(keys)} signals")
+
+  assert list(read_dicts(parser)) == read_arrays(array_parser).tolist()
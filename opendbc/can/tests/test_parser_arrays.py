@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+import random
+import unittest
+
+from cereal import messaging
+from opendbc.can.packer import CANPacker
+from opendbc.can.parser import CANParser
+from opendbc.can.parser_pyx import ALL_VALUES_RING_LEN
+
+DBC = "toyota_nodsu_pt_generated"
+MESSAGES = [("WHEEL_SPEEDS", 80), ("STEER_ANGLE_SENSOR", 80), ("PCM_CRUISE", 33), ("BRAKE", 0), ("SPEED", 0)]
+
+
+def can_string(frames, nanos):
+  msg = messaging.new_message('can', len(frames))
+  msg.logMonoTime = nanos
+  for i, (address, _, dat, src) in enumerate(frames):
+    msg.can[i] = {'address': address, 'dat': dat, 'src': src}
+  return msg.to_bytes()
+
+
+def random_can_strings(packer, signals, nanos, max_repeats=3):
+  # a few CAN packets, each with some of the messages, some sent several times
+  strings = []
+  for _ in range(random.randint(0, 3)):
+    frames = []
+    for name, _ in random.sample(MESSAGES, random.randint(0, len(MESSAGES))):
+      for _ in range(random.randint(1, max_repeats)):
+        values = {s: random.randint(0, 100) for s in random.sample(signals[name], random.randint(1, len(signals[name])))}
+        frames.append(packer.make_can_msg(name, random.choice((0, 0, 1)), values))
+    nanos += random.randint(1, 20) * 1_000_000
+    strings.append(can_string(frames, nanos))
+  return strings, nanos
+
+
+class TestParserArrays(unittest.TestCase):
+  def assertParsersMatch(self, parser, array_parser, updated, array_updated):
+    self.assertEqual(array_updated, updated)
+    self.assertEqual(array_parser.can_valid, parser.can_valid)
+    self.assertEqual(array_parser.bus_timeout, parser.bus_timeout)
+    for (msg, sig), slot in array_parser.slots.items():
+      self.assertEqual(array_parser.values[slot], parser.vl[msg][sig], (msg, sig))
+      self.assertEqual(array_parser.ts[slot], parser.ts_nanos[msg][sig], (msg, sig))
+      self.assertEqual(array_parser.get_all_values(slot), parser.vl_all[msg][sig][-ALL_VALUES_RING_LEN:], (msg, sig))
+
+  def test_matches_dicts(self):
+    random.seed(0)
+    packer = CANPacker(DBC)
+    parser = CANParser(DBC, MESSAGES, 0)
+    array_parser = CANParser(DBC, MESSAGES, 0, use_arrays=True)
+    signals = {name: list(parser.vl[name]) for name, _ in MESSAGES}
+    self.assertEqual(len(array_parser.slots), 2 * sum(len(s) for s in signals.values()))
+
+    nanos = 0
+    for i in range(1000):
+      # long bursts overflow the all values ring
+      strings, nanos = random_can_strings(packer, signals, nanos, max_repeats=3 if i % 10 else 2 * ALL_VALUES_RING_LEN)
+      updated = parser.update_strings(strings)
+      array_updated = array_parser.update_strings(strings)
+      self.assertParsersMatch(parser, array_parser, updated, array_updated)
+
+  def test_slots(self):
+    parser = CANParser(DBC, MESSAGES, 0, use_arrays=True)
+    self.assertEqual(sorted(set(parser.slots.values())), list(range(len(parser.values))))
+    for name, _ in MESSAGES:
+      # slots can be looked up by message name or address, like vl
+      address = next(k for k, v in parser.vl.items() if isinstance(k, int) and v is parser.vl[name])
+      for (msg, sig), slot in parser.slots.items():
+        if msg == name:
+          self.assertEqual(parser.slots[(address, sig)], slot)
+
+  def test_duplicate_messages(self):
+    # listed twice by name and once more by address, the signals keep one slot each
+    parser = CANParser(DBC, MESSAGES, 0)
+    address = next(k for k, v in parser.vl.items() if isinstance(k, int) and v is parser.vl["STEER_ANGLE_SENSOR"])
+    messages = MESSAGES + [("WHEEL_SPEEDS", 80), (address, 80)]
+    array_parser = CANParser(DBC, messages, 0, use_arrays=True)
+    self.assertEqual(array_parser.slots, CANParser(DBC, MESSAGES, 0, use_arrays=True).slots)
+    self.assertEqual(sorted(set(array_parser.slots.values())), list(range(len(array_parser.values))))
+
+    random.seed(0)
+    packer = CANPacker(DBC)
+    signals = {name: list(parser.vl[name]) for name, _ in MESSAGES}
+    parser = CANParser(DBC, messages, 0)
+    nanos = 0
+    for _ in range(100):
+      strings, nanos = random_can_strings(packer, signals, nanos)
+      updated = parser.update_strings(strings)
+      array_updated = array_parser.update_strings(strings)
+      self.assertParsersMatch(parser, array_parser, updated, array_updated)
+
+  def test_no_arrays(self):
+    parser = CANParser(DBC, MESSAGES, 0)
+    self.assertEqual(parser.slots, {})
+    for arr in (parser.values, parser.ts, parser.all_values, parser.all_counts):
+      self.assertIsNone(arr)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -7,6 +7,7 @@ import struct
 import hashlib
 import binascii
 import logging
+import numpy as np
 from functools import wraps, partial
 from itertools import accumulate
 
@@ -35,59 +36,124 @@ def calculate_checksum(data):
     res ^= b
   return res
 
+# below this many packets the per-call numpy overhead is more than the per-packet python work
+CAN_PACK_VECTORIZE_MIN = 96
+CAN_UNPACK_VECTORIZE_MIN = 32
+CAN_CHUNK_SIZE = 256
+
 def pack_can_buffer(arr):
-  snds = [b'']
+  if len(arr) < CAN_PACK_VECTORIZE_MIN:
+    return _pack_can_buffer(arr)
+
+  lens = [len(dat) for _, _, dat, _ in arr]
+  assert all(length in LEN_TO_DLC for length in lens)
+
+  # all packets are written into one preallocated buffer, then split into chunks
+  sizes = np.array(lens, dtype=np.int64) + CANPACKET_HEAD_SIZE
+  ends = np.cumsum(sizes)
+  starts = ends - sizes
+  buf = bytearray(int(ends[-1]))
+
+  for start, length, (_, _, dat, _) in zip((starts + CANPACKET_HEAD_SIZE).tolist(), lens, arr, strict=True):
+    buf[start:start + length] = dat
+
+  address = np.array([msg[0] for msg in arr], dtype=np.uint64)
+  word_4b = (address << 3) | ((address >= 0x800).astype(np.uint64) << 2)
+  header = np.empty((len(lens), CANPACKET_HEAD_SIZE), dtype=np.uint8)
+  header[:, 0] = (np.array([LEN_TO_DLC[length] for length in lens], dtype=np.uint8) << 4) | (np.array([msg[3] for msg in arr], dtype=np.uint8) << 1)
+  for i in range(4):
+    header[:, i + 1] = (word_4b >> (8 * i)) & 0xFF
+  header[:, 5] = 0
+
+  # checksum byte is still zero here, so the xor over each packet is its checksum
+  packed = np.frombuffer(buf, dtype=np.uint8)
+  packed[starts[:, None] + np.arange(CANPACKET_HEAD_SIZE)] = header
+  packed[starts + 5] = np.bitwise_xor.reduceat(packed, starts)
+
+  # Limit chunks to 256 bytes, a chunk is closed once it grows past the limit
+  snds = []
+  chunk_start = 0
+  for end in ends.tolist():
+    if end - chunk_start > CAN_CHUNK_SIZE:
+      snds.append(bytes(buf[chunk_start:end]))
+      chunk_start = end
+  snds.append(bytes(buf[chunk_start:]))
+  return snds
+
+def _pack_can_buffer(arr):
+  snds = []
+  chunk = []
+  chunk_len = 0
   for address, _, dat, bus in arr:
     assert len(dat) in LEN_TO_DLC
-    #logging.debug("  W 0x%x: 0x%s", address, dat.hex())
-
-    extended = 1 if address >= 0x800 else 0
-    data_len_code = LEN_TO_DLC[len(dat)]
-    header = bytearray(CANPACKET_HEAD_SIZE)
-    word_4b = address << 3 | extended << 2
-    header[0] = (data_len_code << 4) | (bus << 1)
-    header[1] = word_4b & 0xFF
-    header[2] = (word_4b >> 8) & 0xFF
-    header[3] = (word_4b >> 16) & 0xFF
-    header[4] = (word_4b >> 24) & 0xFF
-    header[5] = calculate_checksum(header[:5] + dat)
-
-    snds[-1] += header + dat
-    if len(snds[-1]) > 256: # Limit chunks to 256 bytes
-      snds.append(b'')
 
+    word_4b = address << 3 | (4 if address >= 0x800 else 0)
+    h0 = (LEN_TO_DLC[len(dat)] << 4) | (bus << 1)
+    h1 = word_4b & 0xFF
+    h2 = (word_4b >> 8) & 0xFF
+    h3 = (word_4b >> 16) & 0xFF
+    h4 = (word_4b >> 24) & 0xFF
+    chunk.append(bytes((h0, h1, h2, h3, h4, h0 ^ h1 ^ h2 ^ h3 ^ h4 ^ calculate_checksum(dat))))
+    chunk.append(dat)
+
+    chunk_len += CANPACKET_HEAD_SIZE + len(dat)
+    if chunk_len > CAN_CHUNK_SIZE:
+      snds.append(b''.join(chunk))
+      chunk, chunk_len = [], 0
+
+  snds.append(b''.join(chunk))
   return snds
 
 def unpack_can_buffer(dat):
-  ret = []
+  # find the packet boundaries without re-slicing the buffer, only the DLC of each header is needed
+  starts = []
+  pos, total = 0, len(dat)
+  while total - pos >= CANPACKET_HEAD_SIZE:
+    data_len = DLC_TO_LEN[(dat[pos]>>4)]
 
-  while len(dat) >= CANPACKET_HEAD_SIZE:
-    data_len = DLC_TO_LEN[(dat[0]>>4)]
+    # we need more from the next transfer
+    if data_len > total - pos - CANPACKET_HEAD_SIZE:
+      break
 
-    header = dat[:CANPACKET_HEAD_SIZE]
+    starts.append(pos)
+    pos += CANPACKET_HEAD_SIZE + data_len
 
-    bus = (header[0] >> 1) & 0x7
-    address = (header[4] << 24 | header[3] << 16 | header[2] << 8 | header[1]) >> 3
+  if len(starts) < CAN_UNPACK_VECTORIZE_MIN:
+    ret = _unpack_can_packets(dat, starts)
+  else:
+    ret = _unpack_can_packets_np(dat, starts, pos)
+  return (ret, dat[pos:])
 
-    if (header[1] >> 1) & 0x1:
+def _unpack_can_packets(dat, starts):
+  ret = []
+  for start in starts:
+    h0, h1, h2, h3, h4, h5 = dat[start:start + CANPACKET_HEAD_SIZE]
+    data = dat[start + CANPACKET_HEAD_SIZE:start + CANPACKET_HEAD_SIZE + DLC_TO_LEN[h0 >> 4]]
+    assert h0 ^ h1 ^ h2 ^ h3 ^ h4 ^ h5 ^ calculate_checksum(data) == 0, "CAN packet checksum incorrect"
+
+    bus = (h0 >> 1) & 0x7
+    if (h1 >> 1) & 0x1:
       # returned
       bus += 128
-    if header[1] & 0x1:
+    if h1 & 0x1:
       # rejected
       bus += 192
 
-    # we need more from the next transfer
-    if data_len > len(dat) - CANPACKET_HEAD_SIZE:
-      break
-
-    assert calculate_checksum(dat[:(CANPACKET_HEAD_SIZE+data_len)]) == 0, "CAN packet checksum incorrect"
+    ret.append(((h4 << 24 | h3 << 16 | h2 << 8 | h1) >> 3, 0, data, bus))
+  return ret
 
-    data = dat[CANPACKET_HEAD_SIZE:(CANPACKET_HEAD_SIZE+data_len)]
-    dat = dat[(CANPACKET_HEAD_SIZE+data_len):]
+def _unpack_can_packets_np(dat, starts, end):
+  packed = np.frombuffer(dat, dtype=np.uint8, count=end)
+  idx = np.array(starts)
+  assert not np.bitwise_xor.reduceat(packed, idx).any(), "CAN packet checksum incorrect"
 
-    ret.append((address, 0, data, bus))
+  header = packed[idx[:, None] + np.arange(5)].astype(np.uint32)
+  address = (header[:, 4] << 24 | header[:, 3] << 16 | header[:, 2] << 8 | header[:, 1]) >> 3
+  # returned packets are on bus + 128, rejected ones on bus + 192
+  bus = ((header[:, 0] >> 1) & 0x7) + ((header[:, 1] >> 1) & 0x1) * 128 + (header[:, 1] & 0x1) * 192
+  data_end = starts[1:] + [end]
 
-  return (ret, dat)
+  return [(a, 0, dat[start + CANPACKET_HEAD_SIZE:e], b) for a, start, e, b in zip(address.tolist(), starts, data_end, bus.tolist(), strict=True)]
 
 
 def ensure_version(desc, lib_field, panda_field, fn):
@@ -45,6 +45,7 @@ setup(
   license='MIT',
   install_requires=[
     'libusb1 == 2.0.1',
+    'numpy',
     'hexdump >= 3.3',
     'pycryptodome >= 3.9.8',
     'tqdm >= 4.14.0',
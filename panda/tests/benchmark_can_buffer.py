@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+import random
+import timeit
+
+from panda import pack_can_buffer, unpack_can_buffer
+from panda.tests.usbprotocol.test_pandalib import pack_can_buffer_ref, unpack_can_buffer_ref, random_can_messages
+
+# compares the library CAN buffer codec against the per-packet reference, outputs are checked to be identical first
+
+if __name__ == "__main__":
+  random.seed(0)
+  print(f"{'msgs':>6} {'pack ref':>10} {'pack':>10} {'unpack ref':>11} {'unpack':>10}   (us per call)")
+  for n in (1, 10, 32, 96, 300, 1000):
+    msgs = random_can_messages(n)
+    snds = pack_can_buffer(msgs)
+    assert snds == pack_can_buffer_ref(msgs)
+    raw = b''.join(snds)
+    assert unpack_can_buffer(raw) == unpack_can_buffer_ref(raw)
+
+    number = max(10, 20000 // n)
+    times = [timeit.timeit(lambda f=f, x=x: f(x), number=number) / number * 1e6 for f, x in
+             ((pack_can_buffer_ref, msgs), (pack_can_buffer, msgs), (unpack_can_buffer_ref, raw), (unpack_can_buffer, raw))]
+    print(f"{n:>6} {times[0]:>10.1f} {times[1]:>10.1f} {times[2]:>11.1f} {times[3]:>10.1f}")
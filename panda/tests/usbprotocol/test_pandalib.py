@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+import random
+import unittest
+
+from panda import CANPACKET_HEAD_SIZE, DLC_TO_LEN, LEN_TO_DLC, calculate_checksum, pack_can_buffer, unpack_can_buffer
+
+# straightforward per-packet implementations of the CAN buffer format, the library codec must match them bit for bit
+
+
+def pack_can_buffer_ref(arr):
+  snds = [b'']
+  for address, _, dat, bus in arr:
+    assert len(dat) in LEN_TO_DLC
+
+    extended = 1 if address >= 0x800 else 0
+    data_len_code = LEN_TO_DLC[len(dat)]
+    header = bytearray(CANPACKET_HEAD_SIZE)
+    word_4b = address << 3 | extended << 2
+    header[0] = (data_len_code << 4) | (bus << 1)
+    header[1] = word_4b & 0xFF
+    header[2] = (word_4b >> 8) & 0xFF
+    header[3] = (word_4b >> 16) & 0xFF
+    header[4] = (word_4b >> 24) & 0xFF
+    header[5] = calculate_checksum(header[:5] + dat)
+
+    snds[-1] += header + dat
+    if len(snds[-1]) > 256:
+      snds.append(b'')
+
+  return snds
+
+
+def unpack_can_buffer_ref(dat):
+  ret = []
+
+  while len(dat) >= CANPACKET_HEAD_SIZE:
+    data_len = DLC_TO_LEN[(dat[0]>>4)]
+    header = dat[:CANPACKET_HEAD_SIZE]
+
+    bus = (header[0] >> 1) & 0x7
+    address = (header[4] << 24 | header[3] << 16 | header[2] << 8 | header[1]) >> 3
+    if (header[1] >> 1) & 0x1:
+      bus += 128
+    if header[1] & 0x1:
+      bus += 192
+
+    if data_len > len(dat) - CANPACKET_HEAD_SIZE:
+      break
+
+    assert calculate_checksum(dat[:(CANPACKET_HEAD_SIZE+data_len)]) == 0, "CAN packet checksum incorrect"
+
+    data = dat[CANPACKET_HEAD_SIZE:(CANPACKET_HEAD_SIZE+data_len)]
+    dat = dat[(CANPACKET_HEAD_SIZE+data_len):]
+    ret.append((address, 0, data, bus))
+
+  return (ret, dat)
+
+
+def random_can_messages(n):
+  msgs = []
+  for _ in range(n):
+    address = random.randint(0, 0x7ff) if random.random() < 0.7 else random.randint(0x800, 0x1fffffff)
+    dat = random.randbytes(random.choice(DLC_TO_LEN))
+    msgs.append((address, 0, dat, random.randint(0, 2)))
+  return msgs
+
+
+class TestPandaLibCanBuffer(unittest.TestCase):
+  def setUp(self):
+    random.seed(0)
+
+  def test_round_trip(self):
+    for n in (0, 1, 31, 32, 95, 96, 500):
+      msgs = random_can_messages(n)
+      ret, leftover = unpack_can_buffer(b''.join(pack_can_buffer(msgs)))
+      self.assertEqual(leftover, b'')
+      self.assertEqual(ret, [(address, 0, dat, bus) for address, _, dat, bus in msgs])
+
+  def test_pack_matches_reference(self):
+    # covers both the python path and the vectorized path, including the chunk boundaries
+    for n in list(range(40)) + [95, 96, 100, 1000]:
+      msgs = random_can_messages(n)
+      snds = pack_can_buffer(msgs)
+      self.assertEqual(snds, pack_can_buffer_ref(msgs))
+      self.assertTrue(all(type(snd) is bytes for snd in snds))
+
+  def test_unpack_matches_reference(self):
+    for n in list(range(40)) + [95, 96, 100, 1000]:
+      raw = b''.join(pack_can_buffer_ref(random_can_messages(n)))
+      for dat in (raw, raw[:random.randint(0, len(raw))], bytearray(raw)):
+        ret, leftover = unpack_can_buffer(dat)
+        ret_ref, leftover_ref = unpack_can_buffer_ref(dat)
+        self.assertEqual(ret, ret_ref)
+        self.assertEqual(leftover, leftover_ref)
+        self.assertIs(type(leftover), type(dat))
+        self.assertTrue(all(type(d) is type(dat) for _, _, d, _ in ret))
+
+  def test_returned_rejected(self):
+    for n in (5, 50):
+      raw = bytearray(b''.join(pack_can_buffer_ref(random_can_messages(n))))
+      pos = 0
+      while pos < len(raw):
+        flags = random.randint(0, 3)
+        raw[pos + 1] ^= flags
+        raw[pos + 5] ^= flags
+        pos += 6 + DLC_TO_LEN[raw[pos] >> 4]
+
+      ret, _ = unpack_can_buffer(bytes(raw))
+      self.assertEqual(ret, unpack_can_buffer_ref(bytes(raw))[0])
+      self.assertTrue(any(bus >= 128 for _, _, _, bus in ret))
+
+  def test_bad_checksum(self):
+    for n in (5, 50):
+      raw = bytearray(b''.join(pack_can_buffer(random_can_messages(n))))
+      raw[-1] ^= 0x10
+      with self.assertRaises(AssertionError):
+        unpack_can_buffer(bytes(raw))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1,14 +1,14 @@
 import os
 import time
-from collections.abc import Callable
+from collections.abc import Callable, Iterator, Mapping
 
 from cereal import car
 from openpilot.common.params import Params
-from openpilot.selfdrive.car.interfaces import get_interface_attr
-from openpilot.selfdrive.car.fingerprints import eliminate_incompatible_cars, all_legacy_fingerprint_cars
+from openpilot.selfdrive.car.fingerprints import ALL_FINGERPRINT_PLATFORMS_MASK, FINGERPRINT_PLATFORMS, compatible_cars_mask
 from openpilot.selfdrive.car.vin import get_vin, is_valid_vin, VIN_UNKNOWN
 from openpilot.selfdrive.car.fw_versions import get_fw_versions_ordered, get_present_ecus, match_fw_to_car, set_obd_multiplexing
 from openpilot.selfdrive.car.mock.values import CAR as MOCK
+from openpilot.selfdrive.car.values import PLATFORMS
 from openpilot.common.swaglog import cloudlog
 import cereal.messaging as messaging
 from openpilot.selfdrive.car import gen_empty_fingerprint
@@ -43,35 +43,60 @@ def get_one_can(logcan):
       return can
 
 
+def load_interface(brand_name: str) -> tuple:
+  path = f'openpilot.selfdrive.car.{brand_name}'
+  CarInterface = __import__(path + '.interface', fromlist=['CarInterface']).CarInterface
+  CarState = __import__(path + '.carstate', fromlist=['CarState']).CarState
+  CarController = __import__(path + '.carcontroller', fromlist=['CarController']).CarController
+  return CarInterface, CarController, CarState
+
+
 def load_interfaces(brand_names):
   ret = {}
   for brand_name in brand_names:
-    path = f'openpilot.selfdrive.car.{brand_name}'
-    CarInterface = __import__(path + '.interface', fromlist=['CarInterface']).CarInterface
-    CarState = __import__(path + '.carstate', fromlist=['CarState']).CarState
-    CarController = __import__(path + '.carcontroller', fromlist=['CarController']).CarController
+    brand_interface = load_interface(brand_name)
     for model_name in brand_names[brand_name]:
-      ret[model_name] = (CarInterface, CarController, CarState)
+      ret[model_name] = brand_interface
   return ret
 
 
+class CarInterfaces(Mapping):
+  """Platform name to (CarInterface, CarController, CarState), importing each brand's modules on first use"""
+  def __init__(self, brand_names: dict[str, list[str]]):
+    self.brands = {model_name: brand_name for brand_name, model_names in brand_names.items() for model_name in model_names}
+    self.loaded: dict[str, tuple] = {}
+
+  def __getitem__(self, model_name: str) -> tuple:
+    brand_name = self.brands[model_name]
+    if brand_name not in self.loaded:
+      self.loaded[brand_name] = load_interface(brand_name)
+    return self.loaded[brand_name]
+
+  def __iter__(self) -> Iterator[str]:
+    return iter(self.brands)
+
+  def __len__(self) -> int:
+    return len(self.brands)
+
+
 def _get_interface_names() -> dict[str, list[str]]:
-  # returns a dict of brand name and its respective models
-  brand_names = {}
-  for brand_name, brand_models in get_interface_attr("CAR").items():
-    brand_names[brand_name] = [model.value for model in brand_models]
+  # returns a dict of brand name and its respective models, from the platform enums in selfdrive/car/<name>/values.py
+  brand_names: dict[str, list[str]] = {}
+  for model_name, platform in PLATFORMS.items():
+    brand_names.setdefault(type(platform).__module__.split('.')[-2], []).append(model_name)
 
   return brand_names
 
 
-# imports from directory selfdrive/car/<name>/
+# brand modules from directory selfdrive/car/<name>/ are only imported once a platform of that brand is used
 interface_names = _get_interface_names()
-interfaces = load_interfaces(interface_names)
+interfaces = CarInterfaces(interface_names)
 
 
 def can_fingerprint(next_can: Callable) -> tuple[str | None, dict[int, dict]]:
   finger = gen_empty_fingerprint()
-  candidate_cars = {i: all_legacy_fingerprint_cars() for i in [0, 1]}  # attempt fingerprint on both bus 0 and 1
+  # bitsets of FINGERPRINT_PLATFORMS still compatible with the CAN seen so far
+  candidate_cars = dict.fromkeys([0, 1], ALL_FINGERPRINT_PLATFORMS_MASK)  # attempt fingerprint on both bus 0 and 1
   frame = 0
   car_fingerprint = None
   done = False
@@ -90,17 +115,17 @@ def can_fingerprint(next_can: Callable) -> tuple[str | None, dict[int, dict]]:
       for b in candidate_cars:
         # Ignore extended messages and VIN query response.
         if can.src == b and can.address < 0x800 and can.address not in (0x7df, 0x7e0, 0x7e8):
-          candidate_cars[b] = eliminate_incompatible_cars(can, candidate_cars[b])
+          candidate_cars[b] &= compatible_cars_mask(can.address, len(can.dat))
 
     # if we only have one car choice and the time since we got our first
     # message has elapsed, exit
     for b in candidate_cars:
-      if len(candidate_cars[b]) == 1 and frame > FRAME_FINGERPRINT:
+      if candidate_cars[b].bit_count() == 1 and frame > FRAME_FINGERPRINT:
         # fingerprint done
-        car_fingerprint = candidate_cars[b][0]
+        car_fingerprint = FINGERPRINT_PLATFORMS[candidate_cars[b].bit_length() - 1]
 
     # bail if no cars left or we've been waiting for more than 2s
-    failed = (all(len(cc) == 0 for cc in candidate_cars.values()) and frame > FRAME_FINGERPRINT) or frame > 200
+    failed = (all(cc == 0 for cc in candidate_cars.values()) and frame > FRAME_FINGERPRINT) or frame > 200
     succeeded = car_fingerprint is not None
     done = failed or succeeded
 
@@ -25,6 +25,34 @@ def is_valid_for_fingerprint(msg, car_fingerprint: dict[int, int]):
   return (adr in car_fingerprint and car_fingerprint[adr] == len(msg.dat)) or adr >= 0x800
 
 
+# Bitsets of FPv1 platforms, bit i is FINGERPRINT_PLATFORMS[i]
+FINGERPRINT_PLATFORMS = list(_FINGERPRINTS.keys())
+FINGERPRINT_PLATFORM_BITS = {car_name: i for i, car_name in enumerate(FINGERPRINT_PLATFORMS)}
+ALL_FINGERPRINT_PLATFORMS_MASK = (1 << len(FINGERPRINT_PLATFORMS)) - 1
+
+
+def _build_fingerprint_masks() -> dict[tuple[int, int], int]:
+  # (address, length) -> platforms with a fingerprint containing that message
+  masks: dict[tuple[int, int], int] = {}
+  for i, car_name in enumerate(FINGERPRINT_PLATFORMS):
+    for fingerprint in _FINGERPRINTS[car_name]:
+      # add alien debug address
+      for msg in (fingerprint | _DEBUG_ADDRESS).items():
+        masks[msg] = masks.get(msg, 0) | (1 << i)
+  return masks
+
+
+FINGERPRINT_MASKS = _build_fingerprint_masks()
+
+
+def compatible_cars_mask(address: int, length: int) -> int:
+  """Bitset of the platforms that could have sent a message with this address and length"""
+  # ignore addresses that are more than 11 bits
+  if address >= 0x800:
+    return ALL_FINGERPRINT_PLATFORMS_MASK
+  return FINGERPRINT_MASKS.get((address, length), 0)
+
+
 def eliminate_incompatible_cars(msg, candidate_cars):
   """Removes cars that could not have sent msg.
 
@@ -35,18 +63,8 @@ def eliminate_incompatible_cars(msg, candidate_cars):
      Returns:
       A list containing the subset of candidate_cars that could have sent msg.
   """
-  compatible_cars = []
-
-  for car_name in candidate_cars:
-    car_fingerprints = _FINGERPRINTS[car_name]
-
-    for fingerprint in car_fingerprints:
-      # add alien debug address
-      if is_valid_for_fingerprint(msg, fingerprint | _DEBUG_ADDRESS):
-        compatible_cars.append(car_name)
-        break
-
-  return compatible_cars
+  mask = compatible_cars_mask(msg.address, len(msg.dat))
+  return [car_name for car_name in candidate_cars if mask >> FINGERPRINT_PLATFORM_BITS[car_name] & 1]
 
 
 def all_known_cars():
@@ -48,6 +48,76 @@ def build_fw_dict(fw_versions: list[capnp.lib.capnp._DynamicStructBuilder], filt
   return dict(fw_versions_dict)
 
 
+class FwVersionIndex:
+  """Lookup tables over FW_VERSIONS for one brand (or all brands), so matching only looks up the live FW versions"""
+  def __init__(self, match_brand: str = None, extra_fw_versions: dict = None):
+    if extra_fw_versions is None:
+      extra_fw_versions = {}
+
+    self.candidates = frozenset(c for c in FW_VERSIONS if is_brand(MODEL_TO_BRAND[c], match_brand))
+
+    # fuzzy: (addr, sub_addr, fw) to list of candidate cars
+    fuzzy: defaultdict[tuple[int, int | None, bytes], list[str]] = defaultdict(list)
+    # exact: per ECU, the candidates that have it and the candidates that must have it present,
+    # and per ECU and FW version the candidates that accept it
+    ecu_candidates: defaultdict[tuple, set[str]] = defaultdict(set)
+    ecu_required: defaultdict[tuple, set[str]] = defaultdict(set)
+    version_candidates: defaultdict[tuple, set[str]] = defaultdict(set)
+
+    for candidate, fw_by_addr in FW_VERSIONS.items():
+      if candidate not in self.candidates:
+        continue
+
+      config = FW_QUERY_CONFIGS[MODEL_TO_BRAND[candidate]]
+      for ecu, fws in fw_by_addr.items():
+        # These ECUs are known to be shared between models (EPS only between hybrid/ICE version)
+        # Getting this exactly right isn't crucial, but excluding camera and radar makes it almost
+        # impossible to get 3 matching versions, even if two models with shared parts are released at the same
+        # time and only one is in our database.
+        if ecu[0] not in FUZZY_EXCLUDE_ECUS:
+          for f in fws:
+            fuzzy[(ecu[1], ecu[2], f)].append(candidate)
+
+        # Virtual debug ecu doesn't need to match the database
+        if ecu[0] == Ecu.debug:
+          continue
+
+        ecu_candidates[ecu].add(candidate)
+        # Some models can sometimes miss an ecu, or show on two different addresses
+        # FIXME: this logic can be improved to be more specific, should require one of the two addresses
+        if ecu[0] in ESSENTIAL_ECUS and candidate not in config.non_essential_ecus.get(ecu[0], []):
+          ecu_required[ecu].add(candidate)
+        for f in fws + extra_fw_versions.get(candidate, {}).get(ecu, []):
+          version_candidates[(ecu, f)].add(candidate)
+
+    self.fuzzy = {k: tuple(v) for k, v in fuzzy.items()}
+    self.ecus = {ecu: (frozenset(c), frozenset(ecu_required[ecu])) for ecu, c in ecu_candidates.items()}
+    self.versions = {k: frozenset(v) for k, v in version_candidates.items()}
+
+  def match_exact(self, live_fw_versions: LiveFwVersions) -> set[str]:
+    invalid: set[str] = set()
+    for ecu, (candidates, required) in self.ecus.items():
+      found_versions = live_fw_versions.get(ecu[1:], set())
+      if not len(found_versions):
+        # missing non-essential ECUs are ignored
+        invalid |= required
+      else:
+        valid = set().union(*[self.versions.get((ecu, found_version), ()) for found_version in found_versions])
+        invalid |= candidates - valid
+
+    return set(self.candidates - invalid)
+
+
+FW_INDEXES: dict[str | None, FwVersionIndex] = {}
+
+
+def get_fw_index(match_brand: str = None) -> FwVersionIndex:
+  # built on first use for each brand filter, FW_VERSIONS doesn't change at runtime
+  if match_brand not in FW_INDEXES:
+    FW_INDEXES[match_brand] = FwVersionIndex(match_brand)
+  return FW_INDEXES[match_brand]
+
+
 class MatchFwToCar(Protocol):
   def __call__(self, live_fw_versions: LiveFwVersions, match_brand: str = None, log: bool = True) -> set[str]:
     ...
@@ -58,24 +128,8 @@ def match_fw_to_car_fuzzy(live_fw_versions: LiveFwVersions, match_brand: str = N
   that were matched uniquely to that specific car. If multiple ECUs uniquely match to different cars
   the match is rejected."""
 
-  # Build lookup table from (addr, sub_addr, fw) to list of candidate cars
-  all_fw_versions = defaultdict(list)
-  for candidate, fw_by_addr in FW_VERSIONS.items():
-    if not is_brand(MODEL_TO_BRAND[candidate], match_brand):
-      continue
-
-    if candidate == exclude:
-      continue
-
-    for addr, fws in fw_by_addr.items():
-      # These ECUs are known to be shared between models (EPS only between hybrid/ICE version)
-      # Getting this exactly right isn't crucial, but excluding camera and radar makes it almost
-      # impossible to get 3 matching versions, even if two models with shared parts are released at the same
-      # time and only one is in our database.
-      if addr[0] in FUZZY_EXCLUDE_ECUS:
-        continue
-      for f in fws:
-        all_fw_versions[(addr[1], addr[2], f)].append(candidate)
+  # Lookup table from (addr, sub_addr, fw) to candidate cars
+  all_fw_versions = get_fw_index(match_brand).fuzzy
 
   matched_ecus = set()
   match: str | None = None
@@ -83,7 +137,9 @@ def match_fw_to_car_fuzzy(live_fw_versions: LiveFwVersions, match_brand: str = N
     ecu_key = (addr[0], addr[1])
     for version in versions:
       # All cars that have this FW response on the specified address
-      candidates = all_fw_versions[(*ecu_key, version)]
+      candidates = all_fw_versions.get((*ecu_key, version), ())
+      if exclude is not None:
+        candidates = tuple(c for c in candidates if c != exclude)
 
       if len(candidates) == 1:
         matched_ecus.add(ecu_key)
@@ -108,40 +164,8 @@ def match_fw_to_car_exact(live_fw_versions: LiveFwVersions, match_brand: str = N
   FW versions for a list of "essential" ECUs. If an ECU is not considered
   essential the FW version can be missing to get a fingerprint, but if it's present it
   needs to match the database."""
-  if extra_fw_versions is None:
-    extra_fw_versions = {}
-
-  invalid = set()
-  candidates = {c: f for c, f in FW_VERSIONS.items() if
-                is_brand(MODEL_TO_BRAND[c], match_brand)}
-
-  for candidate, fws in candidates.items():
-    config = FW_QUERY_CONFIGS[MODEL_TO_BRAND[candidate]]
-    for ecu, expected_versions in fws.items():
-      expected_versions = expected_versions + extra_fw_versions.get(candidate, {}).get(ecu, [])
-      ecu_type = ecu[0]
-      addr = ecu[1:]
-
-      found_versions = live_fw_versions.get(addr, set())
-      if not len(found_versions):
-        # Some models can sometimes miss an ecu, or show on two different addresses
-        # FIXME: this logic can be improved to be more specific, should require one of the two addresses
-        if candidate in config.non_essential_ecus.get(ecu_type, []):
-          continue
-
-        # Ignore non essential ecus
-        if ecu_type not in ESSENTIAL_ECUS:
-          continue
-
-      # Virtual debug ecu doesn't need to match the database
-      if ecu_type == Ecu.debug:
-        continue
-
-      if not any(found_version in expected_versions for found_version in found_versions):
-        invalid.add(candidate)
-        break
-
-  return set(candidates.keys()) - invalid
+  index = FwVersionIndex(match_brand, extra_fw_versions) if extra_fw_versions else get_fw_index(match_brand)
+  return index.match_exact(live_fw_versions)
 
 
 def match_fw_to_car(fw_versions: list[capnp.lib.capnp._DynamicStructBuilder], allow_exact: bool = True, allow_fuzzy: bool = True,
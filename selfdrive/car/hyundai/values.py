@@ -1,6 +1,7 @@
 import re
 from dataclasses import dataclass, field
 from enum import Enum, IntFlag
+from functools import lru_cache
 
 from cereal import car
 from panda.python import uds
@@ -657,6 +658,13 @@ def get_platform_codes(fw_versions: list[bytes]) -> set[tuple[bytes, bytes | Non
   return codes
 
 
+@lru_cache(maxsize=None)
+def get_expected_platform_codes(fw_versions: tuple[bytes, ...]) -> tuple[set[bytes], set[bytes]]:
+  # platform codes and dates of database FW versions are parsed once, not on every fingerprinting attempt
+  codes = get_platform_codes(list(fw_versions))
+  return {code for code, _ in codes}, {date for _, date in codes if date is not None}
+
+
 def match_fw_to_car_fuzzy(live_fw_versions, offline_fw_versions) -> set[str]:
   # Non-electric CAN FD platforms often do not have platform code specifiers needed
   # to distinguish between hybrid and ICE. All EVs so far are either exclusively
@@ -675,9 +683,7 @@ def match_fw_to_car_fuzzy(live_fw_versions, offline_fw_versions) -> set[str]:
         continue
 
       # Expected platform codes & dates
-      codes = get_platform_codes(expected_versions)
-      expected_platform_codes = {code for code, _ in codes}
-      expected_dates = {date for _, date in codes if date is not None}
+      expected_platform_codes, expected_dates = get_expected_platform_codes(tuple(expected_versions))
 
       # Found platform codes & dates
       codes = get_platform_codes(live_fw_versions.get(addr, set()))
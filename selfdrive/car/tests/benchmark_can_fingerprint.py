@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+import random
+import time
+
+from openpilot.selfdrive.car.car_helpers import FRAME_FINGERPRINT, can_fingerprint
+from openpilot.selfdrive.car.fingerprints import _FINGERPRINTS as FINGERPRINTS, eliminate_incompatible_cars
+from openpilot.selfdrive.car.tests.test_can_fingerprint import can_fingerprint_linear, eliminate_incompatible_cars_linear, random_can_frames
+
+N = 200
+
+
+def run(fingerprint_func, routes):
+  results = []
+  num_msgs = 0
+  t = time.perf_counter()
+  for frames in routes:
+    frame_iter = iter(frames)
+
+    def next_can():
+      nonlocal num_msgs
+      can = next(frame_iter)  # noqa: B023
+      num_msgs += len(can.can)
+      return can
+
+    results.append(fingerprint_func(next_can))
+  return results, num_msgs / (time.perf_counter() - t)
+
+
+def run_eliminate(eliminate_func, msgs):
+  # elimination alone, from all platforms like the first frames of can_fingerprint
+  candidates = list(FINGERPRINTS)
+  t = time.perf_counter()
+  results = [eliminate_func(msg, candidates) for msg in msgs]
+  return results, len(msgs) / (time.perf_counter() - t)
+
+
+if __name__ == "__main__":
+  random.seed(0)
+  routes = [random_can_frames(FRAME_FINGERPRINT * 2 + 5) for _ in range(N)]
+
+  msgs = [msg for frames in routes[:20] for can in frames for msg in can.can if msg.address < 0x800]
+  results = []
+  for name, eliminate_func in (("linear", eliminate_incompatible_cars_linear), ("bitset", eliminate_incompatible_cars)):
+    res, rate = run_eliminate(eliminate_func, msgs)
+    results.append(res)
+    print(f"eliminate_incompatible_cars {name}: {rate:10.0f} CAN msgs/s")
+  assert results[0] == results[1]
+
+  results = []
+  for name, fingerprint_func in (("linear", can_fingerprint_linear), ("bitset", can_fingerprint)):
+    res, rate = run(fingerprint_func, routes)
+    results.append(res)
+    print(f"can_fingerprint {name}: {rate:10.0f} CAN msgs/s")
+  assert results[0] == results[1]
+  print(f"{sum(r[0] is not None for r in results[0])}/{N} routes fingerprinted")
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+import random
+import time
+
+from openpilot.selfdrive.car.fw_versions import VERSIONS, match_fw_to_car_exact, match_fw_to_car_fuzzy
+from openpilot.selfdrive.car.tests.test_fw_fingerprint import match_fw_to_car_exact_linear, match_fw_to_car_fuzzy_linear, random_live_fw_versions
+
+N = 200
+
+
+def time_per_query(match, queries):
+  t = time.perf_counter()
+  results = [match(live_fw_versions, brand) for brand, live_fw_versions in queries]
+  return (time.perf_counter() - t) / len(queries), results
+
+
+if __name__ == "__main__":
+  random.seed(0)
+  queries = [(brand, random_live_fw_versions(brand)) for brand, cars in VERSIONS.items() if len(cars) for _ in range(N)]
+
+  for name, linear, indexed in (("exact", match_fw_to_car_exact_linear, match_fw_to_car_exact),
+                                ("fuzzy", match_fw_to_car_fuzzy_linear, lambda fws, brand: match_fw_to_car_fuzzy(fws, brand, log=False))):
+    # first query of each brand builds its index, shared by both matchers
+    t = time.perf_counter()
+    for brand in VERSIONS:
+      indexed({}, brand)
+    build_time = time.perf_counter() - t
+
+    t_linear, expected = time_per_query(linear, queries)
+    t_indexed, results = time_per_query(indexed, queries)
+    assert results == expected
+    print(f"{name}: linear {t_linear * 1e6:8.1f} us/query, indexed {t_indexed * 1e6:6.1f} us/query, {len(queries)} queries")
+    print(f"{name}: index build {build_time * 1e3:.1f} ms for all brands")
@@ -1,10 +1,74 @@
 #!/usr/bin/env python3
 from parameterized import parameterized
+import random
 import unittest
 
 from cereal import log, messaging
+from openpilot.selfdrive.car import gen_empty_fingerprint
 from openpilot.selfdrive.car.car_helpers import FRAME_FINGERPRINT, can_fingerprint
-from openpilot.selfdrive.car.fingerprints import _FINGERPRINTS as FINGERPRINTS
+from openpilot.selfdrive.car.fingerprints import _FINGERPRINTS as FINGERPRINTS, _DEBUG_ADDRESS, eliminate_incompatible_cars, \
+                                                 is_valid_for_fingerprint
+
+
+def eliminate_incompatible_cars_linear(msg, candidate_cars):
+  """Reference for eliminate_incompatible_cars: checks msg against every fingerprint of every candidate"""
+  compatible_cars = []
+  for car_name in candidate_cars:
+    for fingerprint in FINGERPRINTS[car_name]:
+      if is_valid_for_fingerprint(msg, fingerprint | _DEBUG_ADDRESS):
+        compatible_cars.append(car_name)
+        break
+  return compatible_cars
+
+
+def can_fingerprint_linear(next_can):
+  """Reference for can_fingerprint: candidate lists narrowed with eliminate_incompatible_cars_linear"""
+  finger = gen_empty_fingerprint()
+  candidate_cars = {i: list(FINGERPRINTS.keys()) for i in [0, 1]}
+  frame = 0
+  car_fingerprint = None
+  done = False
+
+  while not done:
+    a = next_can()
+    for can in a.can:
+      if can.src < 128:
+        if can.src not in finger:
+          finger[can.src] = {}
+        finger[can.src][can.address] = len(can.dat)
+
+      for b in candidate_cars:
+        if can.src == b and can.address < 0x800 and can.address not in (0x7df, 0x7e0, 0x7e8):
+          candidate_cars[b] = eliminate_incompatible_cars_linear(can, candidate_cars[b])
+
+    for b in candidate_cars:
+      if len(candidate_cars[b]) == 1 and frame > FRAME_FINGERPRINT:
+        car_fingerprint = candidate_cars[b][0]
+
+    failed = (all(len(cc) == 0 for cc in candidate_cars.values()) and frame > FRAME_FINGERPRINT) or frame > 200
+    done = failed or car_fingerprint is not None
+    frame += 1
+
+  return car_fingerprint, finger
+
+
+def random_can_frames(num_frames):
+  # CAN from one or two platforms' fingerprints on random buses, with some unknown addresses and wrong lengths
+  platforms = random.sample([p for p, fingerprints in FINGERPRINTS.items() if len(fingerprints)], random.randint(1, 2))
+  msgs = [msg for platform in platforms for msg in random.choice(FINGERPRINTS[platform]).items()]
+  noise = random.choice((0., 0.0005, 0.02))
+  frames = []
+  for _ in range(num_frames):
+    can = messaging.new_message('can', 5)
+    for i in range(5):
+      address, length = random.choice(msgs)
+      if random.random() < noise:
+        address = random.randint(0, 0x900)
+      if random.random() < noise:
+        length = random.randint(1, 8)
+      can.can[i] = log.CanData(address=address, dat=b'\x00' * length, src=random.choice((0, 0, 1, 2, 128)))
+    frames.append(can)
+  return frames
 
 
 class TestCanFingerprint(unittest.TestCase):
@@ -26,6 +90,20 @@ class TestCanFingerprint(unittest.TestCase):
       self.assertEqual(finger[1], fingerprint)
       self.assertEqual(finger[2], {})
 
+  def test_matches_linear(self):
+    random.seed(0)
+    for _ in range(200):
+      frames = random_can_frames(FRAME_FINGERPRINT * 2 + 5)
+      results = []
+      for fingerprint_func in (can_fingerprint, can_fingerprint_linear):
+        frame_iter = iter(frames)
+        results.append(fingerprint_func(lambda: next(frame_iter)))  # noqa: B023
+      self.assertEqual(results[0], results[1])
+
+      candidates = list(FINGERPRINTS)
+      for can in frames[0].can:
+        self.assertEqual(eliminate_incompatible_cars(can, candidates), eliminate_incompatible_cars_linear(can, candidates))
+
   def test_timing(self):
     # just pick any CAN fingerprinting car
     car_model = "CHEVROLET_BOLT_EUV"
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import re
+import subprocess
+import sys
+import unittest
+
+from openpilot.common.basedir import BASEDIR
+from openpilot.selfdrive.car.car_helpers import interface_names, interfaces, load_interfaces
+from openpilot.selfdrive.car.interfaces import get_interface_attr
+
+BRAND_MODULE_RE = re.compile(r'openpilot\.selfdrive\.car\.(\w+)\.(interface|carstate|carcontroller)$')
+
+
+def import_times(code: str) -> dict[str, int]:
+  # cumulative import time in us of each module imported by code, from python -X importtime
+  proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=BASEDIR, capture_output=True, text=True, check=True)
+  times = {}
+  for line in proc.stderr.splitlines():
+    if line.startswith('import time:') and '|' in line:
+      _, cumulative, name = line[len('import time:'):].split('|')
+      if cumulative.strip().isdigit():
+        times[name.strip()] = int(cumulative)
+  return times
+
+
+def loaded_brands(times: dict[str, int]) -> set[str]:
+  return {m.group(1) for m in map(BRAND_MODULE_RE.match, times) if m is not None}
+
+
+class TestCarHelpers(unittest.TestCase):
+  def test_interface_names(self):
+    expected = {brand: sorted(model.value for model in models) for brand, models in get_interface_attr('CAR').items()}
+    self.assertEqual({brand: sorted(models) for brand, models in interface_names.items()}, expected)
+
+  def test_lazy_interfaces_match_eager(self):
+    self.assertEqual(set(interfaces), {model for models in interface_names.values() for model in models})
+    eager = load_interfaces(interface_names)
+    self.assertEqual(len(interfaces), len(eager))
+    for model, brand_interface in eager.items():
+      self.assertEqual(interfaces[model], brand_interface)
+
+  def test_import_loads_no_brands(self):
+    times = import_times('import openpilot.selfdrive.car.car_helpers')
+    self.assertEqual(loaded_brands(times), set())
+    print(f"car_helpers import: {times['openpilot.selfdrive.car.car_helpers'] / 1e3:.1f} ms")
+
+    times = import_times('import openpilot.selfdrive.car.card')
+    self.assertEqual(loaded_brands(times), set())
+    print(f"card import: {times['openpilot.selfdrive.car.card'] / 1e3:.1f} ms")
+
+  def test_loads_used_brand_only(self):
+    times = import_times('from openpilot.selfdrive.car.car_helpers import get_demo_car_params; get_demo_car_params()')
+    self.assertEqual(loaded_brands(times), {'mock'})
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -9,8 +9,9 @@ from unittest import mock
 from cereal import car
 from openpilot.selfdrive.car.car_helpers import interfaces
 from openpilot.selfdrive.car.fingerprints import FW_VERSIONS
-from openpilot.selfdrive.car.fw_versions import FW_QUERY_CONFIGS, FUZZY_EXCLUDE_ECUS, VERSIONS, build_fw_dict, \
-                                                match_fw_to_car, get_brand_ecu_matches, get_fw_versions, get_present_ecus
+from openpilot.selfdrive.car.fw_versions import ESSENTIAL_ECUS, FW_QUERY_CONFIGS, FUZZY_EXCLUDE_ECUS, MODEL_TO_BRAND, VERSIONS, \
+                                                build_fw_dict, is_brand, match_fw_to_car, match_fw_to_car_exact, match_fw_to_car_fuzzy, \
+                                                get_brand_ecu_matches, get_fw_versions, get_present_ecus
 from openpilot.selfdrive.car.vin import get_vin
 
 CarFw = car.CarParams.CarFw
@@ -19,6 +20,71 @@ Ecu = car.CarParams.Ecu
 ECU_NAME = {v: k for k, v in Ecu.schema.enumerants.items()}
 
 
+def match_fw_to_car_fuzzy_linear(live_fw_versions, match_brand=None, exclude=None):
+  """Reference for match_fw_to_car_fuzzy: builds the FW lookup table on every call"""
+  all_fw_versions = defaultdict(list)
+  for candidate, fw_by_addr in FW_VERSIONS.items():
+    if not is_brand(MODEL_TO_BRAND[candidate], match_brand) or candidate == exclude:
+      continue
+    for addr, fws in fw_by_addr.items():
+      if addr[0] in FUZZY_EXCLUDE_ECUS:
+        continue
+      for f in fws:
+        all_fw_versions[(addr[1], addr[2], f)].append(candidate)
+
+  matched_ecus = set()
+  match = None
+  for addr, versions in live_fw_versions.items():
+    ecu_key = (addr[0], addr[1])
+    for version in versions:
+      candidates = all_fw_versions[(*ecu_key, version)]
+      if len(candidates) == 1:
+        matched_ecus.add(ecu_key)
+        if match is None:
+          match = candidates[0]
+        elif match != candidates[0]:
+          return set()
+
+  return {match} if match and len(matched_ecus) >= 2 else set()
+
+
+def match_fw_to_car_exact_linear(live_fw_versions, match_brand=None, extra_fw_versions=None):
+  """Reference for match_fw_to_car_exact: checks every candidate's ECUs on every call"""
+  if extra_fw_versions is None:
+    extra_fw_versions = {}
+
+  invalid = set()
+  candidates = {c: f for c, f in FW_VERSIONS.items() if is_brand(MODEL_TO_BRAND[c], match_brand)}
+  for candidate, fws in candidates.items():
+    config = FW_QUERY_CONFIGS[MODEL_TO_BRAND[candidate]]
+    for ecu, expected_versions in fws.items():
+      expected_versions = expected_versions + extra_fw_versions.get(candidate, {}).get(ecu, [])
+      ecu_type = ecu[0]
+      found_versions = live_fw_versions.get(ecu[1:], set())
+      if not len(found_versions):
+        if candidate in config.non_essential_ecus.get(ecu_type, []) or ecu_type not in ESSENTIAL_ECUS:
+          continue
+      if ecu_type == Ecu.debug:
+        continue
+      if not any(found_version in expected_versions for found_version in found_versions):
+        invalid.add(candidate)
+        break
+
+  return set(candidates.keys()) - invalid
+
+
+def random_live_fw_versions(brand):
+  # FW from a few of the brand's cars, with some ECUs missing, some unknown versions and some extra responses
+  cars = VERSIONS[brand]
+  live_fw_versions = defaultdict(set)
+  for car_model in random.sample(list(cars), min(len(cars), random.randint(1, 2))):
+    for ecu, fws in cars[car_model].items():
+      if random.random() < 0.2:
+        continue
+      live_fw_versions[ecu[1:]].add(random.choice(fws) if random.random() < 0.9 else b'\x00unknown')
+  return dict(live_fw_versions)
+
+
 class FakeSocket:
   def receive(self, non_blocking=False):
     pass
@@ -188,6 +254,29 @@ class TestFwFingerprint(unittest.TestCase):
           self.assertFalse(request_obj.auxiliary and request_obj.bus == 1 and request_obj.obd_multiplexing,
                            f"{brand.title()}: OBD multiplexed request is marked auxiliary: {request_obj}")
 
+  def test_index_matches_linear(self):
+    random.seed(0)
+    for brand, cars in VERSIONS.items():
+      if not len(cars):
+        continue
+      with self.subTest(brand=brand):
+        for _ in range(200):
+          live_fw_versions = random_live_fw_versions(brand)
+          for match_brand in (brand, None):
+            self.assertEqual(match_fw_to_car_exact(live_fw_versions, match_brand),
+                             match_fw_to_car_exact_linear(live_fw_versions, match_brand))
+            self.assertEqual(match_fw_to_car_fuzzy(live_fw_versions, match_brand, log=False),
+                             match_fw_to_car_fuzzy_linear(live_fw_versions, match_brand))
+
+          exclude = random.choice(list(cars))
+          self.assertEqual(match_fw_to_car_fuzzy(live_fw_versions, brand, log=False, exclude=exclude),
+                           match_fw_to_car_fuzzy_linear(live_fw_versions, brand, exclude=exclude))
+
+          # versions missing from the database for one car
+          extra = {exclude: {ecu: [f] for ecu in cars[exclude] for f in live_fw_versions.get(ecu[1:], [])}}
+          self.assertEqual(match_fw_to_car_exact(live_fw_versions, brand, extra_fw_versions=extra),
+                           match_fw_to_car_exact_linear(live_fw_versions, brand, extra_fw_versions=extra))
+
   def test_brand_ecu_matches(self):
     empty_response = {brand: set() for brand in FW_QUERY_CONFIGS}
     self.assertEqual(get_brand_ecu_matches(set()), empty_response)
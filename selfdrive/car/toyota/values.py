@@ -2,6 +2,7 @@ import re
 from collections import defaultdict
 from dataclasses import dataclass, field
 from enum import Enum, IntFlag
+from functools import lru_cache
 
 from cereal import car
 from openpilot.common.conversions import Conversions as CV
@@ -415,6 +416,12 @@ def get_platform_codes(fw_versions: list[bytes]) -> dict[bytes, set[bytes]]:
   return dict(codes)
 
 
+@lru_cache(maxsize=None)
+def get_expected_platform_codes(fw_versions: tuple[bytes, ...]) -> dict[bytes, set[bytes]]:
+  # platform codes of database FW versions are parsed once, not on every fingerprinting attempt
+  return get_platform_codes(list(fw_versions))
+
+
 def match_fw_to_car_fuzzy(live_fw_versions, offline_fw_versions) -> set[str]:
   candidates = set()
 
@@ -429,7 +436,7 @@ def match_fw_to_car_fuzzy(live_fw_versions, offline_fw_versions) -> set[str]:
         continue
 
       # Expected platform codes & versions
-      expected_platform_codes = get_platform_codes(expected_versions)
+      expected_platform_codes = get_expected_platform_codes(tuple(expected_versions))
 
       # Found platform codes & versions
       found_platform_codes = get_platform_codes(live_fw_versions.get(addr, set()))
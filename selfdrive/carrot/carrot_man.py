@@ -1,7 +1,8 @@
+import asyncio
 import numpy as np
 import time
-import threading
 import zmq
+import zmq.asyncio
 import os
 import subprocess
 import json
@@ -19,67 +20,78 @@ NetworkType = log.DeviceState.NetworkType
 class CarrotMan:
   def __init__(self):
     self.params = Params()
-    self.show_panda_debug = False
+    self.is_onroad = False
+    self.carrot_exception = False
+    self.panda_debug_task = None
 
-    self.carrot_zmq_thread = threading.Thread(target=self.carrot_cmd_zmq, args=[])
-    self.carrot_zmq_thread.daemon = True
-    self.carrot_zmq_thread.start()
+  def update_params(self):
+    self.is_onroad = self.params.get_bool("IsOnroad")
+    self.carrot_exception = self.params.get_bool("CarrotException")
 
-    self.carrot_panda_debug_thread = threading.Thread(target=self.carrot_panda_debug, args=[])
-    self.carrot_panda_debug_thread.daemon = True
-    self.carrot_panda_debug_thread.start()
-
-  def carrot_man_thread(self):
-    context = zmq.Context()
-    socket = context.socket(zmq.REP)
-    socket.bind("tcp://*:7711")
-
-    poller = zmq.Poller()
-    poller.register(socket, zmq.POLLIN)
+  async def run(self):
+    self.save_toggle_values()
 
+    context = zmq.asyncio.Context()
+    try:
+      async with asyncio.TaskGroup() as tg:
+        tg.create_task(self.carrot_cmd_zmq(context))
+        tg.create_task(self.carrot_man_zmq(context))
+        tg.create_task(self.carrot_status())
+    finally:
+      context.destroy(linger=0)
+
+  async def carrot_man_zmq(self, context, port=7711):
+    with context.socket(zmq.REP) as socket:
+      socket.bind(f"tcp://*:{port}")
+
+      while True:
+        message = await socket.recv()
+        try:
+          data = json.loads(message)
+          print(f"Received request: {message}")
+        except Exception as e:
+          print(f"carrot_man_zmq: error...: {e}")
+        response = {
+            "status": "ok",
+            "data": "Hello from Python ZeroMQ server!"
+        }
+        await socket.send(json.dumps(response).encode('utf-8'))
+
+  async def carrot_status(self):
     isOnroadCount = 0
     is_tmux_sent = False
     sm = messaging.SubMaster(['deviceState'])
 
-    self.save_toggle_values()
-
     while True:
       try:
         sm.update(0)
-
-        socks = dict(poller.poll(100))
-
-        if socket in socks and socks[socket] == zmq.POLLIN:
-          message = socket.recv(zmq.NOBLOCK)
-          data = json.loads(message)
-          print(f"Received request: {message}")
-          response = {
-              "status": "ok",
-              "data": "Hello from Python ZeroMQ server!"
-          }
-          socket.send(json.dumps(response).encode('utf-8'))
-        else:
-          isOnroadCount = isOnroadCount + 1 if self.params.get_bool("IsOnroad") else 0
-          if isOnroadCount == 0:
-            is_tmux_sent = False
-          if isOnroadCount == 1:
-            self.show_panda_debug = True
-
-          network_type = sm['deviceState'].networkType# if not force_wifi else NetworkType.wifi
-          networkConnected = False if network_type == NetworkType.none else True
-
-          if isOnroadCount == 500:
-            self.make_tmux_data()
-          if isOnroadCount > 500 and not is_tmux_sent and networkConnected:
-            self.send_tmux("Ekdrmsvkdlffjt7710", "onroad", send_settings = True)
-            is_tmux_sent = True
-          if self.params.get_bool("CarrotException") and networkConnected:
-            self.params.put_bool("CarrotException", False)
-            self.make_tmux_data()
-            self.send_tmux("Ekdrmsvkdlffjt7710", "exception")          
+        # params only change from the UI, once a second is plenty
+        self.update_params()
+
+        isOnroadCount = isOnroadCount + 1 if self.is_onroad else 0
+        if isOnroadCount == 0:
+          is_tmux_sent = False
+        if isOnroadCount == 1 and (self.panda_debug_task is None or self.panda_debug_task.done()):
+          self.panda_debug_task = asyncio.create_task(self.carrot_panda_debug())
+
+        network_type = sm['deviceState'].networkType# if not force_wifi else NetworkType.wifi
+        networkConnected = False if network_type == NetworkType.none else True
+
+        if isOnroadCount == 50:
+          await asyncio.to_thread(self.make_tmux_data)
+        if isOnroadCount > 50 and not is_tmux_sent and networkConnected:
+          await asyncio.to_thread(self.send_tmux, "Ekdrmsvkdlffjt7710", "onroad", send_settings=True)
+          is_tmux_sent = True
+        if self.carrot_exception and networkConnected:
+          self.params.put_bool("CarrotException", False)
+          self.carrot_exception = False
+          await asyncio.to_thread(self.make_tmux_data)
+          await asyncio.to_thread(self.send_tmux, "Ekdrmsvkdlffjt7710", "exception")
 
       except Exception as e:
-        print(f"carrot_man_thread: error...: {e}")
+        print(f"carrot_status: error...: {e}")
+
+      await asyncio.sleep(1.)
 
   def make_tmux_data(self):
     try:
@@ -130,18 +142,12 @@ class CarrotMan:
 
     ftp.quit()
 
-  def carrot_panda_debug(self):
-    #time.sleep(2)
-    while True:
-      if self.show_panda_debug:
-        self.show_panda_debug = False
-        try:
-          result = subprocess.run("/data/openpilot/selfdrive/debug/debug_console_carrot.py", shell=True)
-        except Exception as e:
-          print("debug_console error")
-          time.sleep(2)
-      else:
-        time.sleep(1)
+  async def carrot_panda_debug(self):
+    try:
+      proc = await asyncio.create_subprocess_shell("/data/openpilot/selfdrive/debug/debug_console_carrot.py")
+      await proc.wait()
+    except Exception as e:
+      print("debug_console error")
 
   def save_toggle_values(self):
     toggle_values = fleet.get_all_toggle_values()
@@ -149,42 +155,50 @@ class CarrotMan:
     with open(file_path, 'w') as file:
       json.dump(toggle_values, file, indent=2) 
 
-  def carrot_cmd_zmq(self):
+  async def carrot_cmd_zmq(self, context, port=7710):
 
-    context = zmq.Context()
-    socket = context.socket(zmq.REP)
-    socket.bind("tcp://*:7710")
+    with context.socket(zmq.REP) as socket:
+      socket.bind(f"tcp://*:{port}")
 
-    while True:
-      message = socket.recv()
-      #print(f"Received request: {message}")
-      json_obj = json.loads(message.decode())
-      if 'echo_cmd' in json_obj:
+      while True:
+        message = await socket.recv()
+        #print(f"Received request: {message}")
         try:
-          result = subprocess.run(json_obj['echo_cmd'], shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=False)
-          try:
-            stdout = result.stdout.decode('utf-8')
-          except UnicodeDecodeError:
-            stdout = result.stdout.decode('euc-kr', 'ignore')
-                
-          echo = json.dumps({"echo_cmd": json_obj['echo_cmd'], "result": stdout})
+          response = await self.carrot_cmd(json.loads(message.decode()))
         except Exception as e:
-          echo = json.dumps({"echo_cmd": json_obj['echo_cmd'], "result": f"exception error: {str(e)}"})
-        #print(echo)
-        socket.send(echo.encode())
-      elif 'tmux_send' in json_obj:
-        self.make_tmux_data()
-        self.send_tmux(json_obj['tmux_send'], "tmux_send")
-        echo = json.dumps({"tmux_send": json_obj['tmux_send'], "result": "success"})
-        socket.send(echo.encode())
+          # a bad request mustn't take down the other servers in run()'s task group
+          print(f"carrot_cmd_zmq: error...: {e}")
+          response = {"result": f"exception error: {str(e)}"}
+        # REP has to answer before it can receive the next request
+        await socket.send(json.dumps(response).encode())
+
+  async def carrot_cmd(self, json_obj):
+    if 'echo_cmd' in json_obj:
+      try:
+        proc = await asyncio.create_subprocess_shell(json_obj['echo_cmd'], stdout=asyncio.subprocess.PIPE,
+                                                     stderr=asyncio.subprocess.PIPE)
+        result_stdout, _ = await proc.communicate()
+        try:
+          stdout = result_stdout.decode('utf-8')
+        except UnicodeDecodeError:
+          stdout = result_stdout.decode('euc-kr', 'ignore')
+
+        return {"echo_cmd": json_obj['echo_cmd'], "result": stdout}
+      except Exception as e:
+        return {"echo_cmd": json_obj['echo_cmd'], "result": f"exception error: {str(e)}"}
+    elif 'tmux_send' in json_obj:
+      await asyncio.to_thread(self.make_tmux_data)
+      await asyncio.to_thread(self.send_tmux, json_obj['tmux_send'], "tmux_send")
+      return {"tmux_send": json_obj['tmux_send'], "result": "success"}
+    return {"result": "unknown command"}
 
 def main():
   print("CarrotManager Started")
   #print("Carrot GitBranch = {}, {}".format(Params().get("GitBranch"), Params().get("GitCommitDate")))
-  carrot_man = CarrotMan()  
+  carrot_man = CarrotMan()
   while True:
     try:
-      carrot_man.carrot_man_thread()
+      asyncio.run(carrot_man.run())
     except Exception as e:
       print(f"carrot_man error...: {e}")
       time.sleep(10)
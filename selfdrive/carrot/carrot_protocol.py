@@ -0,0 +1,71 @@
+"""
+Fixed layout binary alternative to the JSON navigation packets sent to road_speed_limiter.
+
+Packets start with MAGIC so they can never be mistaken for JSON, the server accepts both and
+advertises VERSION as "CarrotProtocol" in its broadcast, so the app only switches over when
+the device understands it. All values little-endian:
+
+  header   MAGIC, version u8, flags u8, active i32 (valid if flags & FLAG_ACTIVE)
+  numbers  INT_FIELDS as i32, FLOAT_FIELDS as f64, timeStamp as i64
+  lengths  u16 byte length of each of TEXT_FIELDS
+  text     TEXT_FIELDS as utf-8, back to back. OPTIONAL_TEXT_FIELDS are left out of the
+           decoded packet when empty, like a JSON packet without them
+"""
+import struct
+
+MAGIC = b'CRTB'
+VERSION = 1
+
+FLAG_ACTIVE = 1
+
+INT_FIELDS = ('nRoadLimitSpeed', 'nTBTTurnType', 'nTBTTurnTypeNext', 'nTBTNextRoadWidth', 'nSdiType', 'nSdiSpeedLimit',
+              'nSdiPlusType', 'nSdiPlusSpeedLimit', 'nSdiBlockType', 'nSdiBlockSpeed', 'roadcate', 'nLaneCount',
+              'nGoPosDist', 'nGoPosTime')
+FLOAT_FIELDS = ('nSdiDist', 'nSdiPlusDist', 'nSdiBlockDist', 'nTBTDist', 'nTBTDistNext', 'vpPosPointLat', 'vpPosPointLon',
+                'nPosAngle', 'nPosSpeed')
+NUMBER_FIELDS = INT_FIELDS + FLOAT_FIELDS + ('timeStamp',)
+TEXT_FIELDS = ('szNearDirName', 'szFarDirName', 'szTBTMainText', 'szTBTMainTextNext', 'szPosRoadName',
+               'type', 'value', 'apilot_cmd', 'apilot_arg')
+OPTIONAL_TEXT_FIELDS = frozenset(('type', 'value', 'apilot_cmd', 'apilot_arg'))
+
+HEADER = struct.Struct('<4sBBi')
+# everything after the header up to the text, unpacked in one go
+FIXED = struct.Struct('<' + 'i' * len(INT_FIELDS) + 'd' * len(FLOAT_FIELDS) + 'q' + 'H' * len(TEXT_FIELDS))
+
+
+def is_binary(data: bytes) -> bool:
+  return data[:len(MAGIC)] == MAGIC
+
+
+def encode(packet: dict) -> bytes:
+  apilot = packet['apilot']
+  active = packet.get('active')
+  numbers = [int(apilot[name]) for name in INT_FIELDS] + [float(apilot[name]) for name in FLOAT_FIELDS] + [int(apilot['timeStamp'])]
+  texts = [(apilot.get(name) or '').encode('utf-8') for name in TEXT_FIELDS]
+
+  header = HEADER.pack(MAGIC, VERSION, FLAG_ACTIVE if active is not None else 0, active or 0)
+  return b''.join([header, FIXED.pack(*numbers, *map(len, texts)), *texts])
+
+
+def decode(data: bytes) -> dict:
+  """Decodes a binary packet into the same dict json.loads() gives for the equivalent JSON packet"""
+  magic, version, flags, active = HEADER.unpack_from(data)
+  if magic != MAGIC:
+    raise ValueError("not a binary carrot packet")
+  if version != VERSION:
+    raise ValueError(f"unsupported carrot protocol version {version}")
+
+  fixed = FIXED.unpack_from(data, HEADER.size)
+  apilot = dict(zip(NUMBER_FIELDS, fixed, strict=False))
+  offset = HEADER.size + FIXED.size
+  for name, size in zip(TEXT_FIELDS, fixed[len(NUMBER_FIELDS):], strict=True):
+    if size or name not in OPTIONAL_TEXT_FIELDS:
+      apilot[name] = data[offset:offset + size].decode('utf-8')
+    offset += size
+  if offset != len(data):
+    raise ValueError(f"carrot packet size mismatch, {offset} != {len(data)}")
+
+  packet = {'apilot': apilot}
+  if flags & FLAG_ACTIVE:
+    packet['active'] = active
+  return packet
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import socket
+import unittest
+from unittest import mock
+
+import zmq
+import zmq.asyncio
+
+from openpilot.selfdrive.carrot.carrot_man import CarrotMan
+
+
+def free_port():
+  with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    return s.getsockname()[1]
+
+
+class TestCarrotCmd(unittest.TestCase):
+  def test_bad_requests(self):
+    async def run():
+      carrot_man = CarrotMan()
+      port = free_port()
+      context = zmq.asyncio.Context()
+      try:
+        async with asyncio.TaskGroup() as tg:
+          server = tg.create_task(carrot_man.carrot_cmd_zmq(context, port))
+          # stands in for the other servers sharing run()'s task group
+          sibling = tg.create_task(asyncio.sleep(60))
+
+          with context.socket(zmq.REQ) as client:
+            client.connect(f"tcp://127.0.0.1:{port}")
+
+            async def request(message):
+              await client.send(message)
+              return json.loads(await asyncio.wait_for(client.recv(), 10))
+
+            with mock.patch.object(carrot_man, "make_tmux_data", side_effect=OSError("no tmux")):
+              responses = [await request(message) for message in
+                           (b"not json", b"\xff\xfe", b"42", b'{"tmux_send": "x"}', b'{"echo_cmd": "echo hi"}')]
+
+          self.assertFalse(server.done())
+          self.assertFalse(sibling.done())
+          server.cancel()
+          sibling.cancel()
+      finally:
+        context.destroy(linger=0)
+      return responses
+
+    responses = asyncio.run(run())
+    for response in responses[:4]:
+      self.assertTrue(response["result"].startswith("exception error:"), response)
+    self.assertEqual(responses[4], {"echo_cmd": "echo hi", "result": "hi\n"})
+
+
+if __name__ == "__main__":
+  unittest.main()
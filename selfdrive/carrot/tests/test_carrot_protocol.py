@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+import json
+import random
+import timeit
+import unittest
+
+from openpilot.selfdrive.carrot import carrot_protocol
+from openpilot.selfdrive.carrot.carrot_protocol import FLOAT_FIELDS, INT_FIELDS, OPTIONAL_TEXT_FIELDS, TEXT_FIELDS
+
+
+def random_text():
+  return ''.join(random.choice('abc 123 서울 고속도로') for _ in range(random.randint(0, 20)))
+
+
+def random_packet():
+  apilot = {name: random.randint(-1, 300) for name in INT_FIELDS}
+  apilot.update({name: random.uniform(-1, 3000) for name in FLOAT_FIELDS})
+  apilot['vpPosPointLat'], apilot['vpPosPointLon'] = random.uniform(33, 38), random.uniform(124, 131)
+  apilot['timeStamp'] = random.randint(0, 2 ** 42)
+  for name in TEXT_FIELDS:
+    if name not in OPTIONAL_TEXT_FIELDS or random.random() < 0.5:
+      apilot[name] = random_text()
+  packet = {'apilot': apilot}
+  if random.random() < 0.5:
+    packet['active'] = random.randint(0, 3)
+  return packet
+
+
+def json_equivalent(packet):
+  # empty optional text is the same as leaving it out of the JSON packet
+  apilot = {k: v for k, v in packet['apilot'].items() if k not in OPTIONAL_TEXT_FIELDS or v}
+  return {**packet, 'apilot': apilot}
+
+
+class TestCarrotProtocol(unittest.TestCase):
+  def test_round_trip(self):
+    random.seed(0)
+    for _ in range(1000):
+      packet = random_packet()
+      data = carrot_protocol.encode(packet)
+      self.assertTrue(carrot_protocol.is_binary(data))
+      self.assertEqual(carrot_protocol.decode(data), json_equivalent(json.loads(json.dumps(packet))))
+
+  def test_json_not_binary(self):
+    random.seed(0)
+    self.assertFalse(carrot_protocol.is_binary(json.dumps(random_packet()).encode()))
+
+  def test_invalid(self):
+    random.seed(0)
+    data = carrot_protocol.encode(random_packet())
+    for bad in (data[:-1], data + b'\x00', data[:4] + bytes([carrot_protocol.VERSION + 1]) + data[5:], b'CRTX' + data[4:], data[:10]):
+      with self.assertRaises((ValueError, UnicodeDecodeError, carrot_protocol.struct.error)):
+        carrot_protocol.decode(bad)
+
+  def test_decode_cost(self):
+    random.seed(0)
+    packets = [random_packet() for _ in range(100)]
+    json_data = [json.dumps(p).encode() for p in packets]
+    binary_data = [carrot_protocol.encode(p) for p in packets]
+
+    n = 100
+    t_json = timeit.timeit(lambda: [json.loads(d.decode()) for d in json_data], number=n) / (n * len(packets))
+    t_binary = timeit.timeit(lambda: [carrot_protocol.decode(d) for d in binary_data], number=n) / (n * len(packets))
+    print(f"decode per message: json {t_json * 1e6:.2f} us, {sum(map(len, json_data)) / len(packets):.0f} bytes; " +
+          f"binary {t_binary * 1e6:.2f} us, {sum(map(len, binary_data)) / len(packets):.0f} bytes")
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+import unittest
+import numpy as np
+
+import cereal.messaging as messaging
+from openpilot.common.params import Params
+from openpilot.selfdrive.carrot import carrot_protocol
+from openpilot.selfdrive.carrot.road_speed_limiter import RoadLimitSpeedServer, road_limit_speed_loop
+from openpilot.selfdrive.carrot.tests.test_carrot_protocol import random_packet
+
+
+class TestRoadSpeedLimiter(unittest.TestCase):
+  def setUp(self):
+    self.sock = messaging.sub_sock('roadLimitSpeed', timeout=1000)
+    self.udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+
+    self.started = threading.Event()
+    self.thread = threading.Thread(target=asyncio.run, args=(self.run_server(),))
+    self.thread.start()
+    self.assertTrue(self.started.wait(5))
+
+  def tearDown(self):
+    self.loop.call_soon_threadsafe(self.task.cancel)
+    self.thread.join()
+    self.udp.close()
+
+  async def run_server(self):
+    self.loop = asyncio.get_running_loop()
+    self.task = asyncio.current_task()
+    server = RoadLimitSpeedServer()
+    try:
+      self.port = await server.start(0, broadcast=False)
+      pm = messaging.PubMaster(['roadLimitSpeed'])
+      sm = messaging.SubMaster(['carState', 'liveLocationKalman', 'naviData'])
+      self.started.set()
+      await road_limit_speed_loop(server, pm, sm)
+    except asyncio.CancelledError:
+      pass
+    finally:
+      server.close()
+
+  def send_apilot(self, index):
+    packet = {'apilot': {'type': 'apilotman', 'value': str(index)}}
+    self.udp.sendto(json.dumps(packet).encode(), ('127.0.0.1', self.port))
+
+  def send_packet(self, data):
+    self.udp.sendto(data, ('127.0.0.1', self.port))
+
+  def recv_index(self, index):
+    # roadLimitSpeed is also published on the idle timer, skip until the packet shows up
+    while True:
+      msg = messaging.recv_one(self.sock)
+      self.assertIsNotNone(msg, "roadLimitSpeed not published")
+      if msg.roadLimitSpeed.xIndex == index:
+        return msg
+
+  def test_loopback_latency(self):
+    latencies = []
+    for index in range(1, 201):
+      t = time.monotonic()
+      self.send_apilot(index)
+      self.recv_index(index)
+      latencies.append(time.monotonic() - t)
+      time.sleep(0.01)
+
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1e3
+    print(f"packet to roadLimitSpeed: p50 {p50:.2f} ms, p99 {p99:.2f} ms")
+    # previously up to the 200ms socket wait, plus waiting on liveLocationKalman
+    self.assertLess(p50, 20)
+
+  def test_binary_parity(self):
+    random.seed(0)
+    for index in range(1, 101, 2):
+      packet = random_packet()
+      # nTBTTurnTypeNext notification types have no xTurnInfo, which the loop can't publish
+      packet['apilot'].update({'type': 'apilotman', 'nRoadLimitSpeed': random.randint(0, 300), 'nTBTTurnTypeNext': random.choice((-1, 12, 13, 101, 201))})
+
+      # the same packet as JSON then binary, only xIndex tells them apart
+      packet['apilot']['value'] = str(index)
+      self.send_packet(json.dumps(packet).encode())
+      from_json = self.recv_index(index).roadLimitSpeed.to_dict()
+
+      packet['apilot']['value'] = str(index + 1)
+      self.send_packet(carrot_protocol.encode(packet))
+      from_binary = self.recv_index(index + 1).roadLimitSpeed.to_dict()
+
+      self.assertEqual(from_json.pop('xIndex') + 1, from_binary.pop('xIndex'))
+      self.assertEqual(from_json, from_binary)
+
+  def test_idle(self):
+    messaging.drain_sock_raw(self.sock)
+    t = time.process_time()
+    time.sleep(2.)
+    cpu = time.process_time() - t
+    msgs = messaging.drain_sock(self.sock)
+
+    print(f"idle: {cpu * 1e3:.1f} ms CPU over 2s, {len(msgs)} roadLimitSpeed")
+    self.assertLess(cpu, 0.1)
+    # still published on the 0.2s timer without packets
+    self.assertGreaterEqual(len(msgs), 5)
+
+  def test_params_refresh(self):
+    params = Params()
+    params.put_bool("ShowDebugUI", False)
+    time.sleep(1.5)
+    self.send_apilot(1)
+    self.assertEqual(self.recv_index(1).roadLimitSpeed.xRoadName, "[20]")
+
+    params.put_bool("ShowDebugUI", True)
+    time.sleep(1.5)
+    self.send_apilot(2)
+    self.assertNotEqual(self.recv_index(2).roadLimitSpeed.xRoadName, "[20]")
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 import math
 import os
+import numpy as np
 from enum import IntEnum
 from collections.abc import Callable
 
@@ -45,13 +46,20 @@ class ET:
 
 # get event name from enum
 EVENT_NAME = {v: k for k, v in EventName.schema.enumerants.items()}
+NUM_EVENTS = max(EVENT_NAME) + 1
 
 
 class Events:
+  """Active events of one control cycle. Besides the ordered list of names, the set is tracked as a bitmask
+  over event ids and the number of consecutive cycles each event was active is kept in an array indexed by id."""
   def __init__(self):
     self.events: list[int] = []
     self.static_events: list[int] = []
-    self.events_prev = dict.fromkeys(EVENTS.keys(), 0)
+    self.events_prev = np.zeros(NUM_EVENTS, dtype=np.int64)
+
+    self._active_mask = 0
+    self._static_mask = 0
+    self._active = np.zeros(NUM_EVENTS, dtype=bool)
 
   @property
   def names(self) -> list[int]:
@@ -63,24 +71,45 @@ class Events:
   def __len__(self) -> int:
     return len(self.events)
 
+  def _set_active(self, event_name: int) -> None:
+    self._active_mask |= 1 << event_name
+    self._active[event_name] = True
+
   def add(self, event_name: int, static: bool=False) -> None:
     if static:
       self.static_events.append(event_name)
+      self._static_mask |= 1 << event_name
     self.events.append(event_name)
+    self._set_active(event_name)
 
   def clear(self) -> None:
-    self.events_prev = {k: (v + 1 if k in self.events else 0) for k, v in self.events_prev.items()}
+    np.add(self.events_prev, 1, out=self.events_prev)
+    np.multiply(self.events_prev, self._active, out=self.events_prev)
+
     self.events = self.static_events.copy()
+    self._active_mask = self._static_mask
+    self._active.fill(False)
+    for e in self.static_events:
+      self._active[e] = True
 
   def contains(self, event_type: str) -> bool:
-    return any(event_type in EVENTS.get(e, {}) for e in self.events)
+    return (self._active_mask & EVENT_TYPE_MASKS[event_type]) != 0
 
   def create_alerts(self, event_types: list[str], callback_args=None):
     if callback_args is None:
       callback_args = []
 
+    types_mask = 0
+    for et in event_types:
+      types_mask |= EVENT_TYPE_MASKS[et]
+    if not self._active_mask & types_mask:
+      return []
+
     ret = []
     for e in self.events:
+      if not (types_mask >> e) & 1:
+        continue
+
       types = EVENTS[e].keys()
       for et in event_types:
         if et in types:
@@ -97,6 +126,7 @@ class Events:
   def add_from_msg(self, events):
     for e in events:
       self.events.append(e.name.raw)
+      self._set_active(e.name.raw)
 
   def to_msg(self):
     ret = []
@@ -1138,6 +1168,10 @@ EVENTS: dict[int, dict[str, Alert | AlertCallbackType]] = {
   },
 }
 
+# bitmask over event ids of the events that have an alert of each type
+EVENT_TYPE_MASKS: dict[str, int] = {et: sum(1 << e for e, alerts in EVENTS.items() if et in alerts)
+                                    for k, et in vars(ET).items() if not k.startswith('_')}
+
 
 if __name__ == '__main__':
   # print all alerts by type and priority
@@ -4,7 +4,7 @@ import numpy as np
 
 from cereal import log
 from openpilot.common.filter_simple import FirstOrderFilter
-from openpilot.common.numpy_fast import interp
+from openpilot.common.numpy_fast import interp, InterpTable
 from openpilot.selfdrive.car.interfaces import LatControlInputs
 from openpilot.selfdrive.controls.lib.drive_helpers import CONTROL_N, apply_deadzone
 from openpilot.selfdrive.controls.lib.latcontrol import LatControl
@@ -27,6 +27,8 @@ from openpilot.common.params import Params
 LOW_SPEED_X = [0, 10, 20, 30]
 LOW_SPEED_Y = [15, 13, 10, 5]
 LOW_SPEED_Y_NN = [12, 3, 1, 0]
+LOW_SPEED_FACTOR = InterpTable(LOW_SPEED_X, LOW_SPEED_Y)
+LOW_SPEED_FACTOR_NN = InterpTable(LOW_SPEED_X, LOW_SPEED_Y_NN)
 
 LAT_PLAN_MIN_IDX = 5
 
@@ -182,7 +184,7 @@ class LatControlTorque(LatControl):
       actual_lateral_accel = actual_curvature * CS.vEgo ** 2
       lateral_accel_deadzone = curvature_deadzone * CS.vEgo ** 2
 
-      low_speed_factor = interp(CS.vEgo, LOW_SPEED_X, LOW_SPEED_Y if not self.use_nnff else LOW_SPEED_Y_NN)**2
+      low_speed_factor = (LOW_SPEED_FACTOR if not self.use_nnff else LOW_SPEED_FACTOR_NN)(CS.vEgo)**2
       setpoint = desired_lateral_accel + low_speed_factor * desired_curvature
       measurement = actual_lateral_accel + low_speed_factor * actual_curvature
 
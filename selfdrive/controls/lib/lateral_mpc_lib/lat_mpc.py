@@ -141,14 +141,11 @@ class LateralMpc():
     self.x_sol = np.zeros((N+1, X_DIM))
     self.u_sol = np.zeros((N, 1))
     self.yref = np.zeros((N+1, COST_DIM))
-    for i in range(N):
-      self.solver.cost_set(i, "yref", self.yref[i])
-    self.solver.cost_set(N, "yref", self.yref[N][:COST_E_DIM])
+    self.solver.set_flat("yref", self.yref)
 
     # Somehow needed for stable init
-    for i in range(N+1):
-      self.solver.set(i, 'x', np.zeros(X_DIM))
-      self.solver.set(i, 'p', np.zeros(P_DIM))
+    self.solver.set_flat('x', self.x_sol)
+    self.solver.set_flat('p', np.zeros((N+1, P_DIM)))
     self.solver.constraints_set(0, "lbx", x0)
     self.solver.constraints_set(0, "ubx", x0)
     self.solver.solve()
@@ -159,12 +156,11 @@ class LateralMpc():
   def set_weights(self, path_weight, heading_weight,
                   lat_accel_weight, lat_jerk_weight,
                   steering_rate_weight):
-    W = np.asfortranarray(np.diag([path_weight, heading_weight,
-                                   lat_accel_weight, lat_jerk_weight,
-                                   steering_rate_weight]))
-    for i in range(N):
-      self.solver.cost_set(i, 'W', W)
-    self.solver.cost_set(N, 'W', W[:COST_E_DIM,:COST_E_DIM])
+    W = np.diag([path_weight, heading_weight,
+                 lat_accel_weight, lat_jerk_weight,
+                 steering_rate_weight])
+    # the terminal cost uses the leading COST_E_DIM block
+    self.solver.set_flat('W', np.tile(W, (N+1, 1, 1)))
 
   def run(self, x0, p, y_pts, heading_pts, yaw_rate_pts):
     x0_cp = np.copy(x0)
@@ -176,20 +172,15 @@ class LateralMpc():
     # rotation_radius = p_cp[1]
     self.yref[:,1] = heading_pts * (v_ego + SPEED_OFFSET)
     self.yref[:,2] = yaw_rate_pts * (v_ego + SPEED_OFFSET)
-    for i in range(N):
-      self.solver.cost_set(i, "yref", self.yref[i])
-      self.solver.set(i, "p", p_cp[i])
-    self.solver.set(N, "p", p_cp[N])
-    self.solver.cost_set(N, "yref", self.yref[N][:COST_E_DIM])
+    self.solver.set_flat("yref", self.yref)
+    self.solver.set_flat("p", p_cp)
 
     t = time.monotonic()
     self.solution_status = self.solver.solve()
     self.solve_time = time.monotonic() - t
 
-    for i in range(N+1):
-      self.x_sol[i] = self.solver.get(i, 'x')
-    for i in range(N):
-      self.u_sol[i] = self.solver.get(i, 'u')
+    self.solver.get_flat('x', self.x_sol)
+    self.solver.get_flat('u', self.u_sol)
     self.cost = self.solver.get_cost()
 
 
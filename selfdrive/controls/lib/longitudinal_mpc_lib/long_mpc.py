@@ -3,7 +3,7 @@ import os
 import time
 import numpy as np
 from cereal import log
-from openpilot.common.numpy_fast import clip, interp
+from openpilot.common.numpy_fast import clip, interp, InterpTable
 from openpilot.common.swaglog import cloudlog
 # WARNING: imports outside of constants will not trigger a rebuild
 from openpilot.selfdrive.modeld.constants import index_function
@@ -62,6 +62,9 @@ T_DIFFS = np.diff(T_IDXS, prepend=[0.])
 T_FOLLOW = 1.45
 COMFORT_BRAKE = 2.5
 STOP_DISTANCE = 6.5
+# t_follow factors by lateral offset and speed of a lead moving out of or into the lane
+CUT_OUT_TF_FACTOR = InterpTable([0.5, 1.0, 2.0], [1.0, 0.5, 0.2])
+CUT_IN_TF_FACTOR = InterpTable([0.5, 1.0, 2.0], [1.0, 1.1, 1.3])
 
 tFollowGap1 = 1.1
 tFollowGap2 = 1.2
@@ -311,9 +314,7 @@ class LongitudinalMpc:
     self.prev_a = np.array(self.a_solution)
     self.j_solution = np.zeros(N)
     self.yref = np.zeros((N+1, COST_DIM))
-    for i in range(N):
-      self.solver.cost_set(i, "yref", self.yref[i])
-    self.solver.cost_set(N, "yref", self.yref[N][:COST_E_DIM])
+    self.solver.set_flat("yref", self.yref)
     self.x_sol = np.zeros((N+1, X_DIM))
     self.u_sol = np.zeros((N,1))
     self.params = np.zeros((N+1, PARAM_DIM))
@@ -324,8 +325,7 @@ class LongitudinalMpc:
     self.stopSignCount = 0
     self.trafficState = TrafficState.off
     
-    for i in range(N+1):
-      self.solver.set(i, 'x', np.zeros(X_DIM))
+    self.solver.set_flat('x', self.x_sol)
     self.last_cloudlog_t = 0
     self.status = False
     self.crash_cnt = 0.0
@@ -339,20 +339,16 @@ class LongitudinalMpc:
     self.set_weights()
 
   def set_cost_weights(self, cost_weights, constraint_cost_weights):
-    W = np.asfortranarray(np.diag(cost_weights))
-    for i in range(N):
-      # TODO don't hardcode A_CHANGE_COST idx
-      # reduce the cost on (a-a_prev) later in the horizon.
-      W[4,4] = cost_weights[4] * np.interp(T_IDXS[i], [0.0, 1.0, 2.0], [1.0, 1.0, 0.0])
-      self.solver.cost_set(i, 'W', W)
-    # Setting the slice without the copy make the array not contiguous,
-    # causing issues with the C interface.
-    self.solver.cost_set(N, 'W', np.copy(W[:COST_E_DIM, :COST_E_DIM]))
+    W = np.tile(np.diag(cost_weights), (N+1, 1, 1))
+    # TODO don't hardcode A_CHANGE_COST idx
+    # reduce the cost on (a-a_prev) later in the horizon.
+    W[:N,4,4] = cost_weights[4] * np.interp(T_IDXS[:N], [0.0, 1.0, 2.0], [1.0, 1.0, 0.0])
+    # the terminal cost uses the leading COST_E_DIM block of the last stage's weights
+    W[N,4,4] = W[N-1,4,4]
+    self.solver.set_flat('W', W)
 
     # Set L2 slack cost on lower bound constraints
-    Zl = np.array(constraint_cost_weights)
-    for i in range(N):
-      self.solver.cost_set(i, 'Zl', Zl)
+    self.solver.set_flat('Zl', np.tile(constraint_cost_weights, (N, 1)))
 
   def set_weights(self, prev_accel_constraint=True, personality=log.LongitudinalPersonality.standard):
     jerk_factor = get_jerk_factor(personality)
@@ -373,8 +369,7 @@ class LongitudinalMpc:
     self.x0[1] = v
     self.x0[2] = a
     if abs(v_prev - v) > 2.:  # probably only helps if v < v_prev
-      for i in range(N+1):
-        self.solver.set(i, 'x', self.x0)
+      self.solver.set_flat('x', np.tile(self.x0, (N+1, 1)))
 
   @staticmethod
   def extrapolate_lead(x_lead, v_lead, a_lead, a_lead_tau):
@@ -454,9 +449,9 @@ class LongitudinalMpc:
       check_cut_out = radarstate.leadOne.dPath * radarstate.leadOne.vLat
       #print("{:.1f}, {:.1f}".format(check_cut_out, radarstate.leadOne.dPath + radarstate.leadOne.vLat))
       if check_cut_out > 0:
-        t_follow *= interp(abs(radarstate.leadOne.dPath + radarstate.leadOne.vLat), [0.5, 1.0, 2.0], [1.0, 0.5, 0.2])
+        t_follow *= CUT_OUT_TF_FACTOR(abs(radarstate.leadOne.dPath + radarstate.leadOne.vLat))
       elif carrotTest3 == 2:
-        t_follow *= interp(abs(radarstate.leadOne.vLat), [0.5, 1.0, 2.0], [1.0, 1.1, 1.3])
+        t_follow *= CUT_IN_TF_FACTOR(abs(radarstate.leadOne.vLat))
     self.t_follow = t_follow
     
     self.status = radarstate.leadOne.status or radarstate.leadTwo.status
@@ -530,9 +525,7 @@ class LongitudinalMpc:
     self.yref[:,2] = v
     self.yref[:,3] = a
     self.yref[:,5] = j
-    for i in range(N):
-      self.solver.set(i, "yref", self.yref[i])
-    self.solver.set(N, "yref", self.yref[N][:COST_E_DIM])
+    self.solver.set_flat("yref", self.yref)
 
     self.params[:,2] = np.min(x_obstacles, axis=1)
     self.params[:,3] = np.copy(self.prev_a)
@@ -562,8 +555,7 @@ class LongitudinalMpc:
   def run(self):
     # t0 = time.monotonic()
     # reset = 0
-    for i in range(N+1):
-      self.solver.set(i, 'p', self.params[i])
+    self.solver.set_flat('p', self.params)
     self.solver.constraints_set(0, "lbx", self.x0)
     self.solver.constraints_set(0, "ubx", self.x0)
 
@@ -580,10 +572,8 @@ class LongitudinalMpc:
     # print(f"long_mpc residuals: {res[0]:.2e}, {res[1]:.2e}, {res[2]:.2e}, {res[3]:.2e}")
     # self.solver.print_statistics()
 
-    for i in range(N+1):
-      self.x_sol[i] = self.solver.get(i, 'x')
-    for i in range(N):
-      self.u_sol[i] = self.solver.get(i, 'u')
+    self.solver.get_flat('x', self.x_sol)
+    self.solver.get_flat('u', self.u_sol)
 
     self.v_solution = self.x_sol[:,1]
     self.a_solution = self.x_sol[:,2]
@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+import random
+import timeit
+
+from openpilot.selfdrive.controls.lib.events import ET, Events
+from openpilot.selfdrive.controls.tests.test_events import ALL_ET, STATIC_ALERT_EVENTS, ListEvents
+
+N = 20000
+
+
+def cycle(events, added):
+  # what controlsd does with its event set every 10 ms
+  events.clear()
+  for e in added:
+    events.add(e)
+  for et in (ET.NO_ENTRY, ET.SOFT_DISABLE, ET.IMMEDIATE_DISABLE, ET.USER_DISABLE, ET.ENABLE, ET.PRE_ENABLE,
+             ET.OVERRIDE_LATERAL, ET.OVERRIDE_LONGITUDINAL):
+    events.contains(et)
+  events.create_alerts([ET.PERMANENT, ET.WARNING])
+
+
+if __name__ == "__main__":
+  random.seed(0)
+  cycles = [random.choices(STATIC_ALERT_EVENTS, k=random.randint(0, 4)) for _ in range(N)]
+
+  for name, cls in (("ListEvents", ListEvents), ("Events", Events)):
+    events = cls()
+    it = iter(cycles)
+    t = timeit.timeit(lambda: cycle(events, next(it)), number=N)  # noqa: B023
+    print(f"{name:>10}: {t / N * 1e6:7.2f} us/cycle")
+
+  for name, cls in (("ListEvents", ListEvents), ("Events", Events)):
+    events = cls()
+    t = timeit.timeit(events.clear, number=N)
+    t_contains = timeit.timeit(lambda: events.contains(ET.NO_ENTRY), number=N)  # noqa: B023
+    print(f"{name:>10}: clear {t / N * 1e6:6.2f} us, contains {t_contains / N * 1e6:6.2f} us ({len(ALL_ET)} event types)")
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+import random
+import unittest
+
+from openpilot.common.realtime import DT_CTRL
+from openpilot.selfdrive.controls.lib.events import ET, EVENTS, EVENT_NAME, Alert, Events
+
+
+class ListEvents:
+  """Reference for Events: the dict and list based implementation it replaced"""
+  def __init__(self):
+    self.events: list[int] = []
+    self.static_events: list[int] = []
+    self.events_prev = dict.fromkeys(EVENTS.keys(), 0)
+
+  def add(self, event_name: int, static: bool=False) -> None:
+    if static:
+      self.static_events.append(event_name)
+    self.events.append(event_name)
+
+  def clear(self) -> None:
+    self.events_prev = {k: (v + 1 if k in self.events else 0) for k, v in self.events_prev.items()}
+    self.events = self.static_events.copy()
+
+  def contains(self, event_type: str) -> bool:
+    return any(event_type in EVENTS.get(e, {}) for e in self.events)
+
+  def create_alerts(self, event_types: list[str], callback_args=None):
+    if callback_args is None:
+      callback_args = []
+
+    ret = []
+    for e in self.events:
+      types = EVENTS[e].keys()
+      for et in event_types:
+        if et in types:
+          alert = EVENTS[e][et]
+          if not isinstance(alert, Alert):
+            alert = alert(*callback_args)
+
+          if DT_CTRL * (self.events_prev[e] + 1) >= alert.creation_delay:
+            alert.alert_type = f"{EVENT_NAME[e]}/{et}"
+            alert.event_type = et
+            ret.append(alert)
+    return ret
+
+
+ALL_ET = [v for k, v in vars(ET).items() if not k.startswith('_')]
+# events whose alerts don't need callback arguments
+STATIC_ALERT_EVENTS = [e for e, alerts in EVENTS.items() if all(isinstance(a, Alert) for a in alerts.values())]
+
+
+class TestEvents(unittest.TestCase):
+  def test_matches_list_events(self):
+    random.seed(0)
+    events, ref = Events(), ListEvents()
+    for e in random.sample(STATIC_ALERT_EVENTS, 2):
+      events.add(e, static=True)
+      ref.add(e, static=True)
+
+    for _ in range(3000):
+      events.clear()
+      ref.clear()
+      for e in random.choices(STATIC_ALERT_EVENTS, k=random.randint(0, 5)):
+        events.add(e)
+        ref.add(e)
+
+      self.assertEqual(events.names, ref.events)
+      for et in ALL_ET:
+        self.assertEqual(events.contains(et), ref.contains(et), et)
+      for e in EVENTS:
+        self.assertEqual(events.events_prev[e], ref.events_prev[e])
+
+      types = random.sample(ALL_ET, random.randint(1, len(ALL_ET)))
+      self.assertEqual([a.alert_type for a in events.create_alerts(types)],
+                       [a.alert_type for a in ref.create_alerts(types)])
+
+  def test_event_type_masks(self):
+    for e, alerts in EVENTS.items():
+      events = Events()
+      events.add(e)
+      for et in ALL_ET:
+        self.assertEqual(events.contains(et), et in alerts)
+
+  def test_static_events_survive_clear(self):
+    e_static, e = STATIC_ALERT_EVENTS[:2]
+    events = Events()
+    events.add(e_static, static=True)
+    events.add(e)
+    for _ in range(10):
+      events.clear()
+    self.assertEqual(events.names, [e_static])
+    self.assertEqual(events.events_prev[e_static], 10)
+    self.assertEqual(events.events_prev[e], 0)
+
+
+if __name__ == "__main__":
+  unittest.main()
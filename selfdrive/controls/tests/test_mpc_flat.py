@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+import unittest
+
+import numpy as np
+
+from openpilot.selfdrive.controls.lib.lateral_mpc_lib import lat_mpc
+from openpilot.selfdrive.controls.lib.longitudinal_mpc_lib import long_mpc
+
+
+class StageSolver:
+  """Reference for set_flat(): the per-stage set/cost_set loops it replaced"""
+  def __init__(self, solver, n, cost_e_dim):
+    self.solver = solver
+    self.n = n
+    self.cost_e_dim = cost_e_dim
+
+  def set_flat(self, field, value):
+    for i in range(len(value)):
+      if field in ('p', 'x', 'u'):
+        self.solver.set(i, field, value[i])
+      elif i == self.n and field == 'yref':
+        self.solver.cost_set(i, field, value[i][:self.cost_e_dim])
+      elif i == self.n and field == 'W':
+        self.solver.cost_set(i, field, np.copy(value[i][:self.cost_e_dim, :self.cost_e_dim]))
+      elif field == 'W':
+        self.solver.cost_set(i, field, np.asfortranarray(value[i]))
+      else:
+        self.solver.cost_set(i, field, value[i])
+
+
+def get_stages(solver, field, out):
+  """Reference for get_flat()"""
+  for i in range(len(out)):
+    out[i] = solver.get(i, field)
+  return out
+
+
+def lat_inputs(rng):
+  n = lat_mpc.N
+  W = np.diag(rng.uniform(0.1, 10., lat_mpc.COST_DIM))
+  p = np.column_stack([rng.uniform(0., 35., n+1), rng.uniform(-1., 1., n+1)])
+  return {
+    'W': np.tile(W, (n+1, 1, 1)),
+    'x': np.zeros((n+1, lat_mpc.X_DIM)),
+    'yref': rng.uniform(-1., 1., (n+1, lat_mpc.COST_DIM)),
+    'p': p,
+  }
+
+
+def long_inputs(rng):
+  n = long_mpc.N
+  W = np.tile(np.diag(rng.uniform(0.1, 10., long_mpc.COST_DIM)), (n+1, 1, 1))
+  # the a_change cost fades out over the horizon, the terminal block keeps the last one
+  W[:, 4, 4] *= np.linspace(1., 0., n+1)
+  x0 = np.array([0., rng.uniform(0., 30.), rng.uniform(-1., 1.)])
+  params = np.column_stack([
+    np.full(n+1, -3.5),                                          # a_min
+    np.full(n+1, 2.),                                            # a_max
+    x0[1] * np.asarray(long_mpc.T_IDXS) + rng.uniform(30., 80.),  # x_obstacle
+    rng.uniform(-1., 1., n+1),                                   # prev_a
+    np.full(n+1, 1.45),                                          # t_follow
+    np.full(n+1, 1.),                                            # lead_danger_factor
+    np.full(n+1, 2.5),                                           # comfort_brake
+    np.full(n+1, 6.),                                            # stop_distance
+  ])
+  return {
+    'W': W,
+    'Zl': np.tile(rng.uniform(0.1, 10., long_mpc.CONSTR_DIM), (n, 1)),
+    'x': np.tile(x0, (n+1, 1)),
+    'yref': rng.uniform(-1., 1., (n+1, long_mpc.COST_DIM)),
+    'p': params,
+  }, x0
+
+
+class TestMpcFlat(unittest.TestCase):
+  def check_solutions(self, solver, ref, n, x_dim, x0):
+    for s in (solver, ref):
+      s.constraints_set(0, "lbx", x0)
+      s.constraints_set(0, "ubx", x0)
+      s.solve()
+
+    x_flat = solver.get_flat('x', np.zeros((n+1, x_dim)))
+    u_flat = solver.get_flat('u', np.zeros((n, 1)))
+    # same solver, both ways of reading it
+    np.testing.assert_array_equal(x_flat, get_stages(solver, 'x', np.zeros((n+1, x_dim))))
+    np.testing.assert_array_equal(u_flat, get_stages(solver, 'u', np.zeros((n, 1))))
+
+    # same inputs, both ways of writing them
+    np.testing.assert_array_equal(x_flat, get_stages(ref, 'x', np.zeros((n+1, x_dim))))
+    np.testing.assert_array_equal(u_flat, get_stages(ref, 'u', np.zeros((n, 1))))
+    self.assertEqual(solver.get_cost(), ref.get_cost())
+
+  def test_lat(self):
+    rng = np.random.default_rng(0)
+    n = lat_mpc.N
+    solver = lat_mpc.AcadosOcpSolverCython(lat_mpc.MODEL_NAME, lat_mpc.ACADOS_SOLVER_TYPE, n)
+    ref = lat_mpc.AcadosOcpSolverCython(lat_mpc.MODEL_NAME, lat_mpc.ACADOS_SOLVER_TYPE, n)
+    ref_stages = StageSolver(ref, n, lat_mpc.COST_E_DIM)
+
+    for _ in range(20):
+      inputs = lat_inputs(rng)
+      for field, value in inputs.items():
+        solver.set_flat(field, value)
+        ref_stages.set_flat(field, value)
+      x0 = np.array([0., rng.uniform(-0.5, 0.5), rng.uniform(-0.1, 0.1), rng.uniform(-0.1, 0.1)])
+      self.check_solutions(solver, ref, n, lat_mpc.X_DIM, x0)
+
+  def test_long(self):
+    rng = np.random.default_rng(0)
+    n = long_mpc.N
+    solver = long_mpc.AcadosOcpSolverCython(long_mpc.MODEL_NAME, long_mpc.ACADOS_SOLVER_TYPE, n)
+    ref = long_mpc.AcadosOcpSolverCython(long_mpc.MODEL_NAME, long_mpc.ACADOS_SOLVER_TYPE, n)
+    ref_stages = StageSolver(ref, n, long_mpc.COST_E_DIM)
+
+    for _ in range(20):
+      inputs, x0 = long_inputs(rng)
+      for field, value in inputs.items():
+        solver.set_flat(field, value)
+        ref_stages.set_flat(field, value)
+      self.check_solutions(solver, ref, n, long_mpc.X_DIM, x0)
+
+  def test_terminal_stage(self):
+    # the terminal yref/W take the leading entries, the rest of the last row is ignored
+    n = lat_mpc.N
+    solver = lat_mpc.AcadosOcpSolverCython(lat_mpc.MODEL_NAME, lat_mpc.ACADOS_SOLVER_TYPE, n)
+    yref = np.ones((n+1, lat_mpc.COST_DIM))
+    yref[n, lat_mpc.COST_E_DIM:] = np.nan
+    solver.set_flat('yref', yref)
+    W = np.tile(np.eye(lat_mpc.COST_DIM), (n+1, 1, 1))
+    W[n, lat_mpc.COST_E_DIM:, :] = np.nan
+    W[n, :, lat_mpc.COST_E_DIM:] = np.nan
+    solver.set_flat('W', W)
+    solver.set_flat('p', np.tile([15., 0.], (n+1, 1)))
+    solver.constraints_set(0, "lbx", np.zeros(lat_mpc.X_DIM))
+    solver.constraints_set(0, "ubx", np.zeros(lat_mpc.X_DIM))
+    solver.solve()
+    self.assertTrue(np.isfinite(solver.get_cost()))
+
+  def test_invalid(self):
+    n = lat_mpc.N
+    solver = lat_mpc.AcadosOcpSolverCython(lat_mpc.MODEL_NAME, lat_mpc.ACADOS_SOLVER_TYPE, n)
+    with self.assertRaisesRegex(Exception, 'set_flat'):
+      solver.set_flat('p', np.zeros((n+2, lat_mpc.P_DIM)))
+    with self.assertRaisesRegex(Exception, 'set_flat'):
+      solver.set_flat('yref', np.zeros((n+1, lat_mpc.COST_E_DIM)))
+    with self.assertRaisesRegex(Exception, 'get_flat'):
+      solver.get_flat('x', np.zeros((n, lat_mpc.X_DIM)))
+    with self.assertRaisesRegex(Exception, 'get_flat'):
+      solver.get_flat('lam')
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -32,6 +32,7 @@ import requests
 from requests.exceptions import ConnectionError
 from openpilot.common.realtime import set_core_affinity
 import openpilot.selfdrive.frogpilot.fleetmanager.helpers as fleet
+from openpilot.selfdrive.frogpilot.fleetmanager.remux_cache import RemuxCache, RemuxCacheFull
 from openpilot.system.hardware.hw import Paths
 from openpilot.common.swaglog import cloudlog
 import traceback
@@ -48,17 +49,26 @@ def internal_error(exception):
   tberror = traceback.format_exc()
   return render_template("error.html", error=tberror)
 
+remux_cache = RemuxCache(fleet.REMUX_CACHE_PATH, max_bytes=fleet.REMUX_CACHE_MAX_BYTES)
+
+def remux_response(command, inputs):
+  # identical requests share one remux, streamed in chunks and seekable with Range
+  try:
+    job = remux_cache.get(command, inputs)
+  except RemuxCacheFull as e:
+    return render_template("error.html", error=str(e)), 503
+  try:
+    status, headers, start, stop = job.range_response(request.headers.get("Range"))
+  except Exception:
+    job.release()
+    raise
+  return Response(job.read(start, stop), status=status, headers=headers, mimetype='video/mp4')
+
 @app.route("/footage/full/<cameratype>/<route>")
 def full(cameratype, route):
-  chunk_size = 1024 * 512  # 5KiB
   file_name = cameratype + (".ts" if cameratype == "qcamera" else ".hevc")
-  vidlist = "|".join(Paths.log_root() + "/" + segment + "/" + file_name for segment in fleet.segments_in_route(route))
-
-  def generate_buffered_stream():
-    with fleet.ffmpeg_mp4_concat_wrap_process_builder(vidlist, cameratype, chunk_size) as process:
-      for chunk in iter(lambda: process.stdout.read(chunk_size), b""):
-        yield bytes(chunk)
-  return Response(generate_buffered_stream(), status=200, mimetype='video/mp4')
+  vidlist = [Paths.log_root() + "/" + segment + "/" + file_name for segment in fleet.segments_in_route(route)]
+  return remux_response(fleet.ffmpeg_mp4_concat_wrap_command("|".join(vidlist), cameratype), vidlist)
 
 @app.route("/footage/full/rlog/<route>/<segment>")
 def download_rlog(route, segment):
@@ -89,7 +99,7 @@ def fcamera(cameratype, segment):
   if not fleet.is_valid_segment(segment):
     return render_template("error.html", error="invalid segment")
   file_name = Paths.log_root() + "/" + segment + "/" + cameratype + (".ts" if cameratype == "qcamera" else ".hevc")
-  return Response(fleet.ffmpeg_mp4_wrap_process_builder(file_name).stdout.read(), status=200, mimetype='video/mp4')
+  return remux_response(fleet.ffmpeg_mp4_wrap_command(file_name), [file_name])
 
 
 @app.route("/footage/<route>")
@@ -116,13 +126,8 @@ def route(route):
 @app.route("/footage")
 def footage():
   route_paths = fleet.all_routes()
-  gifs = []
-  for route_path in route_paths:
-    input_path = Paths.log_root() + route_path + "--0/qcamera.ts"
-    output_path = Paths.log_root() + route_path + "--0/preview.gif"
-    fleet.video_to_img(input_path, output_path)
-    gif_path = route_path + "--0/preview.gif"
-    gifs.append(gif_path)
+  # previews that aren't made yet are queued in the background and show up on a later load
+  gifs = [fleet.footage_cache.preview(route_path + "--0") for route_path in route_paths]
   zipped = zip(route_paths, gifs)
   return render_template("footage.html", zipped=zipped)
 
@@ -134,13 +139,9 @@ def preserved():
   gifs = []
   segments = fleet.preserved_routes()
   for segment in segments:
-    input_path = Paths.log_root() + segment + "/qcamera.ts"
-    output_path = Paths.log_root() + segment + "/preview.gif"
-    fleet.video_to_img(input_path, output_path)
     split_segment = segment.split("--")
     route_paths.append(f"{split_segment[0]}--{split_segment[1]}?{split_segment[2]},{query_type}")
-    gif_path = segment + "/preview.gif"
-    gifs.append(gif_path)
+    gifs.append(fleet.footage_cache.preview(segment))
 
   zipped = zip(route_paths, gifs, segments)
   return render_template("preserved.html", zipped=zipped)
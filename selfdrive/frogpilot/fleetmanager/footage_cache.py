@@ -0,0 +1,130 @@
+import os
+import subprocess
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+
+from openpilot.system.loggerd.uploader import listdir_by_creation
+from openpilot.tools.lib.route import SegmentName
+
+FAKE_DONGLE = "ffffffffffffffff"
+PREVIEW_VIDEO = "qcamera.ts"
+PREVIEW_NAME = "preview.gif"
+
+# directory mtimes are only as fine as the kernel tick, don't trust a fresh one to catch every change
+MTIME_SETTLE_NS = 1_000_000_000
+# a segment still being written would get a new preview on every page load
+RECORDING_NS = 10_000_000_000
+
+
+def make_preview(input_path: str, output_path: str) -> bool:
+  # written next to the output and renamed, so a half written image is never served
+  tmp_path = os.path.join(os.path.dirname(output_path), "tmp_" + os.path.basename(output_path))
+  command = ['ffmpeg', '-y', '-loglevel', 'error', '-threads', '1', '-ss', '5', '-i', input_path, '-vframes', '1', tmp_path]
+  try:
+    proc = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, preexec_fn=lambda: os.nice(19), check=False)
+    if proc.returncode == 0 and os.path.isfile(tmp_path):
+      os.replace(tmp_path, output_path)
+      return True
+  except OSError:
+    pass
+
+  try:
+    os.remove(tmp_path)
+  except OSError:
+    pass
+  return False
+
+
+class FootageCache:
+  """Route index and preview images of the segments in log_root
+
+  The index is rebuilt only when log_root's mtime changes. Previews live in each segment
+  directory like before, stale or missing ones are made by a small background pool and
+  never by the caller, so pages can render right away with whatever is ready.
+  """
+  def __init__(self, log_root: str, max_workers: int = 1, max_pending: int = 16,
+               make_preview: Callable[[str, str], bool] = make_preview):
+    self.log_root = log_root
+    self.max_pending = max_pending
+    self.make_preview = make_preview
+    self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="footage_cache")
+
+    self.lock = threading.Lock()
+    self.index_mtime: int | None = None
+    self.dirs: list[str] = []
+    self.route_segments: dict[str, list[str]] = {}
+    self.pending: set[str] = set()
+    self.failed: dict[str, int] = {}
+
+  def update_index(self) -> None:
+    try:
+      mtime = os.stat(self.log_root).st_mtime_ns
+    except OSError:
+      mtime = None
+
+    with self.lock:
+      if mtime is not None and mtime == self.index_mtime and time.time_ns() - mtime > MTIME_SETTLE_NS:
+        return
+
+      dirs = listdir_by_creation(self.log_root)
+      route_segments: dict[str, list[str]] = {}
+      for d in dirs:
+        try:
+          segment_name = SegmentName(os.path.join(self.log_root, FAKE_DONGLE + "|" + d))
+        except AssertionError:
+          continue
+        route_segments.setdefault(segment_name.time_str, []).append(f"{segment_name.time_str}--{segment_name.segment_num}")
+      self.dirs, self.route_segments, self.index_mtime = dirs, route_segments, mtime
+
+  def segment_dirs(self) -> list[str]:
+    self.update_index()
+    return self.dirs
+
+  def routes(self) -> list[str]:
+    self.update_index()
+    return sorted(self.route_segments, reverse=True)
+
+  def segments_in_route(self, route: str) -> list[str]:
+    self.update_index()
+    return list(self.route_segments.get(route, []))
+
+  def preview(self, segment: str) -> str | None:
+    """Preview path relative to log_root, None if there is none yet. Missing or stale ones are queued."""
+    segment_dir = os.path.join(self.log_root, segment)
+    video_path = os.path.join(segment_dir, PREVIEW_VIDEO)
+    preview_path = os.path.join(segment_dir, PREVIEW_NAME)
+    try:
+      video_mtime = os.stat(video_path).st_mtime_ns
+    except OSError:
+      return None
+    try:
+      preview_mtime = os.stat(preview_path).st_mtime_ns
+    except OSError:
+      preview_mtime = None
+
+    up_to_date = preview_mtime is not None and preview_mtime >= video_mtime
+    if not up_to_date and time.time_ns() - video_mtime > RECORDING_NS:
+      self.queue_preview(segment, video_path, preview_path, video_mtime)
+    return f"{segment}/{PREVIEW_NAME}" if preview_mtime is not None else None
+
+  def queue_preview(self, segment: str, video_path: str, preview_path: str, video_mtime: int) -> None:
+    with self.lock:
+      # failed videos are retried once they change
+      if segment in self.pending or self.failed.get(segment) == video_mtime or len(self.pending) >= self.max_pending:
+        return
+      self.pending.add(segment)
+    self.executor.submit(self._make_preview, segment, video_path, preview_path, video_mtime)
+
+  def _make_preview(self, segment: str, video_path: str, preview_path: str, video_mtime: int) -> None:
+    ok = False
+    try:
+      ok = self.make_preview(video_path, preview_path)
+    finally:
+      with self.lock:
+        self.pending.discard(segment)
+        if ok:
+          self.failed.pop(segment, None)
+        else:
+          self.failed[segment] = video_mtime
@@ -32,6 +32,7 @@ from flask import render_template, request, session
 from functools import wraps
 from pathlib import Path
 
+from openpilot.selfdrive.frogpilot.fleetmanager.footage_cache import FootageCache
 from openpilot.system.hardware import PC
 from openpilot.system.hardware.hw import Paths
 from openpilot.system.loggerd.uploader import listdir_by_creation
@@ -55,14 +56,20 @@ PRESERVE_ATTR_NAME = 'user.preserve'
 PRESERVE_ATTR_VALUE = b'1'
 PRESERVE_COUNT = 5
 
+footage_cache = FootageCache(Paths.log_root())
+
 
 # path to openpilot screen recordings and error logs
 if PC:
   SCREENRECORD_PATH = os.path.join(str(Path.home()), ".comma", "media", "0", "videos", "")
   ERROR_LOGS_PATH = os.path.join(str(Path.home()), ".comma", "community", "crashes", "")
+  REMUX_CACHE_PATH = os.path.join(str(Path.home()), ".comma", "media", "0", "fleet_manager_remux", "")
 else:
   SCREENRECORD_PATH = "/data/media/0/videos/"
   ERROR_LOGS_PATH = "/data/community/crashes/"
+  REMUX_CACHE_PATH = "/data/media/0/fleet_manager_remux/"
+# all remuxed videos kept on disk together, shared with the recordings
+REMUX_CACHE_MAX_BYTES = 4 * 1024**3
 
 
 def list_files(path): # still used for footage
@@ -102,14 +109,10 @@ def all_segment_names():
 
 
 def all_routes():
-  segment_names = all_segment_names()
-  route_names = [segment_name.route_name for segment_name in segment_names]
-  route_times = [route_name.time_str for route_name in route_names]
-  unique_routes = list(dict.fromkeys(route_times))
-  return sorted(unique_routes, reverse=True)
+  return footage_cache.routes()
 
 def preserved_routes():
-  dirs = listdir_by_creation(Paths.log_root())
+  dirs = footage_cache.segment_dirs()
   preserved_segments = get_preserved_segments(dirs)
   return sorted(preserved_segments, reverse=True)
 
@@ -155,12 +158,10 @@ def video_to_img(input_path, output_path, fps=1, duration=6):
   print(f"GIF file created: {output_path}")
 
 def segments_in_route(route):
-  segment_names = [segment_name for segment_name in all_segment_names() if segment_name.time_str == route]
-  segments = [segment_name.time_str + "--" + str(segment_name.segment_num) for segment_name in segment_names]
-  return segments
+  return footage_cache.segments_in_route(route)
 
 
-def ffmpeg_mp4_concat_wrap_process_builder(file_list, cameratype, chunk_size=1024*512):
+def ffmpeg_mp4_concat_wrap_command(file_list, cameratype):
   command_line = ["ffmpeg"]
   if not cameratype == "qcamera":
     command_line += ["-f", "hevc"]
@@ -173,14 +174,11 @@ def ffmpeg_mp4_concat_wrap_process_builder(file_list, cameratype, chunk_size=102
   command_line += ["-f", "mp4"]
   command_line += ["-movflags", "empty_moov"]
   command_line += ["-"]
-  return subprocess.Popen(
-    command_line, stdout=subprocess.PIPE,
-    bufsize=chunk_size
-  )
+  return command_line
 
 
-def ffmpeg_mp4_wrap_process_builder(filename):
-  """Returns a process that will wrap the given filename
+def ffmpeg_mp4_wrap_command(filename):
+  """Returns the command that will wrap the given filename
      inside a mp4 container, for easier playback by browsers
      and other devices. Primary use case is streaming segment videos
      to the vidserver tool.
@@ -204,9 +202,7 @@ def ffmpeg_mp4_wrap_process_builder(filename):
   command_line += ["-f", "mp4"]
   command_line += ["-movflags", "empty_moov"]
   command_line += ["-"]
-  return subprocess.Popen(
-    command_line, stdout=subprocess.PIPE
-  )
+  return command_line
 
 
 def ffplay_mp4_wrap_process_builder(file_name):
@@ -0,0 +1,251 @@
+import hashlib
+import itertools
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from collections.abc import Callable
+
+CHUNK_SIZE = 1024 * 512
+# readers of a remux still running poll this often in case ffmpeg stalls
+READ_WAIT = 1.0
+# a range request waits at most this long for its first byte, then it's asked to retry
+RANGE_WAIT = 10.0
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header: str | None) -> tuple[int | None, int | None] | None:
+  """(first, last) byte of a single "bytes=" range, first is None for suffix ranges. None if absent or not supported."""
+  match = RANGE_RE.match(header.strip()) if header else None
+  if match is None or match.group(1) == match.group(2) == '':
+    return None
+  first = int(match.group(1)) if match.group(1) else None
+  last = int(match.group(2)) if match.group(2) else None
+  if first is not None and last is not None and last < first:
+    return None
+  return first, last
+
+
+class RemuxCacheFull(Exception):
+  pass
+
+
+class RemuxJob:
+  """One ffmpeg remux, written to a file that any number of readers follow while it runs
+
+  Each chunk is only written if fits(len(chunk)), otherwise the remux is stopped and fails.
+  """
+  def __init__(self, command: list[str], path: str, semaphore: threading.Semaphore, fits: Callable[[int], bool]):
+    self.command = command
+    self.path = path
+    self.fits = fits
+    self.size = 0
+    self.done = False
+    self.failed = False
+    self.readers = 0
+    self.last_used = time.monotonic()
+    self.cond = threading.Condition()
+
+    # exists before the first reader opens it
+    open(path, 'wb').close()
+    self.thread = threading.Thread(target=self.run, args=(semaphore,), daemon=True)
+    self.thread.start()
+
+  def run(self, semaphore: threading.Semaphore) -> None:
+    failed = True
+    try:
+      with semaphore, open(self.path, 'ab') as f, \
+           subprocess.Popen(self.command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL) as proc:
+        for chunk in iter(lambda: proc.stdout.read1(CHUNK_SIZE), b""):
+          if not self.fits(len(chunk)):
+            proc.kill()
+            break
+          f.write(chunk)
+          f.flush()
+          with self.cond:
+            self.size += len(chunk)
+            self.cond.notify_all()
+        failed = proc.wait() != 0
+    except OSError:
+      pass
+    finally:
+      with self.cond:
+        self.done = True
+        self.failed = failed
+        self.cond.notify_all()
+
+  def wait_size(self, offset: int, timeout: float | None = READ_WAIT) -> int:
+    """Waits until there's output past offset or the remux is done, returns the size written so far"""
+    with self.cond:
+      self.cond.wait_for(lambda: self.size > offset or self.done, timeout)
+      return self.size
+
+  def wait_done(self, timeout: float | None = None) -> int:
+    with self.cond:
+      self.cond.wait_for(lambda: self.done, timeout)
+      return self.size
+
+  def release(self) -> None:
+    with self.cond:
+      self.readers -= 1
+      self.last_used = time.monotonic()
+
+  def read(self, start: int = 0, stop: int | None = None):
+    """Yields the output in [start, stop) in chunks as it's written, stop=None follows it to the end
+
+    Takes over the reader RemuxCache.get() counted, it's released once the chunks are exhausted or closed.
+    """
+    chunks = self.read_chunks(start, stop)
+    # run up to the try, so closing it before the first chunk releases the reader too
+    next(chunks)
+    return chunks
+
+  def read_chunks(self, start: int, stop: int | None):
+    try:
+      yield
+      with open(self.path, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while stop is None or pos < stop:
+          size = self.wait_size(pos)
+          if pos >= size:
+            if self.done:
+              break
+            continue
+
+          chunk = f.read(min(CHUNK_SIZE, size - pos, CHUNK_SIZE if stop is None else stop - pos))
+          if not chunk:
+            break
+          pos += len(chunk)
+          yield chunk
+    finally:
+      self.release()
+
+  def range_response(self, range_header: str | None) -> tuple[int, dict[str, str], int, int | None]:
+    """Status, headers and the [start, stop) to read() for a request with the given Range header
+
+    Without a range the whole output is streamed as it's written. While the remux runs the total
+    size isn't known yet, so a range is answered with what's written so far and an unknown length,
+    players ask again for the rest. If nothing in the range is written within RANGE_WAIT, or a suffix
+    range asks for the end before the remux is done, it's a 503 with Retry-After.
+    """
+    headers = {'Accept-Ranges': 'bytes'}
+    byte_range = parse_range(range_header)
+    if byte_range is None:
+      if self.done:
+        headers['Content-Length'] = str(self.size)
+      return 200, headers, 0, None
+
+    first, last = byte_range
+    if first is None:
+      # the last bytes of a file whose end isn't known yet
+      self.wait_done(RANGE_WAIT)
+    else:
+      self.wait_size(first, RANGE_WAIT)
+    with self.cond:
+      size, done = self.size, self.done
+
+    if not done and (first is None or first >= size):
+      return self.retry_response(headers)
+    if first is None:
+      first, last = max(size - last, 0), size - 1
+
+    if first >= size:
+      headers['Content-Range'] = f'bytes */{size}'
+      return 416, headers, 0, 0
+
+    last = size - 1 if last is None else min(last, size - 1)
+    headers['Content-Range'] = f'bytes {first}-{last}/{size if done else "*"}'
+    headers['Content-Length'] = str(last - first + 1)
+    return 206, headers, first, last + 1
+
+  @staticmethod
+  def retry_response(headers: dict[str, str]) -> tuple[int, dict[str, str], int, int | None]:
+    headers['Retry-After'] = '1'
+    return 503, headers, 0, 0
+
+
+class RemuxCache:
+  """Remux jobs by command and input files, so identical requests share one ffmpeg, at most max_jobs running at once
+
+  Finished outputs are kept for later range requests, up to max_files that no one is reading. All outputs
+  together stay under max_bytes: idle ones are removed first, and a new remux is refused while the ones
+  in use already take up the budget.
+  """
+  def __init__(self, cache_dir: str, max_jobs: int = 2, max_files: int = 4, max_bytes: int = 4 * 1024**3):
+    self.cache_dir = cache_dir
+    self.max_files = max_files
+    self.max_bytes = max_bytes
+    self.semaphore = threading.BoundedSemaphore(max_jobs)
+    self.lock = threading.Lock()
+    self.jobs: dict[tuple, RemuxJob] = {}
+    self.counter = itertools.count()
+
+    # outputs from a previous run have no job anymore
+    shutil.rmtree(cache_dir, ignore_errors=True)
+    os.makedirs(cache_dir, exist_ok=True)
+
+  def get(self, command: list[str], inputs: list[str]) -> RemuxJob:
+    """The remux for command and inputs, counted as a reader until its read() is done
+
+    Raises RemuxCacheFull if a new remux is needed and the outputs in use take up max_bytes.
+    """
+    # a changed input, like a segment still being recorded, gets a new remux
+    key = (tuple(command), tuple((path, *self.file_version(path)) for path in inputs))
+    with self.lock:
+      job = self.jobs.get(key)
+      if job is None or job.failed:
+        if job is not None:
+          self.remove(key, job)
+        if not self.make_room(CHUNK_SIZE):
+          raise RemuxCacheFull(f"remux outputs in use take up {self.total_size()} of {self.max_bytes} bytes")
+        name = f"{hashlib.sha1(repr(key).encode()).hexdigest()[:16]}-{next(self.counter)}.mp4"
+        job = RemuxJob(command, os.path.join(self.cache_dir, name), self.semaphore, self.fits)
+        self.jobs[key] = job
+      # counted under the lock, so it can't be evicted before the caller reads it
+      with job.cond:
+        job.readers += 1
+        job.last_used = time.monotonic()
+      self.evict()
+      return job
+
+  @staticmethod
+  def file_version(path: str) -> tuple[int, int]:
+    try:
+      st = os.stat(path)
+      return st.st_mtime_ns, st.st_size
+    except OSError:
+      return 0, 0
+
+  def total_size(self) -> int:
+    return sum(job.size for job in self.jobs.values())
+
+  def fits(self, size: int) -> bool:
+    """Whether a running remux can write size more bytes, removing idle outputs to make room"""
+    with self.lock:
+      return self.make_room(size)
+
+  def make_room(self, size: int) -> bool:
+    self.evict(size)
+    return self.total_size() + size <= self.max_bytes
+
+  def evict(self, room: int = 0) -> None:
+    """Removes the least recently used idle outputs past max_files, and more until there's room below max_bytes"""
+    idle = sorted(((key, job) for key, job in self.jobs.items() if job.done and job.readers == 0), key=lambda kv: kv[1].last_used)
+    total = self.total_size()
+    for i, (key, job) in enumerate(idle):
+      if len(idle) - i <= self.max_files and total + room <= self.max_bytes:
+        break
+      total -= job.size
+      self.remove(key, job)
+
+  def remove(self, key: tuple, job: RemuxJob) -> None:
+    del self.jobs[key]
+    try:
+      # open readers keep their data until they close it
+      os.remove(job.path)
+    except OSError:
+      pass
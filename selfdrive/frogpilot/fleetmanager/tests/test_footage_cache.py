@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from openpilot.selfdrive.frogpilot.fleetmanager.footage_cache import PREVIEW_NAME, PREVIEW_VIDEO, FootageCache
+from openpilot.system.loggerd.uploader import listdir_by_creation
+from openpilot.tools.lib.route import SegmentName
+
+ROUTES = ["2024-05-01--10-00-00", "2024-05-01--11-30-00", "00000012--3b4a5c6d7e"]
+
+
+def segments_in_route_listing(log_root, route):
+  """Reference for FootageCache.segments_in_route: the previous full listing on every call"""
+  segments = []
+  for d in listdir_by_creation(log_root):
+    try:
+      segment_name = SegmentName(os.path.join(log_root, "ffffffffffffffff|" + d))
+    except AssertionError:
+      continue
+    if segment_name.time_str == route:
+      segments.append(f"{segment_name.time_str}--{segment_name.segment_num}")
+  return segments
+
+
+class FakePreviews:
+  def __init__(self, ok=True):
+    self.ok = ok
+    self.made = []
+    self.release = threading.Event()
+    self.release.set()
+
+  def __call__(self, input_path, output_path):
+    self.release.wait()
+    self.made.append(input_path)
+    if self.ok:
+      with open(output_path, 'w') as f:
+        f.write('gif')
+    return self.ok
+
+
+class TestFootageCache(unittest.TestCase):
+  def setUp(self):
+    self.log_root = tempfile.mkdtemp()
+    self.old = time.time() - 60
+    for route in ROUTES:
+      for i in range(12):
+        self.add_segment(f"{route}--{i}")
+    os.mkdir(os.path.join(self.log_root, "boot"))
+
+  def tearDown(self):
+    shutil.rmtree(self.log_root)
+
+  def add_segment(self, segment, mtime=None):
+    os.mkdir(os.path.join(self.log_root, segment))
+    video_path = os.path.join(self.log_root, segment, PREVIEW_VIDEO)
+    with open(video_path, 'w') as f:
+      f.write('ts')
+    mtime = self.old if mtime is None else mtime
+    os.utime(video_path, (mtime, mtime))
+    return video_path
+
+  def wait_pending(self, cache):
+    for _ in range(500):
+      with cache.lock:
+        if not cache.pending:
+          return
+      time.sleep(0.01)
+    self.fail("previews still pending")
+
+  def test_index(self):
+    cache = FootageCache(self.log_root)
+    self.assertEqual(cache.routes(), sorted(ROUTES, reverse=True))
+    for route in ROUTES + ["2024-05-02--00-00-00"]:
+      self.assertEqual(cache.segments_in_route(route), segments_in_route_listing(self.log_root, route))
+    self.assertEqual(cache.segment_dirs(), listdir_by_creation(self.log_root))
+
+  def test_index_invalidation(self):
+    cache = FootageCache(self.log_root)
+    self.assertEqual(len(cache.segments_in_route(ROUTES[0])), 12)
+
+    self.add_segment(f"{ROUTES[0]}--12")
+    self.add_segment("2024-06-01--00-00-00--0")
+    self.assertEqual(cache.segments_in_route(ROUTES[0]), segments_in_route_listing(self.log_root, ROUTES[0]))
+    self.assertIn("2024-06-01--00-00-00", cache.routes())
+
+    shutil.rmtree(os.path.join(self.log_root, "2024-06-01--00-00-00--0"))
+    self.assertNotIn("2024-06-01--00-00-00", cache.routes())
+
+  def test_index_cached(self):
+    cache = FootageCache(self.log_root)
+    cache.routes()
+    past = time.time() - 10
+    os.utime(self.log_root, (past, past))
+    cache.routes()
+    # same mtime, no listing
+    cache.dirs = []
+    self.assertEqual(cache.segment_dirs(), [])
+
+  def test_previews_never_block(self):
+    previews = FakePreviews()
+    previews.release.clear()
+    cache = FootageCache(self.log_root, max_workers=2, max_pending=100, make_preview=previews)
+    segments = [f"{route}--0" for route in ROUTES]
+
+    t = time.monotonic()
+    self.assertEqual([cache.preview(s) for s in segments], [None] * len(segments))
+    self.assertLess(time.monotonic() - t, 0.5)
+
+    previews.release.set()
+    self.wait_pending(cache)
+    self.assertEqual([cache.preview(s) for s in segments], [f"{s}/{PREVIEW_NAME}" for s in segments])
+    self.assertEqual(len(previews.made), len(segments))
+
+    # up to date, nothing queued again
+    cache.preview(segments[0])
+    self.wait_pending(cache)
+    self.assertEqual(len(previews.made), len(segments))
+
+  def test_pending_bounded(self):
+    previews = FakePreviews()
+    previews.release.clear()
+    cache = FootageCache(self.log_root, max_workers=1, max_pending=4, make_preview=previews)
+    for route in ROUTES:
+      for i in range(12):
+        cache.preview(f"{route}--{i}")
+    self.assertEqual(len(cache.pending), 4)
+
+    previews.release.set()
+    self.wait_pending(cache)
+    self.assertEqual(len(previews.made), 4)
+
+  def test_mtime_invalidation(self):
+    previews = FakePreviews()
+    cache = FootageCache(self.log_root, make_preview=previews)
+    segment = f"{ROUTES[0]}--0"
+    cache.preview(segment)
+    self.wait_pending(cache)
+    self.assertEqual(len(previews.made), 1)
+
+    # video rewritten after its preview was made, the old preview is served until the new one is ready
+    os.utime(os.path.join(self.log_root, segment, PREVIEW_NAME), (self.old, self.old))
+    newer = time.time() - 30
+    os.utime(os.path.join(self.log_root, segment, PREVIEW_VIDEO), (newer, newer))
+    self.assertEqual(cache.preview(segment), f"{segment}/{PREVIEW_NAME}")
+    self.wait_pending(cache)
+    self.assertEqual(len(previews.made), 2)
+
+  def test_recording_segment(self):
+    previews = FakePreviews()
+    cache = FootageCache(self.log_root, make_preview=previews)
+    segment = "2024-06-01--00-00-00--0"
+    self.add_segment(segment, mtime=time.time())
+    self.assertIsNone(cache.preview(segment))
+    self.wait_pending(cache)
+    self.assertEqual(previews.made, [])
+
+  def test_failed_not_retried(self):
+    previews = FakePreviews(ok=False)
+    cache = FootageCache(self.log_root, make_preview=previews)
+    segment = f"{ROUTES[0]}--0"
+    for _ in range(3):
+      self.assertIsNone(cache.preview(segment))
+      self.wait_pending(cache)
+    self.assertEqual(len(previews.made), 1)
+
+    newer = time.time() - 30
+    os.utime(os.path.join(self.log_root, segment, PREVIEW_VIDEO), (newer, newer))
+    cache.preview(segment)
+    self.wait_pending(cache)
+    self.assertEqual(len(previews.made), 2)
+
+
+if __name__ == "__main__":
+  unittest.main()
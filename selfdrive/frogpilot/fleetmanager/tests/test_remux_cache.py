@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import unittest
+from unittest import mock
+
+from openpilot.selfdrive.frogpilot.fleetmanager import remux_cache
+from openpilot.selfdrive.frogpilot.fleetmanager.remux_cache import CHUNK_SIZE, RemuxCache, RemuxCacheFull, parse_range
+
+
+class TestRemuxCache(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.cache = RemuxCache(os.path.join(self.tmpdir, "cache"), max_jobs=1, max_files=2)
+    # stands in for a segment video, cat for the ffmpeg remux
+    self.video = os.path.join(self.tmpdir, "fcamera.hevc")
+    with open(self.video, 'wb') as f:
+      f.write(os.urandom(3 * CHUNK_SIZE + 1234))
+    with open(self.video, 'rb') as f:
+      self.data = f.read()
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def remux(self, command=None, video=None, cache=None):
+    video = video or self.video
+    return (cache or self.cache).get(command or ["cat", video], [video])
+
+  def copy_video(self, name):
+    video = os.path.join(self.tmpdir, name)
+    shutil.copy(self.video, video)
+    return video
+
+  def test_parse_range(self):
+    self.assertEqual(parse_range("bytes=0-"), (0, None))
+    self.assertEqual(parse_range("bytes=10-20"), (10, 20))
+    self.assertEqual(parse_range("bytes=-500"), (None, 500))
+    for header in (None, "", "bytes=-", "bytes=20-10", "bytes=0-1,5-6", "items=0-1"):
+      self.assertIsNone(parse_range(header))
+
+  def test_stream(self):
+    job = self.remux()
+    status, headers, start, stop = job.range_response(None)
+    self.assertEqual(status, 200)
+    self.assertEqual(b"".join(job.read(start, stop)), self.data)
+    self.assertFalse(job.failed)
+
+  def test_range(self):
+    job = self.remux()
+    job.wait_done()
+    size = len(self.data)
+
+    status, headers, start, stop = job.range_response(None)
+    self.assertEqual((status, headers['Content-Length']), (200, str(size)))
+    for header, first, last in (("bytes=100-199", 100, 199), ("bytes=1000-", 1000, size - 1), ("bytes=-300", size - 300, size - 1),
+                                ("bytes=10-99999999", 10, size - 1)):
+      # one read per get
+      job = self.remux()
+      status, headers, start, stop = job.range_response(header)
+      self.assertEqual(status, 206)
+      self.assertEqual(headers['Content-Range'], f"bytes {first}-{last}/{size}")
+      self.assertEqual(b"".join(job.read(start, stop)), self.data[first:last + 1])
+      self.assertEqual(int(headers['Content-Length']), last - first + 1)
+
+    status, headers, _, _ = job.range_response(f"bytes={size}-")
+    self.assertEqual((status, headers['Content-Range']), (416, f"bytes */{size}"))
+
+  def test_range_in_progress(self):
+    command = ["sh", "-c", f"head -c 1000 {self.video}; sleep 0.5; tail -c +1001 {self.video}"]
+    job = self.remux(command)
+    status, headers, start, stop = job.range_response("bytes=0-")
+    # only what's written so far, with an unknown total
+    self.assertEqual((status, headers['Content-Range']), (206, "bytes 0-999/*"))
+    self.assertEqual(b"".join(job.read(start, stop)), self.data[:1000])
+
+    # a stream without range follows the remux to the end
+    self.assertEqual(b"".join(self.remux(command).read()), self.data)
+
+  def test_range_stalled(self):
+    command = ["sh", "-c", f"head -c 1000 {self.video}; sleep 1; tail -c +1001 {self.video}"]
+    with mock.patch.object(remux_cache, "RANGE_WAIT", 0.1):
+      for header in ("bytes=1000-", "bytes=-300"):
+        job = self.remux(command)
+        t = time.monotonic()
+        status, headers, start, stop = job.range_response(header)
+        self.assertLess(time.monotonic() - t, 0.5)
+        # asked to come back, instead of waiting on the remux
+        self.assertEqual((status, headers['Retry-After']), (503, '1'))
+        self.assertEqual(b"".join(job.read(start, stop)), b"")
+
+      # what's written is still served right away
+      job = self.remux(command)
+      self.assertEqual(job.range_response("bytes=0-")[:2], (206, {'Accept-Ranges': 'bytes', 'Content-Range': 'bytes 0-999/*',
+                                                                  'Content-Length': '1000'}))
+      job.release()
+      self.assertEqual(job.readers, 0)
+
+  def test_identical_requests_share_remux(self):
+    count = os.path.join(self.tmpdir, "count")
+    command = ["sh", "-c", f"echo run >> {count}; cat {self.video}"]
+    jobs = [self.remux(command) for _ in range(5)]
+    self.assertTrue(all(job is jobs[0] for job in jobs))
+    for job in jobs:
+      self.assertEqual(b"".join(job.read()), self.data)
+    with open(count) as f:
+      self.assertEqual(f.read(), "run\n")
+
+    # new remux once the input changes
+    os.utime(self.video, (time.time() + 10, time.time() + 10))
+    self.assertIsNot(self.remux(command), jobs[0])
+
+  def test_concurrent_jobs_capped(self):
+    slow = self.remux(["sh", "-c", f"sleep 0.5; cat {self.video}"])
+    other = self.remux(["cat", "-u", self.video])
+    # waits for the slow one to free up the only remux slot
+    self.assertEqual(other.wait_size(0, 0.2), 0)
+    self.assertEqual(b"".join(other.read()), self.data)
+    self.assertTrue(slow.done)
+
+  def test_failed_remux_retried(self):
+    job = self.remux(["false"])
+    job.wait_done()
+    self.assertTrue(job.failed)
+    self.assertEqual(job.range_response("bytes=0-")[0], 416)
+    self.assertIsNot(self.remux(["false"]), job)
+
+  def test_eviction(self):
+    jobs = []
+    for i in range(4):
+      jobs.append(self.remux(video=self.copy_video(f"{i}.hevc")))
+      self.assertEqual(b"".join(jobs[-1].read()), self.data)
+    self.remux(video=self.video).wait_done()
+
+    # the least recently used idle outputs are removed, the running one doesn't count
+    self.assertEqual([os.path.exists(job.path) for job in jobs], [False, False, True, True])
+    self.assertEqual(len(self.cache.jobs), 3)
+
+  def test_pinned_until_read(self):
+    # a job handed out by get() isn't removed before its reader gets to it
+    pinned = self.remux()
+    pinned.wait_done()
+    for i in range(4):
+      job = self.remux(video=self.copy_video(f"{i}.hevc"))
+      b"".join(job.read())
+    self.assertTrue(os.path.exists(pinned.path))
+    self.assertEqual(b"".join(pinned.read()), self.data)
+    self.assertEqual(pinned.readers, 0)
+
+    # then it's an idle output like the others, removed once three newer ones were read
+    for i in range(3):
+      b"".join(self.remux(video=self.copy_video(f"after{i}.hevc")).read())
+    self.assertFalse(os.path.exists(pinned.path))
+
+  def test_read_closed(self):
+    job = self.remux()
+    job.read().close()
+    self.assertEqual(job.readers, 0)
+
+    chunks = self.remux().read()
+    next(chunks)
+    self.assertEqual(job.readers, 1)
+    chunks.close()
+    self.assertEqual(job.readers, 0)
+
+  def test_byte_budget(self):
+    # room for two outputs, the least recently used idle one makes room for the next
+    cache = RemuxCache(os.path.join(self.tmpdir, "budget"), max_files=10, max_bytes=2 * len(self.data) + CHUNK_SIZE)
+    jobs = []
+    for i in range(4):
+      jobs.append(self.remux(video=self.copy_video(f"{i}.hevc"), cache=cache))
+      self.assertEqual(b"".join(jobs[-1].read()), self.data)
+      self.assertLessEqual(cache.total_size(), cache.max_bytes)
+    self.assertEqual([os.path.exists(job.path) for job in jobs], [False, False, True, True])
+    self.assertLessEqual(sum(os.path.getsize(job.path) for job in jobs[2:]), cache.max_bytes)
+
+  def test_byte_budget_in_use(self):
+    cache = RemuxCache(os.path.join(self.tmpdir, "budget"), max_bytes=len(self.data) + CHUNK_SIZE // 2)
+    job = self.remux(cache=cache)
+    job.wait_done()
+    # the output being read can't make room, a new remux is refused
+    with self.assertRaises(RemuxCacheFull):
+      self.remux(video=self.copy_video("other.hevc"), cache=cache)
+    self.assertEqual(b"".join(job.read()), self.data)
+
+    # once it's idle it can
+    other = self.remux(video=self.copy_video("other.hevc"), cache=cache)
+    self.assertEqual(b"".join(other.read()), self.data)
+    self.assertFalse(os.path.exists(job.path))
+
+  def test_remux_past_budget(self):
+    cache = RemuxCache(os.path.join(self.tmpdir, "budget"), max_bytes=len(self.data) // 2)
+    job = self.remux(cache=cache)
+    streamed = b"".join(job.read())
+    self.assertTrue(job.failed)
+    self.assertLessEqual(len(streamed), cache.max_bytes)
+    self.assertEqual(streamed, self.data[:len(streamed)])
+
+  def test_bounded_memory(self):
+    video = os.path.join(self.tmpdir, "long.hevc")
+    with open(video, 'wb') as f:
+      for _ in range(128):
+        f.write(os.urandom(CHUNK_SIZE))
+
+    tracemalloc.start()
+    try:
+      job = self.remux(video=video)
+      total = 0
+      for chunk in job.read():
+        total += len(chunk)
+      peak = tracemalloc.get_traced_memory()[1]
+    finally:
+      tracemalloc.stop()
+    self.assertEqual(total, 128 * CHUNK_SIZE)
+    print(f"streamed {total / 1e6:.0f} MB with {peak / 1e6:.1f} MB peak allocations")
+    self.assertLess(peak, 4 * CHUNK_SIZE)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,213 @@
+import gc
+import os
+import pickle
+import select
+import signal
+import socket
+import sys
+import threading
+import time
+import traceback
+from collections.abc import Callable
+
+FORWARDED_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGCHLD)
+MAX_MESSAGE = 1024 * 1024
+
+
+def exitcode_from_status(status: int) -> int:
+  # same as multiprocessing: negative signal number if killed by a signal
+  if os.WIFSIGNALED(status):
+    return -os.WTERMSIG(status)
+  return os.WEXITSTATUS(status)
+
+
+class ForkedProcess:
+  """A process forked by the fork server, with the parts of multiprocessing.Process the manager uses"""
+  def __init__(self, server: 'ForkServer', pid: int, name: str):
+    self.server = server
+    self.pid = pid
+    self.name = name
+    self._exitcode: int | None = None
+
+  @property
+  def exitcode(self) -> int | None:
+    if self._exitcode is None:
+      self.server.poll()
+      if not self.server.running and not os.path.exists(f"/proc/{self.pid}"):
+        # the zygote is gone and the process got reaped without it, its exit code is lost
+        self._exitcode = -signal.SIGKILL
+    return self._exitcode
+
+  def is_alive(self) -> bool:
+    return self.exitcode is None
+
+  def join(self, timeout: float | None = None) -> None:
+    t = time.monotonic()
+    while self.exitcode is None and (timeout is None or time.monotonic() - t < timeout):
+      time.sleep(0.001)
+
+
+class ForkServer:
+  """Forks processes from a zygote forked off the manager once everything is preimported
+
+  Forking from the zygote instead of the manager gives each process the same warm imports
+  without whatever the manager has built up since, and its frozen objects are never touched
+  by the garbage collector, so their pages stay shared copy-on-write with every process.
+  The zygote reaps its children and reports their exit codes back. It exits with the manager.
+  """
+  def __init__(self):
+    self.sock: socket.socket | None = None
+    self.pid: int | None = None
+    self.processes: dict[int, ForkedProcess] = {}
+    self.lock = threading.Lock()
+
+  @property
+  def running(self) -> bool:
+    return self.sock is not None
+
+  def start(self) -> None:
+    if self.running:
+      return
+
+    parent_sock, zygote_sock = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    handlers = {sig: signal.getsignal(sig) for sig in FORWARDED_SIGNALS}
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+      parent_sock.close()
+      code = 1
+      try:
+        code = Zygote(zygote_sock, handlers).run()
+      except Exception:
+        traceback.print_exc()
+      finally:
+        os._exit(code)
+
+    zygote_sock.close()
+    self.sock, self.pid = parent_sock, pid
+
+  def stop(self) -> None:
+    if self.sock is None:
+      return
+    # the zygote exits once its socket closes, processes it forked keep running
+    self.sock.close()
+    self.sock = None
+    try:
+      os.waitpid(self.pid, 0)
+    except ChildProcessError:
+      pass
+
+  def spawn(self, target: Callable, args: tuple, name: str) -> ForkedProcess | None:
+    """Runs target(*args) in a process forked by the zygote, None if the zygote is gone"""
+    with self.lock:
+      try:
+        self.sock.send(pickle.dumps(('spawn', target, args, dict(os.environ))))
+      except OSError:
+        self.sock.close()
+        self.sock = None
+        return None
+      while True:
+        msg = self.recv(block=True)
+        if msg is None:
+          return None
+        if msg[0] == 'started':
+          proc = self.processes[msg[1]] = ForkedProcess(self, msg[1], name)
+          return proc
+
+  def poll(self) -> None:
+    with self.lock:
+      while self.sock is not None and self.recv(block=False) is not None:
+        pass
+
+  def recv(self, block: bool):
+    try:
+      data = self.sock.recv(MAX_MESSAGE, 0 if block else socket.MSG_DONTWAIT)
+    except BlockingIOError:
+      return None
+    if not data:
+      # zygote died, the manager goes back to forking processes itself
+      self.sock.close()
+      self.sock = None
+      return None
+
+    msg = pickle.loads(data)
+    if msg[0] == 'exit':
+      proc = self.processes.pop(msg[1], None)
+      if proc is not None:
+        proc._exitcode = msg[2]
+    return msg
+
+
+class Zygote:
+  def __init__(self, sock: socket.socket, handlers: dict):
+    self.sock = sock
+    self.handlers = handlers
+
+  def run(self) -> int:
+    # the manager handles ctrl-c and stops everything itself
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+    # wake up on SIGCHLD to reap children
+    wakeup_r, wakeup_w = os.pipe2(os.O_NONBLOCK | os.O_CLOEXEC)
+    signal.signal(signal.SIGCHLD, lambda *_: None)
+    signal.set_wakeup_fd(wakeup_w)
+
+    # everything imported so far lives in the permanent generation, shared with every child
+    gc.collect()
+    gc.freeze()
+
+    while True:
+      readable, _, _ = select.select([self.sock, wakeup_r], [], [])
+      if wakeup_r in readable:
+        while True:
+          try:
+            os.read(wakeup_r, 512)
+          except BlockingIOError:
+            break
+      self.reap()
+
+      if self.sock in readable:
+        data = self.sock.recv(MAX_MESSAGE)
+        if not data:
+          return 0
+        _, target, args, env = pickle.loads(data)
+        pid = os.fork()
+        if pid == 0:
+          os.close(wakeup_r)
+          os.close(wakeup_w)
+          self.run_child(target, args, env)
+        self.sock.send(pickle.dumps(('started', pid)))
+
+  def reap(self) -> None:
+    while True:
+      try:
+        pid, status = os.waitpid(-1, os.WNOHANG)
+      except ChildProcessError:
+        return
+      if pid == 0:
+        return
+      self.sock.send(pickle.dumps(('exit', pid, exitcode_from_status(status))))
+
+  def run_child(self, target: Callable, args: tuple, env: dict) -> None:
+    code = 1
+    try:
+      self.sock.close()
+      signal.set_wakeup_fd(-1)
+      for sig, handler in self.handlers.items():
+        signal.signal(sig, handler)
+      os.environ.clear()
+      os.environ.update(env)
+
+      target(*args)
+      code = 0
+    except SystemExit as e:
+      code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    except BaseException:
+      # like multiprocessing.Process
+      traceback.print_exc()
+    finally:
+      sys.stdout.flush()
+      sys.stderr.flush()
+      os._exit(code)
@@ -15,7 +15,7 @@ from openpilot.common.params import Params, ParamKeyType
 from openpilot.common.text_window import TextWindow
 from openpilot.system.hardware import HARDWARE, PC
 from openpilot.selfdrive.manager.helpers import unblock_stdout, write_onroad_params, save_bootlog
-from openpilot.selfdrive.manager.process import ensure_running, launcher
+from openpilot.selfdrive.manager.process import ENABLE_FORKSERVER, ensure_running, fork_server, launcher
 from openpilot.selfdrive.manager.process_config import managed_processes
 from openpilot.selfdrive.athena.registration import register, UNREGISTERED_DONGLE_ID
 from openpilot.common.swaglog import cloudlog, add_file_handler
@@ -272,6 +272,9 @@ def manager_init() -> None:
   for p in managed_processes.values():
     p.prepare()
 
+  if ENABLE_FORKSERVER:
+    fork_server.start()
+
 
 def manager_cleanup() -> None:
   # send signals to kill all procs
@@ -282,6 +285,7 @@ def manager_cleanup() -> None:
   for p in managed_processes.values():
     p.stop(block=True)
 
+  fork_server.stop()
   cloudlog.info("everything is dead")
 
 def is_running_on_wsl2():
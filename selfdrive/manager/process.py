@@ -16,9 +16,14 @@ import openpilot.selfdrive.sentry as sentry
 from openpilot.common.basedir import BASEDIR
 from openpilot.common.params import Params
 from openpilot.common.swaglog import cloudlog
+from openpilot.selfdrive.manager.forkserver import ForkedProcess, ForkServer
 
 WATCHDOG_FN = "/dev/shm/wd_"
 ENABLE_WATCHDOG = os.getenv("NO_WATCHDOG") is None
+ENABLE_FORKSERVER = os.getenv("FORKSERVER") is not None
+
+# python processes are forked from here once it's started, see manager_init
+fork_server = ForkServer()
 
 
 def launcher(proc: str, name: str) -> None:
@@ -45,6 +50,10 @@ def launcher(proc: str, name: str) -> None:
     # with threads, so catch it here.
     sentry.capture_exception()
     raise
+  finally:
+    # the child exits through os._exit, which doesn't wait for records queued for the log thread
+    for handler in cloudlog.handlers:
+      handler.flush()
 
 
 def nativelauncher(pargs: list[str], cwd: str, name: str) -> None:
@@ -56,7 +65,7 @@ def nativelauncher(pargs: list[str], cwd: str, name: str) -> None:
   os.execvp(pargs[0], pargs)
 
 
-def join_process(process: Process, timeout: float) -> None:
+def join_process(process: Process | ForkedProcess, timeout: float) -> None:
   # Process().join(timeout) will hang due to a python 3 bug: https://bugs.python.org/issue28382
   # We have to poll the exitcode instead
   t = time.monotonic()
@@ -68,7 +77,7 @@ class ManagerProcess(ABC):
   daemon = False
   sigkill = False
   should_run: Callable[[bool, Params, car.CarParams], bool]
-  proc: Process | None = None
+  proc: Process | ForkedProcess | None = None
   enabled = True
   name = ""
 
@@ -222,8 +231,11 @@ class PythonProcess(ManagerProcess):
       return
 
     cloudlog.info(f"starting python {self.module}")
-    self.proc = Process(name=self.name, target=self.launcher, args=(self.module, self.name))
-    self.proc.start()
+    if fork_server.running:
+      self.proc = fork_server.spawn(self.launcher, (self.module, self.name), self.name)
+    if self.proc is None:
+      self.proc = Process(name=self.name, target=self.launcher, args=(self.module, self.name))
+      self.proc.start()
     self.watchdog_seen = False
     self.shutting_down = False
 
@@ -0,0 +1,13 @@
+import os
+import signal
+import socket
+
+import numpy as np  # noqa: F401  a heavy import the fork server has warm
+
+
+def main():
+  # first message: tell the test we're up
+  with socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM) as sock:
+    sock.sendto(str(os.getpid()).encode(), os.environ['FORKSERVER_TEST_SOCKET'])
+  while True:
+    signal.pause()
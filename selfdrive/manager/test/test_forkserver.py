@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+import os
+import signal
+import socket
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from openpilot.selfdrive.manager import process
+from openpilot.selfdrive.manager.forkserver import ForkedProcess, ForkServer
+from openpilot.selfdrive.manager.process import PythonProcess
+
+N_PROCS = 8
+DUMMY_MODULE = "openpilot.selfdrive.manager.test.forkserver_dummy"
+
+
+def memory_kb(pid: int) -> dict[str, int]:
+  with open(f"/proc/{pid}/smaps_rollup") as f:
+    return {line.split(':')[0]: int(line.split()[1]) for line in f if line.split()[-1] == "kB"}
+
+
+def always_run(started, params, CP):
+  return True
+
+
+def exit_with(code):
+  raise SystemExit(code)
+
+
+class TestForkServer(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.TemporaryDirectory()
+    self.sock_path = os.path.join(self.tmpdir.name, "sock")
+    self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    self.sock.bind(self.sock_path)
+    self.sock.settimeout(10)
+    os.environ['FORKSERVER_TEST_SOCKET'] = self.sock_path
+    self.server = ForkServer()
+
+  def tearDown(self):
+    self.server.stop()
+    self.sock.close()
+    self.tmpdir.cleanup()
+    del os.environ['FORKSERVER_TEST_SOCKET']
+
+  def launch(self, procs):
+    """Starts procs, returns the time to each one's first message"""
+    times = {}
+    for p in procs:
+      t = time.monotonic()
+      p.start()
+      times[p.proc.pid] = t
+    for _ in procs:
+      pid = int(self.sock.recv(64))
+      times[pid] = time.monotonic() - times[pid]
+    return times
+
+  def run_procs(self, use_fork_server):
+    procs = [PythonProcess(f"dummy{i}", DUMMY_MODULE, always_run) for i in range(N_PROCS)]
+    procs[0].prepare()
+    if use_fork_server:
+      self.server.start()
+    # what the manager builds up after preimporting, which the zygote doesn't have
+    ballast = [str(i) for i in range(1_000_000)]
+
+    with mock.patch.object(process, "fork_server", self.server):
+      times = self.launch(procs)
+      self.assertEqual(all(isinstance(p.proc, ForkedProcess) for p in procs), use_fork_server)
+      memory = [memory_kb(p.proc.pid) for p in procs]
+
+      for p in procs:
+        self.assertTrue(p.proc.is_alive())
+        self.assertEqual(p.stop(), 0)
+        self.assertIsNone(p.proc)
+    del ballast
+
+    rss = sum(m['Rss'] for m in memory) / len(memory) / 1024
+    pss = sum(m['Pss'] for m in memory) / len(memory) / 1024
+    name = "fork server" if use_fork_server else "multiprocessing"
+    print(f"{name:>15}: first message after {max(times.values()) * 1e3:.1f} ms max, {sum(times.values()) / len(times) * 1e3:.1f} ms mean, "
+          + f"{rss:.1f} MB rss, {pss:.1f} MB pss per process")
+    return pss / rss
+
+  def test_time_to_first_message(self):
+    self.run_procs(False)
+    shared = self.run_procs(True)
+    # most of each process is the zygote's pages
+    self.assertLess(shared, 0.5)
+
+  def test_exit_codes(self):
+    self.server.start()
+    for target, args, code in ((exit_with, (3,), 3), (exit_with, (None,), 0), (os.kill, (0, 0), 0), (int, ("x",), 1)):
+      proc = self.server.spawn(target, args, "test")
+      proc.join(5)
+      self.assertEqual(proc.exitcode, code)
+
+    proc = self.server.spawn(signal.pause, (), "test")
+    self.assertTrue(proc.is_alive())
+    os.kill(proc.pid, signal.SIGKILL)
+    proc.join(5)
+    self.assertEqual(proc.exitcode, -signal.SIGKILL)
+
+  def test_zygote_gone(self):
+    self.server.start()
+    os.kill(self.server.pid, signal.SIGKILL)
+    os.waitpid(self.server.pid, 0)
+    with mock.patch.object(process, "fork_server", self.server):
+      p = PythonProcess("dummy", DUMMY_MODULE, always_run)
+      self.launch([p])
+      # falls back to forking from here
+      self.assertFalse(self.server.running)
+      self.assertNotIsInstance(p.proc, ForkedProcess)
+      self.assertEqual(p.stop(), 0)
+
+
+if __name__ == "__main__":
+  unittest.main()
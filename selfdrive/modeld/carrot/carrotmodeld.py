@@ -37,6 +37,8 @@ def main():
   carrot = YOLOv8(Path(__file__).parent / 'yolov8n.onnx', conf_thres=0.3, iou_thres=0.5)
   last = 0
   rk = Ratekeeper(5, print_delay_threshold=None)
+  params = Params()
+  show_debug_ui = 0
 
   time.sleep(5)
 
@@ -47,7 +49,11 @@ def main():
 
     #sm.update(0)
 
-    if Params().get_int("ShowDebugUI") > 1:
+    # refresh the toggle once per second instead of constructing Params every frame
+    if rk.frame % 5 == 0:
+      show_debug_ui = params.get_int("ShowDebugUI")
+
+    if show_debug_ui > 1:
       t1 = time.perf_counter()
       #print("########### CARROT.start ##########")
       boxes, scores, class_ids = carrot(buf)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import time
+import types
+
+import numpy as np
+
+from openpilot.selfdrive.modeld.carrot.yolov8.YOLOv8 import YOLOv8
+from openpilot.selfdrive.modeld.carrot.tests.test_yolov8 import multiclass_nms_loop, prepare_input_ref, random_vision_buf
+
+# Per-frame CPU latency of the carrot detector pre- and post-processing, against the reference implementations.
+# Frames come from a recorded fcamera.hevc when given, model outputs from the onnx model when it exists,
+# otherwise from synthetic outputs with clusters of overlapping boxes. Detections are checked to be identical.
+
+DEFAULT_MODEL = os.path.join(os.path.dirname(__file__), '../yolov8n.onnx')
+
+
+def recorded_frames(fn, count):
+  from openpilot.tools.lib.framereader import FrameReader
+  fr = FrameReader(fn)
+  for i in range(min(count, fr.frame_count)):
+    nv12 = fr.get(i, pix_fmt="nv12")[0]
+    yield types.SimpleNamespace(data=nv12, uv_offset=fr.w * fr.h, stride=fr.w, width=fr.w, height=fr.h)
+
+
+def synthetic_output(rng, num_classes=9, num_anchors=8400, num_objects=40):
+  # (1, 4 + num_classes, num_anchors) like the model output, boxes in model input pixels
+  out = np.zeros((1, 4 + num_classes, num_anchors), dtype=np.float32)
+  centers = rng.uniform(0, 640, (num_objects, 2))
+  obj = rng.integers(0, num_objects, num_anchors)
+  out[0, 0:2] = (centers[obj] + rng.normal(0, 4, (num_anchors, 2))).T
+  out[0, 2:4] = rng.uniform(20, 120, (num_objects, 2))[obj].T * rng.uniform(0.9, 1.1, (2, num_anchors))
+  out[0, 4:] = rng.uniform(0, 0.2, (num_classes, num_anchors))
+  out[0, 4 + obj % num_classes, np.arange(num_anchors)] += rng.uniform(0, 0.8, num_anchors)
+  return [out]
+
+
+def process_output_ref(model, output):
+  predictions = np.squeeze(output[0]).T
+  scores = np.max(predictions[:, 4:], axis=1)
+  predictions = predictions[scores > model.conf_threshold, :]
+  scores = scores[scores > model.conf_threshold]
+  if len(scores) == 0:
+    return [], [], []
+  class_ids = np.argmax(predictions[:, 4:], axis=1)
+  boxes = model.extract_boxes(predictions)
+  indices = multiclass_nms_loop(boxes, scores, class_ids, model.iou_threshold)
+  return boxes[indices], scores[indices], class_ids[indices]
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--video", help="recorded fcamera.hevc to take frames from")
+  parser.add_argument("--model", default=DEFAULT_MODEL)
+  parser.add_argument("--frames", type=int, default=50)
+  args = parser.parse_args()
+
+  rng = np.random.default_rng(0)
+  if os.path.exists(args.model):
+    model = YOLOv8(args.model, conf_thres=0.3, iou_thres=0.5)
+  else:
+    print(f"{args.model} not found, using synthetic model outputs")
+    model = YOLOv8.__new__(YOLOv8)
+    model.conf_threshold, model.iou_threshold = 0.3, 0.5
+    model.input_pool, model.input_width, model.input_height = None, 640, 640
+  frames = recorded_frames(args.video, args.frames) if args.video else (random_vision_buf(rng) for _ in range(args.frames))
+
+  times = {k: [] for k in ("prepare ref", "prepare", "postprocess ref", "postprocess")}
+  detections = 0
+  for buf in frames:
+    t0 = time.perf_counter()
+    expected_input = prepare_input_ref(buf, model.input_width, model.input_height)
+    t1 = time.perf_counter()
+    input_tensor = model.prepare_input(buf)
+    t2 = time.perf_counter()
+    assert np.array_equal(input_tensor, expected_input)
+
+    output = model.inference(input_tensor) if hasattr(model, "session") else synthetic_output(rng)
+    t3 = time.perf_counter()
+    expected = process_output_ref(model, output)
+    t4 = time.perf_counter()
+    result = model.process_output(output)
+    t5 = time.perf_counter()
+    assert all(np.array_equal(a, b) for a, b in zip(result, expected, strict=True))
+
+    detections += len(result[0])
+    for k, dt in zip(times, (t1 - t0, t2 - t1, t4 - t3, t5 - t4), strict=True):
+      times[k].append(dt * 1e3)
+
+  print(f"{len(times['prepare'])} frames, {detections} detections, identical to the reference")
+  for k, v in times.items():
+    print(f"{k:>16}: {np.mean(v):7.2f} ms mean, {np.percentile(v, 90):7.2f} ms p90")
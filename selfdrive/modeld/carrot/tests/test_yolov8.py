@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+import types
+import unittest
+
+import cv2
+import numpy as np
+
+from openpilot.selfdrive.modeld.carrot.yolov8.utils import multiclass_nms, nms, compute_iou
+from openpilot.selfdrive.modeld.carrot.yolov8.YOLOv8 import YOLOv8, extract_image
+
+W, H = 1928, 1208
+
+
+def nms_loop(boxes, scores, iou_threshold):
+  """Reference for nms: the greedy loop over the sorted candidates it replaced"""
+  sorted_indices = np.argsort(scores)[::-1]
+  keep_boxes = []
+  while sorted_indices.size > 0:
+    box_id = sorted_indices[0]
+    keep_boxes.append(box_id)
+    ious = compute_iou(boxes[box_id, :], boxes[sorted_indices[1:], :])
+    sorted_indices = sorted_indices[np.where(ious < iou_threshold)[0] + 1]
+  return keep_boxes
+
+
+def multiclass_nms_loop(boxes, scores, class_ids, iou_threshold):
+  keep_boxes = []
+  for class_id in np.unique(class_ids):
+    class_indices = np.where(class_ids == class_id)[0]
+    keep_boxes.extend(class_indices[nms_loop(boxes[class_indices, :], scores[class_indices], iou_threshold)])
+  return keep_boxes
+
+
+def prepare_input_ref(buf, input_width, input_height):
+  """Reference for YOLOv8.prepare_input, allocating a new image at every step"""
+  input_img = cv2.resize(extract_image(buf), (input_width, input_height))
+  input_img = input_img / 255.0
+  return input_img.transpose(2, 0, 1)[np.newaxis, :, :, :].astype(np.float32)
+
+
+def random_detections(rng, n, num_classes=9, quantize=False):
+  centers = rng.uniform(0, W, (n, 2))
+  sizes = rng.uniform(5, 300, (n, 2))
+  scores = rng.uniform(0.3, 1.0, n)
+  if quantize:
+    # duplicate boxes and tied scores
+    centers, sizes, scores = np.round(centers / 50) * 50, np.round(sizes / 50) * 50, np.round(scores, 1)
+  boxes = np.concatenate((centers - sizes / 2, centers + sizes / 2), axis=1).astype(np.float32)
+  return boxes, scores.astype(np.float32), rng.integers(0, num_classes, n)
+
+
+def random_vision_buf(rng, width=W, height=H, stride=2048, uv_offset=2048 * 1216):
+  data = np.zeros(uv_offset + stride * height // 2, dtype=np.uint8)
+  yy, xx = np.mgrid[0:height, 0:width]
+  data[:uv_offset].reshape(-1, stride)[:height, :width] = (xx + yy) % 224 + rng.integers(0, 32, (height, width))
+  data[uv_offset:] = rng.integers(0, 256, stride * height // 2)
+  return types.SimpleNamespace(data=data, uv_offset=uv_offset, stride=stride, width=width, height=height)
+
+
+class TestYOLOv8(unittest.TestCase):
+  def test_nms_matches_loop(self):
+    rng = np.random.default_rng(0)
+    for i in range(200):
+      boxes, scores, class_ids = random_detections(rng, int(rng.integers(1, 300)), quantize=i % 2 == 1)
+      for iou_threshold in (0.1, 0.5, 0.7):
+        self.assertEqual(list(nms(boxes, scores, iou_threshold)), nms_loop(boxes, scores, iou_threshold))
+        self.assertEqual(list(multiclass_nms(boxes, scores, class_ids, iou_threshold)),
+                         multiclass_nms_loop(boxes, scores, class_ids, iou_threshold))
+
+  def test_nms_chain(self):
+    # each box only overlaps its neighbours, so suppression has to propagate down the whole chain
+    boxes = np.array([[10 * i, 0, 10 * i + 20, 10] for i in range(50)], dtype=np.float32)
+    scores = np.linspace(1.0, 0.5, 50, dtype=np.float32)
+    self.assertEqual(list(nms(boxes, scores, 0.3)), nms_loop(boxes, scores, 0.3))
+    self.assertEqual(list(nms(boxes, scores, 0.3)), list(range(0, 50, 2)))
+
+  def test_prepare_input(self):
+    rng = np.random.default_rng(0)
+    for input_width, input_height in ((640, 640), (512, 320)):
+      model = YOLOv8.__new__(YOLOv8)
+      model.input_pool = None
+      model.input_width, model.input_height = input_width, input_height
+      for _ in range(2):
+        buf = random_vision_buf(rng)
+        input_tensor = model.prepare_input(buf)
+        expected = prepare_input_ref(buf, input_width, input_height)
+        self.assertEqual(input_tensor.dtype, expected.dtype)
+        np.testing.assert_array_equal(input_tensor, expected)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -54,17 +54,23 @@ def box_iou(box1, box2):
   iou = inter / (area1 + area2 - inter)
   return iou
 
-def compute_nms(boxes, scores, iou_threshold):
-  order, keep = scores.argsort()[::-1], []
-  while order.size > 0:
-    i = order[0]
-    keep.append(i)
-    if order.size == 1:
-      break
-    iou = box_iou(boxes[i][None, :], boxes[order[1:]])
-    inds = np.where(iou.squeeze() <= iou_threshold)[0]
-    order = order[inds + 1]
-  return np.array(keep)
+def compute_nms(boxes, scores, iou_threshold, block_size=256):
+  order = scores.argsort()[::-1]
+  boxes = boxes[order]
+  keep = np.zeros(order.size, dtype=bool)
+  # candidates go through in blocks of block_size so the iou matrices stay kept x block and block x block
+  for start in range(0, order.size, block_size):
+    # boxes kept in earlier blocks remove what they overlap
+    alive = (box_iou(boxes[:start][keep[:start]], boxes[start:start + block_size]) <= iou_threshold).all(axis=0)
+    idxs = start + np.flatnonzero(alive)
+    # box i removes every later box j with iou > iou_threshold if it is kept itself, the greedy result is
+    # the only fixed point of keep = ~any(suppress[keep]) and iterating from "all kept" reaches it
+    suppress = np.triu(~(box_iou(boxes[idxs], boxes[idxs]) <= iou_threshold), 1)
+    block_keep = np.ones(idxs.size, dtype=bool)
+    while not np.array_equal(next_keep := ~suppress[block_keep].any(axis=0), block_keep):
+      block_keep = next_keep
+    keep[idxs[block_keep]] = True
+  return order[keep]
 
 def non_max_suppression(prediction, conf_thres=0.25, iou_thres=0.45, agnostic=False, max_det=300, nc=0, max_wh=7680):
   prediction = prediction[0] if isinstance(prediction, (list, tuple)) else prediction
@@ -429,5 +435,4 @@ if __name__ == '__main__':
 # TODO for later:
 #  1. Fix SPPF minor difference due to maxpool
 #  2. AST exp overflow warning while on cpu
-#  3. Make NMS faster
-#  4. Add video inference and webcam support
+#  3. Add video inference and webcam support
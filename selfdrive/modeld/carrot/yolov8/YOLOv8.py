@@ -63,11 +63,49 @@ def extract_image2(buf):
     rgb = cv2.cvtColor(yuv, cv2.COLOR_YUV2RGB_I420)
 
     return rgb
+
+
+# uint8 -> float32 of x / 255.0, same values as dividing in float64 and casting
+PIXEL_SCALE_LUT = (np.arange(256) / 255.0).astype(np.float32)
+
+class InputBufferPool:
+    """Buffers for converting one camera buffer size to the model input, reused for every frame"""
+    def __init__(self, width, height, input_width, input_height):
+        self.width, self.height = width, height
+        self.u = np.empty((height // 2, width // 2), dtype=np.uint8)
+        self.v = np.empty((height // 2, width // 2), dtype=np.uint8)
+        self.u_upsampled = np.empty((height, width), dtype=np.uint8)
+        self.v_upsampled = np.empty((height, width), dtype=np.uint8)
+        self.yuv = np.empty((height, width, 3), dtype=np.uint8)
+        self.rgb = np.empty((height, width, 3), dtype=np.uint8)
+        self.resized = np.empty((input_height, input_width, 3), dtype=np.uint8)
+        self.input_tensor = np.empty((1, 3, input_height, input_width), dtype=np.float32)
+
+    def __call__(self, buf):
+        # same conversion as extract_image() and the resize/scale in prepare_input, without allocating
+        w, h = self.width, self.height
+        data = np.asarray(buf.data)
+        y = data[:buf.uv_offset].reshape((-1, buf.stride))[:h, :w]
+        uv = data[buf.uv_offset:buf.uv_offset + buf.stride * (h // 2)].reshape((-1, buf.stride))
+        np.copyto(self.u, uv[:, 0:w:2])
+        np.copyto(self.v, uv[:, 1:w:2])
+
+        cv2.resize(self.u, (w, h), dst=self.u_upsampled, interpolation=cv2.INTER_LINEAR)
+        cv2.resize(self.v, (w, h), dst=self.v_upsampled, interpolation=cv2.INTER_LINEAR)
+        cv2.merge([y, self.u_upsampled, self.v_upsampled], dst=self.yuv)
+        cv2.cvtColor(self.yuv, cv2.COLOR_YUV2RGB, dst=self.rgb)
+
+        cv2.resize(self.rgb, (self.resized.shape[1], self.resized.shape[0]), dst=self.resized)
+        np.take(PIXEL_SCALE_LUT, self.resized.transpose(2, 0, 1), out=self.input_tensor[0])
+        return self.input_tensor
+
+
 class YOLOv8:
 
     def __init__(self, path, conf_thres=0.5, iou_thres=0.5):
         self.conf_threshold = conf_thres
         self.iou_threshold = iou_thres
+        self.input_pool = None
 
         # Initialize model
         self.initialize_model(path)
@@ -112,31 +150,13 @@ class YOLOv8:
 
 
     def prepare_input(self, image):
-        input_img = extract_image(image)
-
         self.img_height, self.img_width = 1208, 1928 #image.height, image.width #image.shape[:2]
 
-        #input_img = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-        #image_path = "/home/yun/media_log/fcamera.hevc_20231212_145229.704.jpg"
-        #image = cv2.imread(image_path)
-        #if image is None:
-        #  #print(f"Error: Could not load image at {image_path}")
-        #  pass
-        #else:
-        #   cv2.imshow("hello", input_img)
-        #   cv2.waitKey(1)
-
-        #input_img = image
-
-        # Resize input image
-        input_img = cv2.resize(input_img, (self.input_width, self.input_height))
+        if self.input_pool is None or (self.input_pool.width, self.input_pool.height) != (image.width, image.height):
+            self.input_pool = InputBufferPool(image.width, image.height, self.input_width, self.input_height)
 
-        # Scale input pixel values to 0 to 1
-        input_img = input_img / 255.0
-        input_img = input_img.transpose(2, 0, 1)
-        input_tensor = input_img[np.newaxis, :, :, :].astype(np.float32)
-
-        return input_tensor
+        # Returns the pool's input tensor, overwritten by the next call
+        return self.input_pool(image)
 
 
     def inference(self, input_tensor):
@@ -147,18 +167,20 @@ class YOLOv8:
         return outputs
 
     def process_output(self, output):
-        predictions = np.squeeze(output[0]).T
+        # (4 + classes, anchors), anchors stay on the contiguous axis until the candidates are picked
+        predictions = np.squeeze(output[0])
 
-        # Filter out object confidence scores below threshold
-        scores = np.max(predictions[:, 4:], axis=1)
-        predictions = predictions[scores > self.conf_threshold, :]
-        scores = scores[scores > self.conf_threshold]
+        # Get the class with the highest confidence
+        class_ids = np.argmax(predictions[4:], axis=0)
+        scores = np.take_along_axis(predictions[4:], class_ids[np.newaxis], axis=0)[0]
 
-        if len(scores) == 0:
+        # Filter out object confidence scores below threshold
+        mask = scores > self.conf_threshold
+        if not mask.any():
             return [], [], []
-
-        # Get the class with the highest confidence
-        class_ids = np.argmax(predictions[:, 4:], axis=1)
+        predictions = predictions[:, mask].T
+        scores = scores[mask]
+        class_ids = class_ids[mask]
 
         # Get bounding boxes for each object
         boxes = self.extract_boxes(predictions)
@@ -22,37 +22,43 @@ def nms(boxes, scores, iou_threshold):
     # Sort by score
     sorted_indices = np.argsort(scores)[::-1]
 
-    keep_boxes = []
-    while sorted_indices.size > 0:
-        # Pick the last box
-        box_id = sorted_indices[0]
-        keep_boxes.append(box_id)
-
-        # Compute IoU of the picked box with the rest
-        ious = compute_iou(boxes[box_id, :], boxes[sorted_indices[1:], :])
-
-        # Remove boxes with IoU over the threshold
-        keep_indices = np.where(ious < iou_threshold)[0]
-
-        # print(keep_indices.shape, sorted_indices.shape)
-        sorted_indices = sorted_indices[keep_indices + 1]
-
-    return keep_boxes
+    keep = greedy_keep(boxes[sorted_indices, :], np.zeros(1, dtype=int), iou_threshold)
+    return sorted_indices[keep]
 
 def multiclass_nms(boxes, scores, class_ids, iou_threshold):
-
-    unique_class_ids = np.unique(class_ids)
-
-    keep_boxes = []
-    for class_id in unique_class_ids:
+    # Candidates grouped per class, each group sorted by score like nms()
+    order = []
+    for class_id in np.unique(class_ids):
         class_indices = np.where(class_ids == class_id)[0]
-        class_boxes = boxes[class_indices,:]
-        class_scores = scores[class_indices]
+        order.append(class_indices[np.argsort(scores[class_indices])[::-1]])
+    group_starts = np.cumsum([0] + [len(o) for o in order[:-1]])
+    order = np.concatenate(order)
+
+    # All classes are suppressed together, boxes only suppress boxes of their own group
+    keep = greedy_keep(boxes[order, :], group_starts, iou_threshold)
+    return order[keep]
+
+def greedy_keep(sorted_boxes, group_starts, iou_threshold):
+    # Greedy NMS of every group at once, each step keeps the best remaining box of every group
+    # and removes the boxes that overlap it. Steps are bounded by the most boxes kept in one group.
+    n = len(sorted_boxes)
+    group = np.repeat(np.arange(len(group_starts)), np.diff(np.append(group_starts, n)))
+    positions = np.arange(n)
+    alive = np.ones(n, dtype=bool)
+    keep = np.zeros(n, dtype=bool)
+    while alive.any():
+        best = np.minimum.reduceat(np.where(alive, positions, n), group_starts)
+        best_alive = best[best < n]
+        keep[best_alive] = True
+        alive[best_alive] = False
+
+        # Compute IoU of the picked box of each group with the rest of that group
+        rest = np.flatnonzero(alive)
+        ious = compute_iou(sorted_boxes[best[group[rest]], :].T, sorted_boxes[rest, :])
 
-        class_keep_boxes = nms(class_boxes, class_scores, iou_threshold)
-        keep_boxes.extend(class_indices[class_keep_boxes])
-
-    return keep_boxes
+        # Remove boxes with IoU over the threshold
+        alive[rest[~(ious < iou_threshold)]] = False
+    return keep
 
 def compute_iou(box, boxes):
     # Compute xmin, ymin, xmax, ymax for both boxes
@@ -0,0 +1,27 @@
+import numpy as np
+
+
+class HistoryBuffer:
+  """Fixed length history of equally sized entries, oldest first, as one flat array.
+
+  Every entry is stored twice, at its slot and one history length further, so the whole history
+  is always a contiguous slice of the storage and adding an entry does not move the others.
+  """
+  def __init__(self, length: int, width: int, dtype=np.float32):
+    self.length = length
+    self.width = width
+    self.storage = np.zeros(2 * length * width, dtype=dtype)
+    self.start = 0  # slot of the oldest entry
+
+  def push(self, entry: np.ndarray | float) -> None:
+    # the newest entry replaces the oldest one
+    i = self.start * self.width
+    j = (self.start + self.length) * self.width
+    self.storage[i:i + self.width] = entry
+    self.storage[j:j + self.width] = entry
+    self.start = (self.start + 1) % self.length
+
+  def get(self) -> np.ndarray:
+    # view of the history, only valid until the next push
+    i = self.start * self.width
+    return self.storage[i:i + self.length * self.width]
@@ -22,6 +22,7 @@ from openpilot.selfdrive.modeld.runners import ModelRunner, Runtime
 from openpilot.selfdrive.modeld.parse_model_outputs import Parser
 from openpilot.selfdrive.modeld.fill_model_msg import fill_model_msg, fill_pose_msg, PublishState
 from openpilot.selfdrive.modeld.constants import ModelConstants
+from openpilot.selfdrive.modeld.history_buffer import HistoryBuffer
 from openpilot.selfdrive.modeld.models.commonmodel_pyx import ModelFrame, CLContext
 
 PROCESS_NAME = "selfdrive.modeld.modeld"
@@ -46,6 +47,7 @@ class ModelState:
   frame: ModelFrame
   wide_frame: ModelFrame
   inputs: dict[str, np.ndarray]
+  history: dict[str, HistoryBuffer]
   output: np.ndarray
   prev_desire: np.ndarray  # for tracking the rising edge of the pulse
   model: ModelRunner
@@ -54,12 +56,17 @@ class ModelState:
     self.frame = ModelFrame(context)
     self.wide_frame = ModelFrame(context)
     self.prev_desire = np.zeros(ModelConstants.DESIRE_LEN, dtype=np.float32)
+    self.history = {
+      'desire': HistoryBuffer(ModelConstants.HISTORY_BUFFER_LEN+1, ModelConstants.DESIRE_LEN),
+      'prev_desired_curv': HistoryBuffer(ModelConstants.HISTORY_BUFFER_LEN+1, ModelConstants.PREV_DESIRED_CURV_LEN),
+      'features_buffer': HistoryBuffer(ModelConstants.HISTORY_BUFFER_LEN, ModelConstants.FEATURE_LEN),
+    }
     self.inputs = {
-      'desire': np.zeros(ModelConstants.DESIRE_LEN * (ModelConstants.HISTORY_BUFFER_LEN+1), dtype=np.float32),
+      'desire': self.history['desire'].get(),
       'traffic_convention': np.zeros(ModelConstants.TRAFFIC_CONVENTION_LEN, dtype=np.float32),
       'lateral_control_params': np.zeros(ModelConstants.LATERAL_CONTROL_PARAMS_LEN, dtype=np.float32),
-      'prev_desired_curv': np.zeros(ModelConstants.PREV_DESIRED_CURV_LEN * (ModelConstants.HISTORY_BUFFER_LEN+1), dtype=np.float32),
-      'features_buffer': np.zeros(ModelConstants.HISTORY_BUFFER_LEN * ModelConstants.FEATURE_LEN, dtype=np.float32),
+      'prev_desired_curv': self.history['prev_desired_curv'].get(),
+      'features_buffer': self.history['features_buffer'].get(),
     }
 
     with open(METADATA_PATH, 'rb') as f:
@@ -68,7 +75,7 @@ class ModelState:
     self.output_slices = model_metadata['output_slices']
     net_output_size = model_metadata['output_shapes']['outputs'][1]
     self.output = np.zeros(net_output_size, dtype=np.float32)
-    self.parser = Parser()
+    self.parser = Parser(preallocate=True)
 
     self.model = ModelRunner(MODEL_PATHS, self.output, Runtime.GPU, False, context)
     self.model.addInput("input_imgs", None)
@@ -82,12 +89,17 @@ class ModelState:
       parsed_model_outputs['raw_pred'] = model_outputs.copy()
     return parsed_model_outputs
 
+  def push_history(self, name: str, entry: np.ndarray) -> None:
+    # the history moves to a new contiguous view of its buffer instead of being shifted in place
+    self.history[name].push(entry)
+    self.inputs[name] = self.history[name].get()
+    self.model.setInputBuffer(name, self.inputs[name])
+
   def run(self, buf: VisionBuf, wbuf: VisionBuf, transform: np.ndarray, transform_wide: np.ndarray,
                 inputs: dict[str, np.ndarray], prepare_only: bool) -> dict[str, np.ndarray] | None:
     # Model decides when action is completed, so desire input is just a pulse triggered on rising edge
     inputs['desire'][0] = 0
-    self.inputs['desire'][:-ModelConstants.DESIRE_LEN] = self.inputs['desire'][ModelConstants.DESIRE_LEN:]
-    self.inputs['desire'][-ModelConstants.DESIRE_LEN:] = np.where(inputs['desire'] - self.prev_desire > .99, inputs['desire'], 0)
+    self.push_history('desire', np.where(inputs['desire'] - self.prev_desire > .99, inputs['desire'], 0))
     self.prev_desire[:] = inputs['desire']
 
     self.inputs['traffic_convention'][:] = inputs['traffic_convention']
@@ -104,10 +116,8 @@ class ModelState:
     self.model.execute()
     outputs = self.parser.parse_outputs(self.slice_outputs(self.output))
 
-    self.inputs['features_buffer'][:-ModelConstants.FEATURE_LEN] = self.inputs['features_buffer'][ModelConstants.FEATURE_LEN:]
-    self.inputs['features_buffer'][-ModelConstants.FEATURE_LEN:] = outputs['hidden_state'][0, :]
-    self.inputs['prev_desired_curv'][:-ModelConstants.PREV_DESIRED_CURV_LEN] = self.inputs['prev_desired_curv'][ModelConstants.PREV_DESIRED_CURV_LEN:]
-    self.inputs['prev_desired_curv'][-ModelConstants.PREV_DESIRED_CURV_LEN:] = outputs['desired_curvature'][0, :]
+    self.push_history('features_buffer', outputs['hidden_state'][0, :])
+    self.push_history('prev_desired_curv', outputs['desired_curvature'][0, :])
     return outputs
 
 
@@ -1,8 +1,13 @@
 import numpy as np
 from openpilot.selfdrive.modeld.constants import ModelConstants
 
-def sigmoid(x):
-  return 1. / (1. + np.exp(-x))
+def sigmoid(x, out=None):
+  if out is None:
+    return 1. / (1. + np.exp(-x))
+  np.negative(x, out=out)
+  np.exp(out, out=out)
+  out += 1.
+  return np.reciprocal(out, out=out)
 
 def softmax(x, axis=-1):
   x -= np.max(x, axis=axis, keepdims=True)
@@ -14,14 +19,26 @@ def softmax(x, axis=-1):
   return x
 
 class Parser:
-  def __init__(self, ignore_missing=False):
+  def __init__(self, ignore_missing=False, preallocate=False):
     self.ignore_missing = ignore_missing
+    # with preallocate, parsed outputs are written into buffers that are reused for every frame,
+    # so they are only valid until the next parse_outputs call
+    self.preallocate = preallocate
+    self.buffers: dict[str, np.ndarray] = {}
 
   def check_missing(self, outs, name):
     if name not in outs and not self.ignore_missing:
       raise ValueError(f"Missing output {name}")
     return name not in outs
 
+  def get_buffer(self, name, shape, dtype):
+    if not self.preallocate:
+      return np.empty(shape, dtype=dtype)
+    buf = self.buffers.get(name)
+    if buf is None or buf.shape != shape or buf.dtype != dtype:
+      buf = self.buffers[name] = np.empty(shape, dtype=dtype)
+    return buf
+
   def parse_categorical_crossentropy(self, name, outs, out_shape=None):
     if self.check_missing(outs, name):
       return
@@ -34,7 +51,7 @@ class Parser:
     if self.check_missing(outs, name):
       return
     raw = outs[name]
-    outs[name] = sigmoid(raw)
+    outs[name] = sigmoid(raw, out=self.get_buffer(name, raw.shape, raw.dtype))
 
   def parse_mdn(self, name, outs, in_N=0, out_N=1, out_shape=None):
     if self.check_missing(outs, name):
@@ -42,37 +59,37 @@ class Parser:
     raw = outs[name]
     raw = raw.reshape((raw.shape[0], max(in_N, 1), -1))
 
-    pred_mu = raw[:,:,:(raw.shape[2] - out_N)//2]
     n_values = (raw.shape[2] - out_N)//2
-    pred_mu = raw[:,:,:n_values]
-    pred_std = np.exp(raw[:,:,n_values: 2*n_values])
-
     if in_N > 1:
-      weights = np.zeros((raw.shape[0], in_N, out_N), dtype=raw.dtype)
-      for i in range(out_N):
-        weights[:,:,i - out_N] = softmax(raw[:,:,i - out_N], axis=-1)
-
+      rows = np.arange(raw.shape[0])[:,np.newaxis]
+      weights = softmax(raw[:,:,2*n_values:], axis=1)
       if out_N == 1:
-        for fidx in range(weights.shape[0]):
-          idxs = np.argsort(weights[fidx][:,0])[::-1]
-          weights[fidx] = weights[fidx][idxs]
-          pred_mu[fidx] = pred_mu[fidx][idxs]
-          pred_std[fidx] = pred_std[fidx][idxs]
+        # sort hypotheses by weight, highest first
+        order = np.argsort(weights[:,:,0], axis=1)[:,::-1]
+      else:
+        order = np.arange(in_N)
+      hypotheses = raw[rows, order]
+
       full_shape = tuple([raw.shape[0], in_N] + list(out_shape))
+      pred_mu = self.get_buffer(name + '_hypotheses', full_shape, raw.dtype).reshape((raw.shape[0], in_N, n_values))
+      pred_std = self.get_buffer(name + '_stds_hypotheses', full_shape, raw.dtype).reshape((raw.shape[0], in_N, n_values))
+      weights = self.get_buffer(name + '_weights', (raw.shape[0], in_N, out_N), raw.dtype)
+      pred_mu[:] = hypotheses[:,:,:n_values]
+      np.exp(hypotheses[:,:,n_values: 2*n_values], out=pred_std)
+      weights[:] = hypotheses[:,:,2*n_values:]
       outs[name + '_weights'] = weights
       outs[name + '_hypotheses'] = pred_mu.reshape(full_shape)
       outs[name + '_stds_hypotheses'] = pred_std.reshape(full_shape)
 
-      pred_mu_final = np.zeros((raw.shape[0], out_N, n_values), dtype=raw.dtype)
-      pred_std_final = np.zeros((raw.shape[0], out_N, n_values), dtype=raw.dtype)
-      for fidx in range(weights.shape[0]):
-        for hidx in range(out_N):
-          idxs = np.argsort(weights[fidx,:,hidx])[::-1]
-          pred_mu_final[fidx, hidx] = pred_mu[fidx, idxs[0]]
-          pred_std_final[fidx, hidx] = pred_std[fidx, idxs[0]]
+      # best hypothesis for every selection
+      best = np.argmax(weights, axis=1)
+      pred_mu_final = self.get_buffer(name + '_mu_final', (raw.shape[0], out_N, n_values), raw.dtype)
+      pred_std_final = self.get_buffer(name + '_std_final', (raw.shape[0], out_N, n_values), raw.dtype)
+      pred_mu_final[:] = pred_mu[rows, best]
+      pred_std_final[:] = pred_std[rows, best]
     else:
-      pred_mu_final = pred_mu
-      pred_std_final = pred_std
+      pred_mu_final = raw[:,:,:n_values]
+      pred_std_final = np.exp(raw[:,:,n_values: 2*n_values], out=self.get_buffer(name + '_stds', (raw.shape[0], 1, n_values), raw.dtype))
 
     if out_N > 1:
       final_shape = tuple([raw.shape[0], out_N] + list(out_shape))
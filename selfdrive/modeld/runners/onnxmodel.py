@@ -68,9 +68,25 @@ class ONNXModel(RunModel):
     self.input_shapes = {x.name: [1, *x.shape[1:]] for x in self.session.get_inputs()}
     self.input_dtypes = {x.name: ORT_TYPES_TO_NP_TYPES[x.type] for x in self.session.get_inputs()}
 
+    # inputs and the output live in persistent buffers bound once to the session, so execute only
+    # converts the caller's buffers into them and runs without allocating
+    self.binding = self.session.io_binding()
+    self.input_buffers = {}
+    for k in self.input_names:
+      buf = np.zeros(self.input_shapes[k], dtype=self.input_dtypes[k])
+      self.binding.bind_input(k, 'cpu', 0, buf.dtype, buf.shape, buf.ctypes.data)
+      self.input_buffers[k] = buf.reshape(-1)
+
+    session_outputs = self.session.get_outputs()
+    assert len(session_outputs) == 1, "Only single model outputs are supported"
+    assert self.output.dtype == np.float32 and self.output.flags.c_contiguous
+    output_shape = [1, *session_outputs[0].shape[1:]]
+    assert np.prod(output_shape) == self.output.size, f"output buffer of size {self.output.size} doesn't fit model output {output_shape}"
+    self.binding.bind_output(session_outputs[0].name, 'cpu', 0, self.output.dtype, output_shape, self.output.ctypes.data)
+
     # run once to initialize CUDA provider
     if "CUDAExecutionProvider" in self.session.get_providers():
-      self.session.run(None, {k: np.zeros(self.input_shapes[k], dtype=self.input_dtypes[k]) for k in self.input_names})
+      self.session.run_with_iobinding(self.binding)
     print("ready to run onnx model", self.input_shapes, file=sys.stderr)
 
   def addInput(self, name, buffer):
@@ -81,13 +97,24 @@ class ONNXModel(RunModel):
     assert name in self.inputs
     self.inputs[name] = buffer
 
+  def getInputBuffer(self, name):
+    # flat buffer bound to the session in the model's dtype; passing it to addInput or setInputBuffer
+    # and writing into it in place skips the per-call conversion
+    return self.input_buffers[name]
+
   def getCLBuffer(self, name):
     return None
 
   def execute(self):
-    inputs = {k: (v.view(np.uint8) / 255. if self.use_tf8 and k == 'input_img' else v) for k,v in self.inputs.items()}
-    inputs = {k: v.reshape(self.input_shapes[k]).astype(self.input_dtypes[k]) for k,v in inputs.items()}
-    outputs = self.session.run(None, inputs)
-    assert len(outputs) == 1, "Only single model outputs are supported"
-    self.output[:] = outputs[0]
+    for k, v in self.inputs.items():
+      buf = self.input_buffers[k]
+      if v is None or v is buf:
+        continue
+      if self.use_tf8 and k == 'input_img':
+        # gives the same float32 values as dividing in float64 and casting
+        np.copyto(buf, v.view(np.uint8).reshape(-1))
+        np.divide(buf, 255, out=buf)
+      else:
+        np.copyto(buf, v.reshape(-1), casting='unsafe')
+    self.session.run_with_iobinding(self.binding)
     return self.output
@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+import timeit
+
+import numpy as np
+
+from openpilot.selfdrive.modeld.history_buffer import HistoryBuffer
+from openpilot.selfdrive.modeld.tests.test_history_buffer import HISTORY_INPUTS, shift_push
+
+N = 20000
+
+
+if __name__ == "__main__":
+  for name, (length, width) in HISTORY_INPUTS.items():
+    entry = np.ones(width, dtype=np.float32)
+    shifted = np.zeros(length * width, dtype=np.float32)
+    history = HistoryBuffer(length, width)
+
+    t_shift = timeit.timeit(lambda: shift_push(shifted, entry, width), number=N) / N  # noqa: B023
+    t_ring = timeit.timeit(lambda: (history.push(entry), history.get()), number=N) / N  # noqa: B023
+    print(f"{name:>18} ({length}x{width}, {shifted.nbytes / 1024:6.1f} kB): shift {t_shift * 1e6:6.2f} us, ring buffer {t_ring * 1e6:6.2f} us per frame")
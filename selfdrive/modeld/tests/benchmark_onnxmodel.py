@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+from openpilot.selfdrive.modeld.tests.test_onnxmodel import OUTPUT_LEN, ONNXModel, RecastONNXModel, make_model, random_inputs
+
+N = 2000
+
+
+def measure(model):
+  model.execute()
+  tracemalloc.start()
+  peak = 0
+  for _ in range(50):
+    tracemalloc.reset_peak()
+    start = tracemalloc.get_traced_memory()[0]
+    model.execute()
+    peak = max(peak, tracemalloc.get_traced_memory()[1] - start)
+  tracemalloc.stop()
+
+  t = time.perf_counter()
+  for _ in range(N):
+    model.execute()
+  return peak, (time.perf_counter() - t) / N
+
+
+if __name__ == "__main__":
+  np.random.seed(0)
+  with tempfile.TemporaryDirectory() as tmpdir:
+    path = os.path.join(tmpdir, 'tiny.onnx')
+    make_model(path)
+
+    for use_tf8 in (False, True):
+      inputs = random_inputs(use_tf8)
+      outputs = []
+      for name, model in (("recast", RecastONNXModel(path, np.zeros(OUTPUT_LEN, dtype=np.float32), use_tf8)),
+                          ("io binding", ONNXModel(path, np.zeros(OUTPUT_LEN, dtype=np.float32), None, use_tf8, None))):
+        for k, v in inputs.items():
+          model.addInput(k, v)
+        peak, t = measure(model)
+        outputs.append(model.output.copy())
+        print(f"tf8={use_tf8:d} {name:>10}: {t * 1e6:7.2f} us/call, {peak:6d} bytes allocated per call")
+      assert np.array_equal(*outputs)
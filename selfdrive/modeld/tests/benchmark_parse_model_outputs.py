@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+import time
+
+import numpy as np
+
+from openpilot.selfdrive.modeld.constants import ModelConstants
+from openpilot.selfdrive.modeld.parse_model_outputs import Parser
+from openpilot.selfdrive.modeld.tests.test_parse_model_outputs import ReferenceParser, output_slices, random_output, slice_outputs
+
+N = 2000
+ROUNDS = 5
+
+
+def parse_mdn_heads(parser, outs):
+  parser.parse_mdn('plan', outs, in_N=ModelConstants.PLAN_MHP_N, out_N=ModelConstants.PLAN_MHP_SELECTION,
+                   out_shape=(ModelConstants.IDX_N,ModelConstants.PLAN_WIDTH))
+  parser.parse_mdn('lead', outs, in_N=ModelConstants.LEAD_MHP_N, out_N=ModelConstants.LEAD_MHP_SELECTION,
+                   out_shape=(ModelConstants.LEAD_TRAJ_LEN,ModelConstants.LEAD_WIDTH))
+
+
+if __name__ == "__main__":
+  rng = np.random.default_rng(0)
+  slices, size = output_slices()
+  outputs = [random_output(rng, size) for _ in range(N)]
+  parsers = {"reference": ReferenceParser(), "vectorized": Parser(), "preallocated": Parser(preallocate=True)}
+
+  # rounds are interleaved so all parsers see the same machine load
+  times = {(name, fn.__name__): [] for name in parsers for fn in (Parser.parse_outputs, parse_mdn_heads)}
+  for _ in range(ROUNDS):
+    for name, parser in parsers.items():
+      for fn in (Parser.parse_outputs, parse_mdn_heads):
+        for output in outputs:
+          # parsing works in place on the model output buffer, like modeld
+          outs = slice_outputs(output.copy(), slices)
+          t = time.perf_counter()
+          fn(parser, outs)
+          times[(name, fn.__name__)].append(time.perf_counter() - t)
+
+  print(f"per frame, median of {N * ROUNDS} random model outputs")
+  for (name, fn_name), t in times.items():
+    t = np.array(t) * 1e6
+    print(f"{name:>12} {fn_name:>15}: {np.median(t):7.1f} us median, {np.percentile(t, 99):7.1f} us p99")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+import unittest
+
+import numpy as np
+
+from openpilot.selfdrive.modeld.constants import ModelConstants
+from openpilot.selfdrive.modeld.history_buffer import HistoryBuffer
+
+# (length, width) of the modeld inputs kept as history
+HISTORY_INPUTS = {
+  'desire': (ModelConstants.HISTORY_BUFFER_LEN+1, ModelConstants.DESIRE_LEN),
+  'prev_desired_curv': (ModelConstants.HISTORY_BUFFER_LEN+1, ModelConstants.PREV_DESIRED_CURV_LEN),
+  'features_buffer': (ModelConstants.HISTORY_BUFFER_LEN, ModelConstants.FEATURE_LEN),
+}
+
+
+def shift_push(buf, entry, width):
+  # what ModelState did before: shift the whole history by one entry and write the newest at the end
+  buf[:-width] = buf[width:]
+  buf[-width:] = entry
+
+
+class TestHistoryBuffer(unittest.TestCase):
+  def test_matches_shifted_history(self):
+    rng = np.random.default_rng(0)
+    for name, (length, width) in HISTORY_INPUTS.items():
+      with self.subTest(name=name):
+        history = HistoryBuffer(length, width)
+        expected = np.zeros(length * width, dtype=np.float32)
+        self.assertEqual(history.get().tobytes(), expected.tobytes())
+        for _ in range(3 * length + 7):
+          entry = rng.standard_normal(width).astype(np.float32)
+          shift_push(expected, entry, width)
+          history.push(entry)
+          view = history.get()
+          self.assertTrue(view.flags.c_contiguous)
+          self.assertEqual(view.dtype, np.float32)
+          self.assertEqual(view.tobytes(), expected.tobytes())
+
+  def test_long_run(self):
+    rng = np.random.default_rng(1)
+    length, width = HISTORY_INPUTS['desire']
+    history = HistoryBuffer(length, width)
+    expected = np.zeros(length * width, dtype=np.float32)
+    for _ in range(5000):
+      # mostly zeros with pulses, like the desire input
+      entry = np.where(rng.random(width) > 0.95, 1., 0.)
+      shift_push(expected, entry, width)
+      history.push(entry)
+      self.assertEqual(history.get().tobytes(), expected.tobytes())
+
+  def test_view_does_not_copy(self):
+    history = HistoryBuffer(*HISTORY_INPUTS['features_buffer'])
+    for _ in range(10):
+      history.push(np.ones(ModelConstants.FEATURE_LEN))
+      self.assertTrue(np.shares_memory(history.get(), history.storage))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+import os
+import tempfile
+import tracemalloc
+import unittest
+import numpy as np
+import onnx
+from onnx import TensorProto, helper
+
+os.environ['ONNXCPU'] = '1'
+from openpilot.selfdrive.modeld.runners.onnxmodel import ONNXModel, create_ort_session
+
+IMG_LEN = 4096
+CALIB_LEN = 3
+MODE_LEN = 2
+OUTPUT_LEN = IMG_LEN + CALIB_LEN + MODE_LEN
+
+
+def make_model(path):
+  # fp16 model like the shipped ones, runs as fp32 after convert_fp16_to_fp32. outputs: the inputs concatenated and scaled by 2
+  inputs = [
+    helper.make_tensor_value_info('input_img', TensorProto.FLOAT16, [1, 16, IMG_LEN // 16]),
+    helper.make_tensor_value_info('calib', TensorProto.FLOAT, [1, CALIB_LEN]),
+    helper.make_tensor_value_info('mode', TensorProto.UINT8, [1, MODE_LEN]),
+  ]
+  output = helper.make_tensor_value_info('outputs', TensorProto.FLOAT16, [1, OUTPUT_LEN])
+  shape = helper.make_tensor('shape', TensorProto.INT64, [2], [1, -1])
+  two = helper.make_tensor('two', TensorProto.FLOAT16, [], np.array(2, dtype=np.float16).tobytes(), raw=True)
+  nodes = [
+    helper.make_node('Reshape', ['input_img', 'shape'], ['img_flat']),
+    helper.make_node('Cast', ['mode'], ['mode_float'], to=TensorProto.FLOAT),
+    helper.make_node('Concat', ['img_flat', 'calib', 'mode_float'], ['concat'], axis=1),
+    helper.make_node('Mul', ['concat', 'two'], ['outputs']),
+  ]
+  graph = helper.make_graph(nodes, 'tiny', inputs, [output], initializer=[shape, two])
+  model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+  model.ir_version = 8
+  onnx.save(model, path)
+
+
+class RecastONNXModel:
+  """Reference for ONNXModel.execute: recasts every input and copies the session output on each call"""
+  def __init__(self, path, output, use_tf8):
+    self.inputs = {}
+    self.output = output
+    self.use_tf8 = use_tf8
+    self.session = create_ort_session(path, fp16_to_fp32=True)
+    self.input_shapes = {x.name: [1, *x.shape[1:]] for x in self.session.get_inputs()}
+    self.input_dtypes = {x.name: {'tensor(float)': np.float32, 'tensor(uint8)': np.uint8}[x.type] for x in self.session.get_inputs()}
+
+  def addInput(self, name, buffer):
+    self.inputs[name] = buffer
+
+  def setInputBuffer(self, name, buffer):
+    self.inputs[name] = buffer
+
+  def execute(self):
+    inputs = {k: (v.view(np.uint8) / 255. if self.use_tf8 and k == 'input_img' else v) for k,v in self.inputs.items()}
+    inputs = {k: v.reshape(self.input_shapes[k]).astype(self.input_dtypes[k]) for k,v in inputs.items()}
+    outputs = self.session.run(None, inputs)
+    self.output[:] = outputs[0]
+    return self.output
+
+
+def random_inputs(use_tf8):
+  if use_tf8:
+    img = np.random.randint(0, 256, IMG_LEN, dtype=np.uint8).view(np.float32)
+  else:
+    img = np.random.uniform(-100, 100, IMG_LEN).astype(np.float32)
+  return {
+    'input_img': img,
+    'calib': np.random.uniform(-1, 1, CALIB_LEN).astype(np.float32),
+    'mode': np.random.randint(0, 8, MODE_LEN).astype(np.float32),
+  }
+
+
+def create_models(path, use_tf8):
+  models = []
+  for cls in (ONNXModel, RecastONNXModel):
+    output = np.zeros(OUTPUT_LEN, dtype=np.float32)
+    models.append(cls(path, output, None, use_tf8, None) if cls is ONNXModel else cls(path, output, use_tf8))
+  return models
+
+
+class TestONNXModel(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    cls.tmpdir = tempfile.TemporaryDirectory()
+    cls.path = os.path.join(cls.tmpdir.name, 'tiny.onnx')
+    make_model(cls.path)
+
+  @classmethod
+  def tearDownClass(cls):
+    cls.tmpdir.cleanup()
+
+  def test_matches_recast(self):
+    np.random.seed(0)
+    for use_tf8 in (False, True):
+      model, ref = create_models(self.path, use_tf8)
+      for i in range(20):
+        inputs = random_inputs(use_tf8)
+        for k, v in inputs.items():
+          if i == 0:
+            model.addInput(k, v)
+            ref.addInput(k, v)
+          else:
+            model.setInputBuffer(k, v)
+            ref.setInputBuffer(k, v)
+        out = model.execute()
+        np.testing.assert_array_equal(out, ref.execute())
+        self.assertIs(out, model.output)
+
+  def test_in_place_input_buffers(self):
+    np.random.seed(0)
+    model, ref = create_models(self.path, False)
+    for k in model.input_names:
+      model.addInput(k, model.getInputBuffer(k))
+    for _ in range(5):
+      inputs = random_inputs(False)
+      for k, v in inputs.items():
+        model.getInputBuffer(k)[:] = v
+        ref.addInput(k, v)
+      np.testing.assert_array_equal(model.execute(), ref.execute())
+
+  def test_no_allocations(self):
+    np.random.seed(0)
+    model, _ = create_models(self.path, True)
+    for k, v in random_inputs(True).items():
+      model.addInput(k, v)
+    model.execute()
+
+    tracemalloc.start()
+    try:
+      for _ in range(10):
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        model.execute()
+        # nothing the size of an input or the output is allocated per call
+        self.assertLess(tracemalloc.get_traced_memory()[1] - start, IMG_LEN)
+    finally:
+      tracemalloc.stop()
+
+
+if __name__ == "__main__":
+  unittest.main()
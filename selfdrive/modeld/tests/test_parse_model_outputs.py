@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+import unittest
+
+import numpy as np
+
+from openpilot.selfdrive.modeld.constants import ModelConstants
+from openpilot.selfdrive.modeld.parse_model_outputs import Parser, softmax
+
+MC = ModelConstants
+OUTPUT_SIZES = {
+  'plan': MC.PLAN_MHP_N * (2 * MC.IDX_N * MC.PLAN_WIDTH + MC.PLAN_MHP_SELECTION),
+  'lane_lines': 2 * MC.NUM_LANE_LINES * MC.IDX_N * MC.LANE_LINES_WIDTH,
+  'lane_lines_prob': 2 * MC.NUM_LANE_LINES,
+  'road_edges': 2 * MC.NUM_ROAD_EDGES * MC.IDX_N * MC.LANE_LINES_WIDTH,
+  'lead': MC.LEAD_MHP_N * (2 * MC.LEAD_TRAJ_LEN * MC.LEAD_WIDTH + MC.LEAD_MHP_SELECTION),
+  'lead_prob': MC.LEAD_MHP_SELECTION,
+  'desire_state': MC.DESIRE_PRED_WIDTH,
+  'meta': 55,
+  'desire_pred': MC.DESIRE_PRED_LEN * MC.DESIRE_PRED_WIDTH,
+  'pose': 2 * MC.POSE_WIDTH,
+  'road_transform': 2 * MC.POSE_WIDTH,
+  'sim_pose': 2 * MC.POSE_WIDTH,
+  'wide_from_device_euler': 2 * MC.WIDE_FROM_DEVICE_WIDTH,
+  'desired_curvature': 2 * MC.DESIRED_CURV_WIDTH,
+  'hidden_state': MC.FEATURE_LEN,
+}
+
+
+def output_slices():
+  slices, start = {}, 0
+  for k, size in OUTPUT_SIZES.items():
+    slices[k] = slice(start, start + size)
+    start += size
+  return slices, start
+
+
+def slice_outputs(output, slices):
+  # same as ModelState.slice_outputs
+  return {k: output[np.newaxis, v] for k, v in slices.items()}
+
+
+def parse_mdn_ref(outs, name, in_N=0, out_N=1, out_shape=None):
+  """Reference for Parser.parse_mdn: the per-frame argsort and gather implementation it replaced"""
+  raw = outs[name]
+  raw = raw.reshape((raw.shape[0], max(in_N, 1), -1))
+  n_values = (raw.shape[2] - out_N)//2
+  pred_mu = raw[:,:,:n_values]
+  pred_std = np.exp(raw[:,:,n_values: 2*n_values])
+
+  if in_N > 1:
+    weights = np.zeros((raw.shape[0], in_N, out_N), dtype=raw.dtype)
+    for i in range(out_N):
+      weights[:,:,i - out_N] = softmax(raw[:,:,i - out_N], axis=-1)
+
+    if out_N == 1:
+      for fidx in range(weights.shape[0]):
+        idxs = np.argsort(weights[fidx][:,0])[::-1]
+        weights[fidx] = weights[fidx][idxs]
+        pred_mu[fidx] = pred_mu[fidx][idxs]
+        pred_std[fidx] = pred_std[fidx][idxs]
+    full_shape = tuple([raw.shape[0], in_N] + list(out_shape))
+    outs[name + '_weights'] = weights
+    outs[name + '_hypotheses'] = pred_mu.reshape(full_shape)
+    outs[name + '_stds_hypotheses'] = pred_std.reshape(full_shape)
+
+    pred_mu_final = np.zeros((raw.shape[0], out_N, n_values), dtype=raw.dtype)
+    pred_std_final = np.zeros((raw.shape[0], out_N, n_values), dtype=raw.dtype)
+    for fidx in range(weights.shape[0]):
+      for hidx in range(out_N):
+        idxs = np.argsort(weights[fidx,:,hidx])[::-1]
+        pred_mu_final[fidx, hidx] = pred_mu[fidx, idxs[0]]
+        pred_std_final[fidx, hidx] = pred_std[fidx, idxs[0]]
+  else:
+    pred_mu_final = pred_mu
+    pred_std_final = pred_std
+
+  final_shape = tuple([raw.shape[0], out_N] + list(out_shape)) if out_N > 1 else tuple([raw.shape[0],] + list(out_shape))
+  outs[name] = pred_mu_final.reshape(final_shape)
+  outs[name + '_stds'] = pred_std_final.reshape(final_shape)
+
+
+class ReferenceParser(Parser):
+  def parse_mdn(self, name, outs, in_N=0, out_N=1, out_shape=None):
+    if not self.check_missing(outs, name):
+      parse_mdn_ref(outs, name, in_N, out_N, out_shape)
+
+  def parse_binary_crossentropy(self, name, outs):
+    if not self.check_missing(outs, name):
+      outs[name] = 1. / (1. + np.exp(-outs[name]))
+
+
+def random_output(rng, size):
+  return rng.normal(0, 2, size).astype(np.float32)
+
+
+class TestParseModelOutputs(unittest.TestCase):
+  def test_matches_reference(self):
+    rng = np.random.default_rng(0)
+    slices, size = output_slices()
+    parsers = [Parser(), Parser(preallocate=True)]
+    for _ in range(500):
+      output = random_output(rng, size)
+      expected = ReferenceParser().parse_outputs(slice_outputs(output.copy(), slices))
+      for parser in parsers:
+        outs = parser.parse_outputs(slice_outputs(output.copy(), slices))
+        self.assertEqual(outs.keys(), expected.keys())
+        for k, v in expected.items():
+          self.assertEqual(outs[k].shape, v.shape, k)
+          self.assertEqual(outs[k].dtype, v.dtype, k)
+          np.testing.assert_array_equal(outs[k], v, err_msg=k)
+
+  def test_equal_weights(self):
+    # with equal weights the first of the best hypotheses is selected
+    slices, size = output_slices()
+    output = np.zeros(size, dtype=np.float32)
+    plan = output[slices['plan']].reshape(MC.PLAN_MHP_N, -1)
+    plan[:, :-1] = np.arange(MC.PLAN_MHP_N)[:, None]
+    lead = output[slices['lead']].reshape(MC.LEAD_MHP_N, -1)
+    lead[:, :-MC.LEAD_MHP_SELECTION] = np.arange(MC.LEAD_MHP_N)[:, None]
+    for parser in (Parser(), Parser(preallocate=True)):
+      outs = parser.parse_outputs(slice_outputs(output.copy(), slices))
+      np.testing.assert_array_equal(outs['plan'], outs['plan_hypotheses'][:, 0])
+      np.testing.assert_array_equal(outs['lead'], np.zeros_like(outs['lead']))
+
+  def test_preallocated_buffers_reused(self):
+    rng = np.random.default_rng(0)
+    slices, size = output_slices()
+    parser = Parser(preallocate=True)
+    first = parser.parse_outputs(slice_outputs(random_output(rng, size), slices))
+    second = parser.parse_outputs(slice_outputs(random_output(rng, size), slices))
+    for k in ('plan', 'plan_stds', 'plan_weights', 'plan_hypotheses', 'lead', 'lead_stds', 'pose_stds', 'meta', 'lead_prob'):
+      self.assertIs(np.shares_memory(first[k], second[k]), True, k)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1,5 +1,7 @@
 #!/usr/bin/env python3
+import math
 import os
+import struct
 import zmq
 import time
 from pathlib import Path
@@ -21,11 +23,174 @@ class METRIC_TYPE:
   GAUGE = 'g'
   SAMPLE = 'sa'
 
-class StatLog:
+# binary metrics: marker, type, value, then the utf-8 name. the marker never starts a utf-8 string
+BINARY_MARKER = 0xff
+BINARY_METRIC = struct.Struct('<BBd')
+BINARY_METRIC_TYPES = (METRIC_TYPE.GAUGE, METRIC_TYPE.SAMPLE)
+BINARY_METRIC_CODES = {metric_type: code for code, metric_type in enumerate(BINARY_METRIC_TYPES)}
+
+# samples of a metric are kept as they are up to this many, then folded into buckets
+MAX_EXACT_SAMPLES = 1024
+# relative error of the quantiles once folded, and max buckets per sign
+RELATIVE_ACCURACY = 0.01
+MAX_BUCKETS = 2048
+
+
+def encode_metric(name: str, value: float, metric_type: str) -> bytes:
+  return BINARY_METRIC.pack(BINARY_MARKER, BINARY_METRIC_CODES[metric_type], value) + name.encode()
+
+
+def parse_metric(metric: bytes) -> tuple[str, float, str]:
+  """name, value and type of a text ("name:value|type") or binary metric"""
+  if metric[0] == BINARY_MARKER:
+    _, code, value = BINARY_METRIC.unpack_from(metric)
+    return metric[BINARY_METRIC.size:].decode(), value, BINARY_METRIC_TYPES[code]
+
+  name, _, rest = metric.decode().partition(':')
+  value, _, metric_type = rest.partition('|')
+  return name, float(value), metric_type.partition('|')[0]
+
+
+class SampleSketch:
+  """Count, sum, min, max and quantiles of a metric's samples in bounded memory
+
+  Up to MAX_EXACT_SAMPLES samples are kept, so quantiles are exactly what sorting them gives.
+  Past that they're folded into logarithmic buckets (like DDSketch), with quantiles within
+  RELATIVE_ACCURACY of the true value and at most MAX_BUCKETS per sign. Sketches can be merged.
+  """
+  gamma = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+  log_gamma = math.log(gamma)
+
   def __init__(self):
+    self.count = 0
+    self.sum = 0.
+    self.min = math.inf
+    self.max = -math.inf
+    self.values: list[float] | None = []
+    self.positive: dict[int, int] = defaultdict(int)
+    self.negative: dict[int, int] = defaultdict(int)
+    self.floors: dict[int, int] = {}
+    self.zeros = 0
+
+  def add(self, value: float) -> None:
+    if not math.isfinite(value):
+      raise ValueError(f"sample not finite: {value}")
+    self.count += 1
+    self.sum += value
+    if value < self.min:
+      self.min = value
+    if value > self.max:
+      self.max = value
+
+    if self.values is not None:
+      self.values.append(value)
+      if len(self.values) > MAX_EXACT_SAMPLES:
+        self.fold()
+    else:
+      self.add_bucket(value, 1)
+
+  def fold(self) -> None:
+    for value in self.values:
+      self.add_bucket(value, 1)
+    self.values = None
+
+  def add_bucket(self, value: float, count: int) -> None:
+    if value > 0:
+      sign, store = 1, self.positive
+    elif value < 0:
+      sign, store, value = -1, self.negative, -value
+    else:
+      self.zeros += count
+      return
+
+    key = max(math.ceil(math.log(value) / self.log_gamma), self.floors.get(sign, -math.inf))
+    store[key] += count
+    if len(store) > MAX_BUCKETS:
+      # the buckets closest to zero are merged, and anything below them goes in from now on
+      keys = sorted(store)
+      floor = self.floors[sign] = keys[-MAX_BUCKETS]
+      store[floor] += sum(store.pop(k) for k in keys[:-MAX_BUCKETS])
+
+  def merge(self, other: 'SampleSketch') -> None:
+    if other.count == 0:
+      return
+    self.count += other.count
+    self.sum += other.sum
+    self.min = min(self.min, other.min)
+    self.max = max(self.max, other.max)
+
+    if self.values is not None and other.values is not None and len(self.values) + len(other.values) <= MAX_EXACT_SAMPLES:
+      self.values.extend(other.values)
+      return
+    if self.values is not None:
+      self.fold()
+    for value in other.values or ():
+      self.add_bucket(value, 1)
+    for store, sign in ((other.positive, 1), (other.negative, -1)):
+      for key, count in store.items():
+        self.add_bucket(sign * self.bucket_value(key), count)
+    self.zeros += other.zeros
+
+  def bucket_value(self, key: int) -> float:
+    return 2 * self.gamma ** key / (self.gamma + 1)
+
+  def quantile(self, q: float) -> float:
+    rank = int(round(q * (self.count - 1)))
+    if self.values is not None:
+      self.values.sort()
+      return self.values[rank]
+
+    seen = 0
+    buckets = [(-self.bucket_value(k), self.negative[k]) for k in sorted(self.negative, reverse=True)]
+    buckets.append((0., self.zeros))
+    buckets += [(self.bucket_value(k), self.positive[k]) for k in sorted(self.positive)]
+    for value, count in buckets:
+      seen += count
+      if seen > rank:
+        return min(max(value, self.min), self.max)
+    return self.max
+
+  def stats(self) -> dict[str, float]:
+    if self.values is not None:
+      # summed in sorted order like before
+      self.values.sort()
+      mean = sum(self.values) / self.count
+    else:
+      mean = self.sum / self.count
+
+    stats = {
+      'count': self.count,
+      'min': self.min,
+      'max': self.max,
+      'mean': mean,
+    }
+    for percentile in [0.05, 0.5, 0.95]:
+      stats[f"p{int(percentile * 100)}"] = self.quantile(percentile)
+    return stats
+
+
+def get_influxdb_line(measurement: str, value: float | dict[str, float], timestamp: datetime, tags: dict, dongle_id: str | None) -> str:
+  if isinstance(value, float):
+    value = {'value': value}
+
+  tag_str = "".join(f",{k}={str(v)}" for k, v in tags.items())
+  value_str = "".join(f"{k}={v}," for k, v in value.items())
+  return f"{measurement}{tag_str} {value_str}dongle_id=\"{dongle_id}\" {int(timestamp.timestamp() * 1e9)}\n"
+
+
+def get_influxdb_lines(gauges: dict[str, float], samples: dict[str, SampleSketch], timestamp: datetime, tags: dict, dongle_id: str | None) -> str:
+  lines = [get_influxdb_line(f"gauge.{key}", value, timestamp, tags, dongle_id) for key, value in gauges.items()]
+  lines += [get_influxdb_line(f"sample.{key}", sketch.stats(), timestamp, tags, dongle_id) for key, sketch in samples.items()]
+  return "".join(lines)
+
+
+class StatLog:
+  def __init__(self, binary: bool = False):
     self.pid = None
     self.zctx = None
     self.sock = None
+    # binary metrics are smaller and cheaper to parse, statsd takes both
+    self.binary = binary
 
   def connect(self) -> None:
     self.zctx = zmq.Context()
@@ -40,41 +205,32 @@ class StatLog:
     if self.zctx is not None:
       self.zctx.term()
 
-  def _send(self, metric: str) -> None:
+  def _send(self, name: str, value: float, metric_type: str) -> None:
     if os.getpid() != self.pid:
       self.connect()
 
+    if self.binary:
+      metric = encode_metric(name, value, metric_type)
+    else:
+      metric = f"{name}:{value}|{metric_type}".encode()
+
     try:
-      self.sock.send_string(metric, zmq.NOBLOCK)
+      self.sock.send(metric, zmq.NOBLOCK)
     except zmq.error.Again:
       # drop :/
       pass
 
   def gauge(self, name: str, value: float) -> None:
-    self._send(f"{name}:{value}|{METRIC_TYPE.GAUGE}")
+    self._send(name, value, METRIC_TYPE.GAUGE)
 
-  # Samples will be recorded in a buffer and at aggregation time,
+  # Samples will be recorded in a sketch and at aggregation time,
   # statistical properties will be logged (mean, count, percentiles, ...)
   def sample(self, name: str, value: float):
-    self._send(f"{name}:{value}|{METRIC_TYPE.SAMPLE}")
+    self._send(name, value, METRIC_TYPE.SAMPLE)
 
 
 def main() -> NoReturn:
   dongle_id = Params().get("DongleId", encoding='utf-8')
-  def get_influxdb_line(measurement: str, value: float | dict[str, float],  timestamp: datetime, tags: dict) -> str:
-    res = f"{measurement}"
-    for k, v in tags.items():
-      res += f",{k}={str(v)}"
-    res += " "
-
-    if isinstance(value, float):
-      value = {'value': value}
-
-    for k, v in value.items():
-      res += f"{k}={v},"
-
-    res += f"dongle_id=\"{dongle_id}\" {int(timestamp.timestamp() * 1e9)}\n"
-    return res
 
   # open statistics socket
   ctx = zmq.Context.instance()
@@ -104,7 +260,7 @@ def main() -> NoReturn:
   idx = 0
   last_flush_time = time.monotonic()
   gauges = {}
-  samples: dict[str, list[float]] = defaultdict(list)
+  samples: dict[str, SampleSketch] = defaultdict(SampleSketch)
   try:
     while True:
       started_prev = sm['deviceState'].started
@@ -113,16 +269,14 @@ def main() -> NoReturn:
       # Update metrics
       while True:
         try:
-          metric = sock.recv_string(zmq.NOBLOCK)
+          metric = sock.recv(zmq.NOBLOCK)
           try:
-            metric_type = metric.split('|')[1]
-            metric_name = metric.split(':')[0]
-            metric_value = float(metric.split('|')[0].split(':')[1])
+            metric_name, metric_value, metric_type = parse_metric(metric)
 
             if metric_type == METRIC_TYPE.GAUGE:
               gauges[metric_name] = metric_value
             elif metric_type == METRIC_TYPE.SAMPLE:
-              samples[metric_name].append(metric_value)
+              samples[metric_name].add(metric_value)
             else:
               cloudlog.event("unknown metric type", metric_type=metric_type)
           except Exception:
@@ -132,29 +286,9 @@ def main() -> NoReturn:
 
       # flush when started state changes or after FLUSH_TIME_S
       if (time.monotonic() > last_flush_time + STATS_FLUSH_TIME_S) or (sm['deviceState'].started != started_prev):
-        result = ""
         current_time = datetime.utcnow().replace(tzinfo=timezone.utc)
         tags['started'] = sm['deviceState'].started
-
-        for key, value in gauges.items():
-          result += get_influxdb_line(f"gauge.{key}", value, current_time, tags)
-
-        for key, values in samples.items():
-          values.sort()
-          sample_count = len(values)
-          sample_sum = sum(values)
-
-          stats = {
-            'count': sample_count,
-            'min': values[0],
-            'max': values[-1],
-            'mean': sample_sum / sample_count,
-          }
-          for percentile in [0.05, 0.5, 0.95]:
-            value = values[int(round(percentile * (sample_count - 1)))]
-            stats[f"p{int(percentile * 100)}"] = value
-
-          result += get_influxdb_line(f"sample.{key}", stats, current_time, tags)
+        result = get_influxdb_lines(gauges, samples, current_time, tags, dongle_id)
 
         # clear intermediate data
         gauges.clear()
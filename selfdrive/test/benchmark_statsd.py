@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import random
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from openpilot.selfdrive.statsd import METRIC_TYPE, SampleSketch, encode_metric, get_influxdb_lines, parse_metric
+from openpilot.selfdrive.test.test_statsd import TAGS, list_influxdb_lines
+
+N = 1_000_000
+METRICS = 10
+
+
+def measure(name, add, flush):
+  tracemalloc.start()
+  t = time.perf_counter()
+  for i, value in enumerate(VALUES):
+    add(f"metric{i % METRICS}", value)
+  add_time = time.perf_counter() - t
+  memory = tracemalloc.get_traced_memory()[0]
+  tracemalloc.stop()
+
+  t = time.perf_counter()
+  result = flush()
+  flush_time = time.perf_counter() - t
+  print(f"{name:>6}: {add_time / N * 1e6:.2f} us/sample, {memory / 1e6:6.2f} MB held, flush {flush_time * 1e3:7.2f} ms")
+  return result
+
+
+def quantiles(result):
+  return {line.split(',')[0]: {k: float(v) for k, v in (f.split('=') for f in line.split(' ')[1].split(',')[:-1])} for line in result.splitlines()}
+
+
+if __name__ == "__main__":
+  random.seed(0)
+  VALUES = [random.lognormvariate(0, 1.5) for _ in range(N)]
+  timestamp = datetime.now(timezone.utc)
+
+  lists: dict[str, list[float]] = {}
+  reference = measure("list", lambda name, value: lists.setdefault(name, []).append(value),
+                      lambda: list_influxdb_lines({}, lists, timestamp, TAGS, "0123456789abcdef"))
+  sketches: dict[str, SampleSketch] = {}
+  result = measure("sketch", lambda name, value: sketches.setdefault(name, SampleSketch()).add(value),
+                   lambda: get_influxdb_lines({}, sketches, timestamp, TAGS, "0123456789abcdef"))
+
+  exact, approx = quantiles(reference), quantiles(result)
+  for stat in ('p5', 'p50', 'p95', 'mean'):
+    error = max(abs(approx[m][stat] - exact[m][stat]) / abs(exact[m][stat]) for m in exact)
+    print(f"{stat:>4} max relative error: {error:.4%}")
+  assert all(approx[m][k] == exact[m][k] for m in exact for k in ('count', 'min', 'max'))
+
+  for name, metrics in (("text", [f"metric{i % METRICS}:{v}|{METRIC_TYPE.SAMPLE}".encode() for i, v in enumerate(VALUES[:100000])]),
+                        ("binary", [encode_metric(f"metric{i % METRICS}", v, METRIC_TYPE.SAMPLE) for i, v in enumerate(VALUES[:100000])])):
+    t = time.perf_counter()
+    for metric in metrics:
+      parse_metric(metric)
+    print(f"parse {name:>6}: {(time.perf_counter() - t) / len(metrics) * 1e9:.0f} ns/metric, {sum(map(len, metrics)) / len(metrics):.1f} bytes/metric")
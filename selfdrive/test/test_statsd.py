@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+import random
+import struct
+import tempfile
+import time
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+import zmq
+
+from openpilot.selfdrive import statsd
+from openpilot.selfdrive.statsd import MAX_BUCKETS, MAX_EXACT_SAMPLES, RELATIVE_ACCURACY, METRIC_TYPE, SampleSketch, StatLog, \
+                                       encode_metric, get_influxdb_lines, parse_metric
+
+TAGS = {'started': False, 'version': '0.9.7', 'branch': 'release3', 'dirty': True, 'origin': 'github.com/commaai/openpilot', 'deviceType': 'tici'}
+
+
+def list_influxdb_lines(gauges, samples, timestamp, tags, dongle_id):
+  """Reference: the flush with every sample kept in a list"""
+  def get_influxdb_line(measurement, value, timestamp, tags):
+    res = f"{measurement}"
+    for k, v in tags.items():
+      res += f",{k}={str(v)}"
+    res += " "
+
+    if isinstance(value, float):
+      value = {'value': value}
+
+    for k, v in value.items():
+      res += f"{k}={v},"
+
+    res += f"dongle_id=\"{dongle_id}\" {int(timestamp.timestamp() * 1e9)}\n"
+    return res
+
+  result = ""
+  for key, value in gauges.items():
+    result += get_influxdb_line(f"gauge.{key}", value, timestamp, tags)
+
+  for key, values in samples.items():
+    values.sort()
+    sample_count = len(values)
+    sample_sum = sum(values)
+
+    stats = {
+      'count': sample_count,
+      'min': values[0],
+      'max': values[-1],
+      'mean': sample_sum / sample_count,
+    }
+    for percentile in [0.05, 0.5, 0.95]:
+      value = values[int(round(percentile * (sample_count - 1)))]
+      stats[f"p{int(percentile * 100)}"] = value
+
+    result += get_influxdb_line(f"sample.{key}", stats, timestamp, tags)
+  return result
+
+
+def random_samples(n):
+  kind = random.choice(['lognormal', 'uniform', 'signed', 'ints'])
+  if kind == 'lognormal':
+    return [random.lognormvariate(0, 2) for _ in range(n)]
+  elif kind == 'uniform':
+    return [random.uniform(0, 100) for _ in range(n)]
+  elif kind == 'signed':
+    return [random.gauss(0, 50) for _ in range(n)]
+  return [float(random.randint(-3, 3)) for _ in range(n)]
+
+
+def sketch_of(values):
+  sketch = SampleSketch()
+  for v in values:
+    sketch.add(v)
+  return sketch
+
+
+class TestStatsd(unittest.TestCase):
+  def setUp(self):
+    random.seed(0)
+
+  def test_parse_metric(self):
+    self.assertEqual(parse_metric(b"power_draw:5.25|sa"), ("power_draw", 5.25, METRIC_TYPE.SAMPLE))
+    self.assertEqual(parse_metric(b"cpu0_usage_percent:12|g"), ("cpu0_usage_percent", 12., METRIC_TYPE.GAUGE))
+    self.assertEqual(parse_metric(b"x:1|sa|extra"), ("x", 1., METRIC_TYPE.SAMPLE))
+    for name, value, metric_type in (("power_draw", 5.25, METRIC_TYPE.SAMPLE), ("ünïcode", -1e300, METRIC_TYPE.GAUGE)):
+      metric = encode_metric(name, value, metric_type)
+      self.assertEqual(parse_metric(metric), (name, value, metric_type))
+      self.assertLess(len(metric), len(f"{name}:{value}|{metric_type}".encode()) + 4)
+    for metric in (b"nope", b"x:|g", b"x:abc|sa", b"\xff\x00"):
+      with self.assertRaises((ValueError, struct.error)):
+        parse_metric(metric)
+
+  def test_same_influx_output(self):
+    timestamp = datetime(2024, 5, 1, 12, 30, tzinfo=timezone.utc)
+    for _ in range(50):
+      gauges = {f"gauge{i}": random.uniform(-10, 10) for i in range(random.randint(0, 5))}
+      values = {f"sample{i}": random_samples(random.randint(1, MAX_EXACT_SAMPLES)) for i in range(random.randint(0, 5))}
+      samples = {k: sketch_of(v) for k, v in values.items()}
+      self.assertEqual(get_influxdb_lines(gauges, samples, timestamp, TAGS, "0123456789abcdef"),
+                       list_influxdb_lines(gauges, values, timestamp, TAGS, "0123456789abcdef"))
+
+  def test_quantile_error(self):
+    for _ in range(20):
+      values = random_samples(random.randint(MAX_EXACT_SAMPLES + 1, 20000))
+      sketch = sketch_of(values)
+      self.assertIsNone(sketch.values)
+      values.sort()
+      stats = sketch.stats()
+      self.assertEqual((stats['count'], stats['min'], stats['max']), (len(values), values[0], values[-1]))
+      self.assertAlmostEqual(stats['mean'], sum(values) / len(values), delta=1e-9 * max(map(abs, values)))
+      for q in (0.05, 0.5, 0.95, 0., 1.):
+        exact = values[int(round(q * (len(values) - 1)))]
+        self.assertLessEqual(abs(sketch.quantile(q) - exact), RELATIVE_ACCURACY * abs(exact) + 1e-12)
+
+  def test_bounded(self):
+    sketch = SampleSketch()
+    for _ in range(100000):
+      sketch.add(random.choice((1, -1)) * 10 ** random.uniform(-300, 300))
+    self.assertIsNone(sketch.values)
+    self.assertLessEqual(len(sketch.positive), MAX_BUCKETS)
+    self.assertLessEqual(len(sketch.negative), MAX_BUCKETS)
+    self.assertEqual(sketch.count, 100000)
+
+    # the large magnitudes keep their accuracy
+    top = sketch.quantile(1.)
+    self.assertEqual(top, sketch.max)
+    for bad in (float('nan'), float('inf')):
+      with self.assertRaises(ValueError):
+        sketch.add(bad)
+    self.assertEqual(sketch.count, 100000)
+
+  def test_merge(self):
+    for sizes in ((10, 20), (MAX_EXACT_SAMPLES, 1), (5000, 10), (10, 5000), (3000, 4000), (0, 10)):
+      parts = [random_samples(n) for n in sizes]
+      merged = sketch_of(parts[0])
+      merged.merge(sketch_of(parts[1]))
+      values = sorted(parts[0] + parts[1])
+      self.assertEqual((merged.count, merged.min, merged.max), (len(values), values[0], values[-1]))
+      for q in (0.05, 0.5, 0.95):
+        exact = values[int(round(q * (len(values) - 1)))]
+        self.assertLessEqual(abs(merged.quantile(q) - exact), RELATIVE_ACCURACY * abs(exact) + 1e-12)
+
+  def test_statlog(self):
+    with tempfile.TemporaryDirectory() as tmpdir, mock.patch.object(statsd, "STATS_SOCKET", f"ipc://{tmpdir}/stats"):
+      ctx = zmq.Context()
+      sock = ctx.socket(zmq.PULL)
+      sock.bind(statsd.STATS_SOCKET)
+      try:
+        for binary in (False, True):
+          statlog = StatLog(binary=binary)
+          statlog.gauge("memory_usage_percent", 42.0)
+          statlog.sample("power_draw", 5.25)
+          received = []
+          end = time.monotonic() + 2
+          while len(received) < 2 and time.monotonic() < end:
+            if sock.poll(100):
+              received.append(sock.recv())
+          self.assertEqual([m[0] == statsd.BINARY_MARKER for m in received], [binary, binary])
+          self.assertEqual([parse_metric(m) for m in received], [("memory_usage_percent", 42.0, METRIC_TYPE.GAUGE),
+                                                                  ("power_draw", 5.25, METRIC_TYPE.SAMPLE)])
+          del statlog
+      finally:
+        sock.close()
+        ctx.term()
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,108 @@
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from openpilot.common.swaglog import cloudlog
+
+
+@dataclass
+class Probe:
+  name: str
+  fn: Callable[[], Any]
+  interval: float
+  timeout: float
+  default: Any = None
+
+
+@dataclass
+class ProbeState:
+  value: Any
+  updated: float | None = None
+  started: float | None = None
+  next_run: float = 0.
+  timed_out: bool = False
+  failures: int = 0
+  timeouts: int = 0
+
+
+class HardwareStatus:
+  """Runs each probe on its own schedule in a worker thread and caches the latest value
+
+  Reads never block: get() returns the last value the probe returned, or its default until
+  the first run finishes. A probe that fails keeps its last value. One that runs past its
+  timeout is logged and not started again until it returns, so a stuck modem query only
+  holds up its own value.
+  """
+  def __init__(self, probes: list[Probe]):
+    self.probes = {probe.name: probe for probe in probes}
+    self.states = {probe.name: ProbeState(probe.default) for probe in probes}
+    self.lock = threading.Lock()
+    self.thread: threading.Thread | None = None
+    self.end_event = threading.Event()
+
+  def get(self, name: str) -> Any:
+    return self.states[name].value
+
+  def age(self, name: str) -> float | None:
+    """Seconds since the cached value was updated, None if it never was"""
+    updated = self.states[name].updated
+    return None if updated is None else time.monotonic() - updated
+
+  def timed_out(self, name: str) -> bool:
+    return self.states[name].timed_out
+
+  def update(self) -> float:
+    """Starts the probes that are due, returns the time until the next one is"""
+    now = time.monotonic()
+    next_run = float('inf')
+    with self.lock:
+      for name, probe in self.probes.items():
+        state = self.states[name]
+        if state.started is not None:
+          if not state.timed_out and now - state.started > probe.timeout:
+            state.timed_out = True
+            state.timeouts += 1
+            cloudlog.warning(f"hardware status: {name} running for more than {probe.timeout}s")
+          continue
+
+        if now >= state.next_run:
+          state.started = now
+          state.next_run = now + probe.interval
+          # daemon, a stuck probe can't be interrupted and shouldn't hold up exiting
+          threading.Thread(target=self.run_probe, args=(name, probe), daemon=True).start()
+        next_run = min(next_run, state.next_run)
+    return max(next_run - now, 0.)
+
+  def run_probe(self, name: str, probe: Probe) -> None:
+    try:
+      value = probe.fn()
+    except Exception:
+      cloudlog.exception(f"hardware status: {name} failed")
+      with self.lock:
+        self.states[name].failures += 1
+    else:
+      with self.lock:
+        state = self.states[name]
+        state.value = value
+        state.updated = time.monotonic()
+    finally:
+      with self.lock:
+        state = self.states[name]
+        state.started = None
+        state.timed_out = False
+
+  def run(self, poll_interval: float = 0.1) -> None:
+    while not self.end_event.is_set():
+      # wake up at least every poll_interval to check on running probes
+      self.end_event.wait(min(self.update(), poll_interval))
+
+  def start(self) -> None:
+    self.thread = threading.Thread(target=self.run, daemon=True)
+    self.thread.start()
+
+  def stop(self) -> None:
+    self.end_event.set()
+    if self.thread is not None:
+      self.thread.join()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+import queue
+import threading
+import time
+import unittest
+
+from openpilot.system.hardware.pc.hardware import Pc
+from openpilot.selfdrive.thermald.hardware_status import HardwareStatus, Probe
+from openpilot.selfdrive.thermald.thermald import NetworkType, hw_state_probes, hw_state_thread, read_hw_state
+
+
+class StuckPc(Pc):
+  """PC backend with an nvme query that hangs and a modem that errors"""
+  def __init__(self):
+    self.release = threading.Event()
+    self.nvme_calls = 0
+
+  def get_nvme_temperatures(self):
+    self.nvme_calls += 1
+    self.release.wait()
+    return [40]
+
+  def get_modem_temperatures(self):
+    raise Exception("modem gone")
+
+
+def wait_for(condition, timeout=2.):
+  end = time.monotonic() + timeout
+  while not condition():
+    if time.monotonic() > end:
+      return False
+    time.sleep(0.01)
+  return True
+
+
+class TestHardwareStatus(unittest.TestCase):
+  def test_pc_backend(self):
+    status = HardwareStatus(hw_state_probes(Pc()))
+    status.update()
+    self.assertTrue(wait_for(lambda: all(status.age(name) is not None for name in status.probes)))
+
+    hw_state = read_hw_state(status, None)
+    self.assertEqual(hw_state.network_type, NetworkType.wifi)
+    self.assertEqual(hw_state.network_stats, {'wwanTx': -1, 'wwanRx': -1})
+    self.assertEqual(hw_state.nvme_temps, [])
+
+  def test_schedule(self):
+    calls = {'fast': 0, 'slow': 0}
+    def probe(name):
+      def fn():
+        calls[name] += 1
+        return calls[name]
+      return fn
+
+    status = HardwareStatus([Probe('fast', probe('fast'), 0.05, 1.), Probe('slow', probe('slow'), 10., 1.)])
+    status.start()
+    time.sleep(0.5)
+    status.stop()
+    self.assertGreaterEqual(calls['fast'], 5)
+    self.assertEqual(calls['slow'], 1)
+    self.assertEqual(status.get('slow'), 1)
+
+  def test_stuck_probe(self):
+    release = threading.Event()
+    calls = []
+    def stuck():
+      calls.append(time.monotonic())
+      release.wait()
+      return 'late'
+
+    status = HardwareStatus([Probe('stuck', stuck, 0.05, 0.1, 'default'), Probe('ok', time.monotonic, 0.05, 1.)])
+    status.start()
+    try:
+      self.assertTrue(wait_for(lambda: status.timed_out('stuck')))
+      # reads don't wait for it, the others keep updating and it isn't started again
+      t = time.monotonic()
+      self.assertEqual(status.get('stuck'), 'default')
+      self.assertLess(time.monotonic() - t, 0.01)
+      ok = status.get('ok')
+      self.assertTrue(wait_for(lambda: status.get('ok') != ok))
+      self.assertEqual(len(calls), 1)
+      self.assertEqual(status.states['stuck'].timeouts, 1)
+
+      release.set()
+      self.assertTrue(wait_for(lambda: status.get('stuck') == 'late'))
+      self.assertFalse(status.timed_out('stuck'))
+      self.assertTrue(wait_for(lambda: len(calls) > 1))
+    finally:
+      release.set()
+      status.stop()
+
+  def test_failing_probe(self):
+    results = iter([1, Exception("dbus timeout"), 3])
+    def flaky():
+      result = next(results)
+      if isinstance(result, Exception):
+        raise result
+      return result
+
+    status = HardwareStatus([Probe('flaky', flaky, 0., 1.)])
+    values = []
+    for _ in range(3):
+      status.update()
+      self.assertTrue(wait_for(lambda: status.states['flaky'].started is None))
+      values.append(status.get('flaky'))
+    # keeps the last good value
+    self.assertEqual(values, [1, 1, 3])
+    self.assertEqual(status.states['flaky'].failures, 1)
+
+  def test_hw_state_thread(self):
+    hardware = StuckPc()
+    hw_queue: queue.Queue = queue.Queue(maxsize=1)
+    end_event = threading.Event()
+    thread = threading.Thread(target=hw_state_thread, args=(end_event, hw_queue, hardware))
+    thread.start()
+    try:
+      # network state arrives while the nvme query hangs and the modem fails
+      self.assertTrue(wait_for(lambda: hw_queue.full() and hw_queue.queue[0].network_type == NetworkType.wifi))
+      hw_state = hw_queue.get()
+      self.assertEqual((hw_state.nvme_temps, hw_state.modem_temps), ([], []))
+      self.assertEqual(hardware.nvme_calls, 1)
+
+      hardware.release.set()
+      self.assertTrue(wait_for(lambda: hw_queue.get().nvme_temps == [40]))
+    finally:
+      hardware.release.set()
+      end_event.set()
+      thread.join(timeout=2.)
+    self.assertFalse(thread.is_alive())
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -23,6 +23,7 @@ from openpilot.selfdrive.statsd import statlog
 from openpilot.common.swaglog import cloudlog
 from openpilot.selfdrive.thermald.power_monitoring import PowerMonitoring
 from openpilot.selfdrive.thermald.fan_controller import TiciFanController
+from openpilot.selfdrive.thermald.hardware_status import HardwareStatus, Probe
 from openpilot.system.version import terms_version, training_version
 
 ThermalStatus = log.DeviceState.ThermalStatus
@@ -51,30 +52,39 @@ OFFROAD_DANGER_TEMP = 75
 
 prev_offroad_states: dict[str, tuple[bool, str | None]] = {}
 
+THERMAL_ROOT = "/sys/devices/virtual/thermal"
+
 tz_by_type: dict[str, int] | None = None
 def populate_tz_by_type():
   global tz_by_type
   tz_by_type = {}
-  for n in os.listdir("/sys/devices/virtual/thermal"):
+  thermal_root = HARDWARE.sysfs.root + THERMAL_ROOT
+  for n in os.listdir(thermal_root):
     if not n.startswith("thermal_zone"):
       continue
-    with open(os.path.join("/sys/devices/virtual/thermal", n, "type")) as f:
+    with open(os.path.join(thermal_root, n, "type")) as f:
       tz_by_type[f.read().strip()] = int(n.removeprefix("thermal_zone"))
 
-def read_tz(x):
+def tz_path(x) -> str | None:
   if x is None:
-    return 0
+    return None
 
   if isinstance(x, str):
     if tz_by_type is None:
       populate_tz_by_type()
     x = tz_by_type[x]
+  return f"{THERMAL_ROOT}/thermal_zone{x}/temp"
 
-  try:
-    with open(f"/sys/devices/virtual/thermal/thermal_zone{x}/temp") as f:
-      return int(f.read())
-  except FileNotFoundError:
+def read_tz(x):
+  path = tz_path(x)
+  if path is None:
     return 0
+  return HARDWARE.sysfs.read_value(path, int)
+
+
+def thermal_zone_paths(thermal_config) -> list[str]:
+  zones = [*thermal_config.cpu[0], *thermal_config.gpu[0], thermal_config.mem[0], thermal_config.ambient[0], *thermal_config.pmic[0]]
+  return [path for path in map(tz_path, zones) if path is not None]
 
 
 def read_thermal(thermal_config):
@@ -94,74 +104,103 @@ def set_offroad_alert_if_changed(offroad_alert: str, show_alert: bool, extra_tex
   set_offroad_alert(offroad_alert, show_alert, extra_text)
 
 
-def hw_state_thread(end_event, hw_queue):
-  """Handles non critical hardware state, and sends over queue"""
-  count = 0
-  prev_hw_state = None
-
+def modem_setup_probe(hardware):
+  """Logs the modem version once and configures the modem once a SIM shows up, returns whether it's done"""
   modem_version = None
   modem_nv = None
   modem_configured = False
   modem_restarted = False
   modem_missing_count = 0
 
-  while not end_event.is_set():
-    # these are expensive calls. update every 10s
-    if (count % int(10. / DT_TRML)) == 0:
-      try:
-        network_type = HARDWARE.get_network_type()
-        modem_temps = HARDWARE.get_modem_temperatures()
-        if len(modem_temps) == 0 and prev_hw_state is not None:
-          modem_temps = prev_hw_state.modem_temps
-
-        # Log modem version once
-        if AGNOS and ((modem_version is None) or (modem_nv is None)):
-          modem_version = HARDWARE.get_modem_version()
-          modem_nv = HARDWARE.get_modem_nv()
-
-          if (modem_version is not None) and (modem_nv is not None):
-            cloudlog.event("modem version", version=modem_version, nv=modem_nv)
-          else:
-            if not modem_restarted:
-              # TODO: we may be able to remove this with a MM update
-              # ModemManager's probing on startup can fail
-              # rarely, restart the service to probe again.
-              modem_missing_count += 1
-              if modem_missing_count > 3:
-                modem_restarted = True
-                cloudlog.event("restarting ModemManager")
-                os.system("sudo systemctl restart --no-block ModemManager")
-
-        tx, rx = HARDWARE.get_modem_data_usage()
-
-        hw_state = HardwareState(
-          network_type=network_type,
-          network_info=HARDWARE.get_network_info(),
-          network_strength=HARDWARE.get_network_strength(network_type),
-          network_stats={'wwanTx': tx, 'wwanRx': rx},
-          network_metered=HARDWARE.get_network_metered(network_type),
-          nvme_temps=HARDWARE.get_nvme_temperatures(),
-          modem_temps=modem_temps,
-        )
+  def probe():
+    nonlocal modem_version, modem_nv, modem_configured, modem_restarted, modem_missing_count
+
+    # Log modem version once
+    if AGNOS and ((modem_version is None) or (modem_nv is None)):
+      modem_version = hardware.get_modem_version()
+      modem_nv = hardware.get_modem_nv()
+
+      if (modem_version is not None) and (modem_nv is not None):
+        cloudlog.event("modem version", version=modem_version, nv=modem_nv)
+      else:
+        if not modem_restarted:
+          # TODO: we may be able to remove this with a MM update
+          # ModemManager's probing on startup can fail
+          # rarely, restart the service to probe again.
+          modem_missing_count += 1
+          if modem_missing_count > 3:
+            modem_restarted = True
+            cloudlog.event("restarting ModemManager")
+            os.system("sudo systemctl restart --no-block ModemManager")
+
+    # TODO: remove this once the config is in AGNOS
+    if not modem_configured and len(hardware.get_sim_info().get('sim_id', '')) > 0:
+      cloudlog.warning("configuring modem")
+      hardware.configure_modem()
+      modem_configured = True
+    return modem_configured
+
+  return probe
+
+
+def network_probe(hardware):
+  network_type = hardware.get_network_type()
+  return network_type, hardware.get_network_strength(network_type), hardware.get_network_metered(network_type)
+
+
+def hw_state_probes(hardware) -> list[Probe]:
+  # each runs on its own schedule, with a timeout after which it's logged as stuck
+  return [
+    Probe("network", lambda: network_probe(hardware), 5., 5., (NetworkType.none, NetworkStrength.unknown, False)),
+    Probe("network_info", hardware.get_network_info, 10., 5.),
+    Probe("network_stats", hardware.get_modem_data_usage, 10., 5., (-1, -1)),
+    Probe("modem_temps", hardware.get_modem_temperatures, 10., 5., []),
+    Probe("nvme_temps", hardware.get_nvme_temperatures, 30., 10., []),
+    Probe("modem_setup", modem_setup_probe(hardware), 10., 30., False),
+  ]
 
-        try:
-          hw_queue.put_nowait(hw_state)
-        except queue.Full:
-          pass
 
-        # TODO: remove this once the config is in AGNOS
-        if not modem_configured and len(HARDWARE.get_sim_info().get('sim_id', '')) > 0:
-          cloudlog.warning("configuring modem")
-          HARDWARE.configure_modem()
-          modem_configured = True
+def read_hw_state(status: HardwareStatus, prev_hw_state: HardwareState | None) -> HardwareState:
+  network_type, network_strength, network_metered = status.get("network")
+  tx, rx = status.get("network_stats")
+  modem_temps = status.get("modem_temps")
+  if len(modem_temps) == 0 and prev_hw_state is not None:
+    modem_temps = prev_hw_state.modem_temps
+
+  return HardwareState(
+    network_type=network_type,
+    network_info=status.get("network_info"),
+    network_strength=network_strength,
+    network_stats={'wwanTx': tx, 'wwanRx': rx},
+    network_metered=network_metered,
+    nvme_temps=status.get("nvme_temps"),
+    modem_temps=modem_temps,
+  )
 
-        prev_hw_state = hw_state
-      except Exception:
-        cloudlog.exception("Error getting hardware state")
 
-    count += 1
+def hw_state_thread(end_event, hw_queue, hardware=HARDWARE):
+  """Handles non critical hardware state, and sends over queue"""
+  # the expensive calls run in the background, this only reads what they last returned
+  status = HardwareStatus(hw_state_probes(hardware))
+  status.start()
+  prev_hw_state = None
+
+  while not end_event.is_set():
+    prev_hw_state = read_hw_state(status, prev_hw_state)
+    try:
+      # replace a state thermald hasn't picked up yet
+      hw_queue.get_nowait()
+    except queue.Empty:
+      pass
+    try:
+      hw_queue.put_nowait(prev_hw_state)
+    except queue.Full:
+      pass
+
     time.sleep(DT_TRML)
 
+  status.stop()
+
 
 def thermald_thread(end_event, hw_queue) -> None:
   pm = messaging.PubMaster(['deviceState'])
@@ -202,6 +241,8 @@ def thermald_thread(end_event, hw_queue) -> None:
 
   HARDWARE.initialize_hardware()
   thermal_config = HARDWARE.get_thermal_config()
+  # the thermal zones and the hardware's power, gpu and backlight files are read in one batch per tick
+  HARDWARE.sysfs.add(*thermal_zone_paths(thermal_config))
 
   fan_controller = None
 
@@ -236,6 +277,9 @@ def thermald_thread(end_event, hw_queue) -> None:
     if (sm.frame % round(SERVICE_LIST['pandaStates'].frequency * DT_TRML) != 0) and not ign_edge:
       continue
 
+    HARDWARE.sysfs.sample()
+    statlog.gauge("sysfs_sample_syscalls", HARDWARE.sysfs.syscalls)
+    statlog.sample("sysfs_sample_time", HARDWARE.sysfs.sample_time)
     msg = read_thermal(thermal_config)
     msg.deviceState.deviceType = HARDWARE.get_device_type()
 
@@ -1,7 +1,9 @@
 from abc import abstractmethod, ABC
 from collections import namedtuple
+from functools import cached_property
 
 from cereal import log
+from openpilot.system.hardware.sysfs_sampler import SysfsSampler
 
 ThermalConfig = namedtuple('ThermalConfig', ['cpu', 'gpu', 'mem', 'bat', 'ambient', 'pmic'])
 NetworkType = log.DeviceState.NetworkType
@@ -22,6 +24,14 @@ class HardwareBase(ABC):
     except Exception:
       return default
 
+  @cached_property
+  def sysfs(self) -> SysfsSampler:
+    return SysfsSampler(self.get_sysfs_paths())
+
+  def get_sysfs_paths(self) -> list[str]:
+    """sysfs attributes the getters read every thermald tick, sampled together by sysfs.sample()"""
+    return []
+
   def booted(self) -> bool:
     return True
 
@@ -0,0 +1,76 @@
+import os
+import time
+
+# sysfs attributes are at most a page
+READ_SIZE = 4096
+# readers fall back to reading the file themselves once the last sample is this old
+SNAPSHOT_MAX_AGE = 1.0
+
+
+class SysfsSampler:
+  """Keeps sysfs attributes open and re-reads them with pread
+
+  sample() reads every added path in one batch into a snapshot, which read() returns
+  for those paths until it's older than SNAPSHOT_MAX_AGE. Other paths are read directly,
+  still from a kept fd. A missing or failing file reads as None and is reopened next time.
+  root prefixes every path, to point the sampler at a fake sysfs tree.
+  """
+  def __init__(self, paths=(), root: str = ""):
+    self.root = root
+    self.paths: list[str] = []
+    self.fds: dict[str, int] = {}
+    self.snapshot: dict[str, str | None] = {}
+    self.snapshot_time: float | None = None
+
+    # of the last sample()
+    self.syscalls = 0
+    self.sample_time = 0.
+    self.add(*paths)
+
+  def add(self, *paths: str) -> None:
+    for path in paths:
+      if path not in self.paths:
+        self.paths.append(path)
+
+  def pread(self, path: str) -> str | None:
+    fd = self.fds.get(path)
+    if fd is None:
+      self.syscalls += 1
+      try:
+        fd = self.fds[path] = os.open(self.root + path, os.O_RDONLY | os.O_CLOEXEC)
+      except OSError:
+        return None
+
+    self.syscalls += 1
+    try:
+      return os.pread(fd, READ_SIZE, 0).decode('utf-8', 'replace')
+    except OSError:
+      self.syscalls += 1
+      os.close(self.fds.pop(path))
+      return None
+
+  def sample(self) -> dict[str, str | None]:
+    t = time.perf_counter()
+    self.syscalls = 0
+    self.snapshot = {path: self.pread(path) for path in self.paths}
+    self.snapshot_time = time.monotonic()
+    self.sample_time = time.perf_counter() - t
+    return self.snapshot
+
+  def read(self, path: str) -> str | None:
+    if path in self.snapshot and self.snapshot_time is not None and time.monotonic() - self.snapshot_time < SNAPSHOT_MAX_AGE:
+      return self.snapshot[path]
+    return self.pread(path)
+
+  def read_value(self, path: str, parser, default=0):
+    """Like HardwareBase.read_param_file"""
+    try:
+      return parser(self.read(path))
+    except Exception:
+      return default
+
+  def close(self) -> None:
+    for fd in self.fds.values():
+      os.close(fd)
+    self.fds.clear()
+    self.snapshot = {}
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from openpilot.system.hardware.sysfs_sampler import SNAPSHOT_MAX_AGE, SysfsSampler
+from openpilot.system.hardware.tici import hardware as tici_hardware
+from openpilot.system.hardware.tici.hardware import Tici
+from openpilot.selfdrive.thermald import thermald
+
+N_ZONES = 40
+
+
+def write(root, path, value):
+  path = root + path
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  # in place like sysfs, an open fd sees the new value
+  with open(path, 'a+') as f:
+    f.truncate(0)
+    f.write(value)
+
+
+def make_fake_sysfs(root):
+  for i in range(N_ZONES):
+    write(root, f"{thermald.THERMAL_ROOT}/thermal_zone{i}/type", f"zone{i}\n")
+    write(root, f"{thermald.THERMAL_ROOT}/thermal_zone{i}/temp", f"{40000 + i}\n")
+  write(root, tici_hardware.POWER_INPUT, "5250000\n")
+  write(root, tici_hardware.BMS_VOLTAGE, "4200000\n")
+  write(root, tici_hardware.BMS_CURRENT, "-500000\n")
+  write(root, tici_hardware.MAX_BRIGHTNESS, "1023\n")
+  write(root, tici_hardware.BRIGHTNESS, "512\n")
+  write(root, tici_hardware.GPU_BUSY, "  250000  1000000\n")
+
+
+def fd_count():
+  return len(os.listdir("/proc/self/fd"))
+
+
+class TestSysfsSampler(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    make_fake_sysfs(self.root)
+    self.zones = [f"{thermald.THERMAL_ROOT}/thermal_zone{i}/temp" for i in range(N_ZONES)]
+    self.sampler = SysfsSampler(self.zones, root=self.root)
+
+  def tearDown(self):
+    self.sampler.close()
+    shutil.rmtree(self.root)
+
+  def test_sample(self):
+    snapshot = self.sampler.sample()
+    self.assertEqual(list(snapshot), self.zones)
+    self.assertEqual([int(v) for v in snapshot.values()], [40000 + i for i in range(N_ZONES)])
+    # opened once, then one pread per file
+    self.assertEqual(self.sampler.syscalls, 2 * N_ZONES)
+
+    fds = fd_count()
+    write(self.root, self.zones[3], "55000\n")
+    for _ in range(10):
+      snapshot = self.sampler.sample()
+      self.assertEqual(self.sampler.syscalls, N_ZONES)
+    self.assertEqual(int(snapshot[self.zones[3]]), 55000)
+    self.assertEqual(fd_count(), fds)
+
+  def test_missing_files(self):
+    missing = f"{thermald.THERMAL_ROOT}/thermal_zone{N_ZONES}/temp"
+    self.sampler.add(missing)
+    self.assertIsNone(self.sampler.sample()[missing])
+    self.assertEqual(self.sampler.read_value(missing, int, default=-1), -1)
+
+    write(self.root, missing, "30000\n")
+    self.assertEqual(self.sampler.sample()[missing], "30000\n")
+
+  def test_snapshot(self):
+    self.sampler.sample()
+    write(self.root, self.zones[0], "60000\n")
+    # sampled files read from the snapshot, others directly
+    self.assertEqual(self.sampler.read_value(self.zones[0], int), 40000)
+    self.assertEqual(self.sampler.read(tici_hardware.POWER_INPUT), "5250000\n")
+
+    self.sampler.snapshot_time -= SNAPSHOT_MAX_AGE
+    self.assertEqual(self.sampler.read_value(self.zones[0], int), 60000)
+
+  def test_tici_readers(self):
+    tici = Tici()
+    tici.sysfs = SysfsSampler(tici.get_sysfs_paths(), root=self.root)
+    for _ in range(2):
+      self.assertEqual(tici.get_current_power_draw(), 5.25)
+      self.assertAlmostEqual(tici.get_som_power_draw(), -2.1)
+      self.assertEqual(tici.get_screen_brightness(), 50)
+      self.assertEqual(tici.get_gpu_usage_percent(), 25.)
+      tici.sysfs.sample()
+    self.assertEqual(tici.sysfs.syscalls, len(tici.get_sysfs_paths()))
+    tici.sysfs.close()
+
+  def test_thermald_zones(self):
+    tici = Tici()
+    tici.sysfs = self.sampler
+    with mock.patch.object(thermald, "HARDWARE", tici), mock.patch.object(thermald, "tz_by_type", None):
+      config = tici.get_thermal_config()._replace(cpu=([f"zone{i}" for i in range(8)], 1000), gpu=(("zone8", 9), 1000), mem=("zone10", 1000),
+                                                   ambient=(None, 1), pmic=(("zone11", "zone12"), 1000))
+      paths = thermald.thermal_zone_paths(config)
+      self.assertEqual(len(paths), 13)
+      tici.sysfs.add(*paths)
+
+      tici.sysfs.sample()
+      t = time.perf_counter()
+      tici.sysfs.sample()
+      temps = [thermald.read_tz(z) for z in config.cpu[0]]
+      tick = time.perf_counter() - t
+      self.assertEqual(temps, [40000 + i for i in range(8)])
+      self.assertEqual(thermald.read_tz(9), 40009)
+      self.assertEqual(thermald.read_tz(None), 0)
+
+      # open, read and close per file like before
+      t = time.perf_counter()
+      for path in tici.sysfs.paths:
+        with open(self.root + path) as f:
+          f.read()
+      reopen = time.perf_counter() - t
+      sampler = tici.sysfs
+      print(f"{len(sampler.paths)} files: {sampler.syscalls} syscalls, {sampler.sample_time * 1e6:.0f} us per sample")
+      print(f"tick: {tick * 1e6:.0f} us, reopening every file: {reopen * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+  unittest.main()
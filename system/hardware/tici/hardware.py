@@ -60,6 +60,13 @@ NetworkStrength = log.DeviceState.NetworkStrength
 MM_MODEM_ACCESS_TECHNOLOGY_UMTS = 1 << 5
 MM_MODEM_ACCESS_TECHNOLOGY_LTE = 1 << 14
 
+POWER_INPUT = "/sys/class/hwmon/hwmon1/power1_input"
+BMS_VOLTAGE = "/sys/class/power_supply/bms/voltage_now"
+BMS_CURRENT = "/sys/class/power_supply/bms/current_now"
+BRIGHTNESS = "/sys/class/backlight/panel0-backlight/brightness"
+MAX_BRIGHTNESS = "/sys/class/backlight/panel0-backlight/max_brightness"
+GPU_BUSY = "/sys/class/kgsl/kgsl-3d0/gpubusy"
+
 
 def sudo_write(val, path):
   try:
@@ -76,7 +83,7 @@ def sudo_write(val, path):
 
 def sudo_read(path: str) -> str:
   try:
-    return subprocess.check_output(f"sudo cat {path}", shell=True, encoding='utf8')
+    return subprocess.check_output(["sudo", "cat", path], encoding='utf8')
   except Exception:
     return ""
 
@@ -340,11 +347,14 @@ class Tici(HardwareBase):
       pass
     return ret
 
+  def get_sysfs_paths(self):
+    return [POWER_INPUT, BMS_VOLTAGE, BMS_CURRENT, BRIGHTNESS, MAX_BRIGHTNESS, GPU_BUSY]
+
   def get_current_power_draw(self):
-    return (self.read_param_file("/sys/class/hwmon/hwmon1/power1_input", int) / 1e6)
+    return (self.sysfs.read_value(POWER_INPUT, int) / 1e6)
 
   def get_som_power_draw(self):
-    return (self.read_param_file("/sys/class/power_supply/bms/voltage_now", int) * self.read_param_file("/sys/class/power_supply/bms/current_now", int) / 1e12)
+    return (self.sysfs.read_value(BMS_VOLTAGE, int) * self.sysfs.read_value(BMS_CURRENT, int) / 1e12)
 
   def shutdown(self):
     os.system("sudo poweroff")
@@ -360,22 +370,18 @@ class Tici(HardwareBase):
 
   def set_screen_brightness(self, percentage):
     try:
-      with open("/sys/class/backlight/panel0-backlight/max_brightness") as f:
-        max_brightness = float(f.read().strip())
+      max_brightness = float(self.sysfs.read(MAX_BRIGHTNESS).strip())
 
       val = int(percentage * (max_brightness / 100.))
-      with open("/sys/class/backlight/panel0-backlight/brightness", "w") as f:
+      with open(BRIGHTNESS, "w") as f:
         f.write(str(val))
     except Exception:
       pass
 
   def get_screen_brightness(self):
     try:
-      with open("/sys/class/backlight/panel0-backlight/max_brightness") as f:
-        max_brightness = float(f.read().strip())
-
-      with open("/sys/class/backlight/panel0-backlight/brightness") as f:
-        return int(float(f.read()) / (max_brightness / 100.))
+      max_brightness = float(self.sysfs.read(MAX_BRIGHTNESS).strip())
+      return int(float(self.sysfs.read(BRIGHTNESS)) / (max_brightness / 100.))
     except Exception:
       return 0
 
@@ -415,8 +421,7 @@ class Tici(HardwareBase):
 
   def get_gpu_usage_percent(self):
     try:
-      with open('/sys/class/kgsl/kgsl-3d0/gpubusy') as f:
-        used, total = f.read().strip().split()
+      used, total = self.sysfs.read(GPU_BUSY).strip().split()
       return 100.0 * int(used) / int(total)
     except Exception:
       return 0
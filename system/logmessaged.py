@@ -7,6 +7,8 @@ from openpilot.common.logging_extra import SwagLogFileFormatter
 from openpilot.system.hardware.hw import Paths
 from openpilot.common.swaglog import get_file_handler
 
+MAX_FILE_BATCH = 256
+
 
 def main() -> NoReturn:
   log_handler = get_file_handler()
@@ -23,24 +25,35 @@ def main() -> NoReturn:
 
   try:
     while True:
+      # write whatever has queued up since the last write in one go
+      to_file = []
       dat = b''.join(sock.recv_multipart())
-      level = dat[0]
-      record = dat[1:].decode("utf-8")
-      if level >= log_level:
-        log_handler.emit(record)
-
-      if len(record) > 2*1024*1024:
-        print("WARNING: log too big to publish", len(record))
-        print(record[:100])
-        continue
-
-      # then we publish them
-      msg = messaging.new_message(None, valid=True, logMessage=record)
-      log_message_sock.send(msg.to_bytes())
-
-      if level >= 40:  # logging.ERROR
-        msg = messaging.new_message(None, valid=True, errorLogMessage=record)
-        error_log_message_sock.send(msg.to_bytes())
+      while True:
+        level = dat[0]
+        record = dat[1:].decode("utf-8")
+        if level >= log_level:
+          to_file.append(record)
+
+        if len(record) > 2*1024*1024:
+          print("WARNING: log too big to publish", len(record))
+          print(record[:100])
+        else:
+          # then we publish them
+          msg = messaging.new_message(None, valid=True, logMessage=record)
+          log_message_sock.send(msg.to_bytes())
+
+          if level >= 40:  # logging.ERROR
+            msg = messaging.new_message(None, valid=True, errorLogMessage=record)
+            error_log_message_sock.send(msg.to_bytes())
+
+        if len(to_file) >= MAX_FILE_BATCH:
+          break
+        try:
+          dat = b''.join(sock.recv_multipart(zmq.NOBLOCK))
+        except zmq.error.Again:
+          break
+
+      log_handler.emit_batch(to_file)
   finally:
     sock.close()
     ctx.term()
@@ -298,6 +298,127 @@ cdef class AcadosOcpSolverCython:
         return out
 
 
+    def get_flat(self, str field_, out_=None):
+        """
+        Get the last solution of the solver at all shooting nodes in one call:
+
+            :param field: string in ['x', 'u', 'pi']
+            :param out: optional C-contiguous float64 array of shape (N+1, nx) for 'x' or (N, dim) for 'u' and 'pi',
+                        which is filled in place instead of allocating a new array
+        """
+
+        out_fields = ['x', 'u', 'pi']
+        field = field_.encode('utf-8')
+
+        if field_ not in out_fields:
+            raise Exception('AcadosOcpSolverCython.get_flat(): {} is an invalid argument.\
+                    \n Possible values are {}.'.format(field_, out_fields))
+
+        cdef int n_stages = self.N + 1 if field_ == 'x' else self.N
+        cdef int dims = acados_solver_common.ocp_nlp_dims_get_from_attr(self.nlp_config,
+            self.nlp_dims, self.nlp_out, 0, field)
+
+        if out_ is None:
+            out_ = np.zeros((n_stages, dims))
+        cdef double[:, ::1] out = out_
+
+        if out.shape[0] != n_stages or out.shape[1] != dims:
+            raise Exception(f'AcadosOcpSolverCython.get_flat(): mismatching dimension for field "{field_}" ' +
+                f'with dimension {(n_stages, dims)} (you have {(out.shape[0], out.shape[1])})')
+
+        cdef int stage
+        for stage in range(n_stages):
+            if acados_solver_common.ocp_nlp_dims_get_from_attr(self.nlp_config, self.nlp_dims, self.nlp_out, stage, field) != dims:
+                raise Exception(f'AcadosOcpSolverCython.get_flat(): field "{field_}" has a different dimension at stage {stage}')
+            acados_solver_common.ocp_nlp_out_get(self.nlp_config, \
+                self.nlp_dims, self.nlp_out, stage, field, <void *> &out[stage, 0])
+
+        return out_
+
+
+    def set_flat(self, str field_, value_):
+        """
+        Set numerical data at consecutive shooting nodes, starting at stage 0, in one call.
+
+            :param field: string in ['p', 'x', 'u', 'yref', 'W', 'Zl', 'Zu', 'zl', 'zu']
+            :param value: numpy array with one row per stage, e.g. of shape (N+1, np) for 'p',
+                          or one matrix per stage for 'W'
+
+            .. note:: stages with a smaller dimension, like the terminal stage for 'yref' and 'W',
+                      use the leading entries of their row (the leading block of their matrix).
+        """
+        if not isinstance(value_, np.ndarray):
+            raise Exception(f"set_flat: value must be numpy array, got {type(value_)}.")
+        out_fields = ['x', 'u']
+        cost_fields = ['yref', 'Zl', 'Zu', 'zl', 'zu']
+        cost_matrix_fields = ['W']
+        all_fields = ['p'] + out_fields + cost_fields + cost_matrix_fields
+
+        if field_ not in all_fields:
+            raise Exception('AcadosOcpSolverCython.set_flat(): {} is an invalid argument.\
+                    \n Possible values are {}.'.format(field_, all_fields))
+
+        field = field_.encode('utf-8')
+
+        cdef int n_stages = value_.shape[0]
+        cdef int max_stages = self.N if field_ == 'u' else self.N + 1
+        if n_stages > max_stages:
+            raise Exception(f'AcadosOcpSolverCython.set_flat(): field "{field_}" exists at {max_stages} stages, got {n_stages}.')
+
+        cdef int stage
+        cdef int dims[2]
+        cdef double[::1, :] mat
+        cdef double[:, ::1] rows
+
+        if field_ in cost_matrix_fields:
+            if value_.ndim != 3:
+                raise Exception(f'AcadosOcpSolverCython.set_flat(): field "{field_}" expects one matrix per stage, got shape {value_.shape}.')
+            for stage in range(n_stages):
+                acados_solver_common.ocp_nlp_cost_dims_get_from_attr(self.nlp_config, \
+                    self.nlp_dims, self.nlp_out, stage, field, &dims[0])
+                if dims[0] > value_.shape[1] or dims[1] > value_.shape[2]:
+                    raise Exception(f'AcadosOcpSolverCython.set_flat(): mismatching dimension for field "{field_}" ' +
+                        f'at stage {stage} with dimension {tuple(dims)} (you have {value_.shape[1:]})')
+                # Get elements in column major order
+                mat = np.asfortranarray(value_[stage, :dims[0], :dims[1]], dtype=np.float64)
+                acados_solver_common.ocp_nlp_cost_model_set(self.nlp_config, \
+                    self.nlp_dims, self.nlp_in, stage, field, <void *> &mat[0, 0])
+            return
+
+        if value_.ndim != 2:
+            raise Exception(f'AcadosOcpSolverCython.set_flat(): field "{field_}" expects one row per stage, got shape {value_.shape}.')
+        rows = np.ascontiguousarray(value_, dtype=np.float64)
+
+        cdef bint is_param = field_ == 'p'
+        cdef bint is_out = field_ in out_fields
+        cdef int dim
+        for stage in range(n_stages):
+            if is_param:
+                assert acados_solver.acados_update_params(self.capsule, stage, &rows[stage, 0], rows.shape[1]) == 0
+                continue
+
+            if is_out:
+                dim = acados_solver_common.ocp_nlp_dims_get_from_attr(self.nlp_config,
+                    self.nlp_dims, self.nlp_out, stage, field)
+            else:
+                acados_solver_common.ocp_nlp_cost_dims_get_from_attr(self.nlp_config, \
+                    self.nlp_dims, self.nlp_out, stage, field, &dims[0])
+                dim = dims[0]
+
+            if dim > rows.shape[1]:
+                raise Exception(f'AcadosOcpSolverCython.set_flat(): mismatching dimension for field "{field_}" ' +
+                    f'at stage {stage} with dimension {dim} (you have {rows.shape[1]})')
+            if dim == 0:
+                continue
+
+            if is_out:
+                acados_solver_common.ocp_nlp_out_set(self.nlp_config, \
+                    self.nlp_dims, self.nlp_out, stage, field, <void *> &rows[stage, 0])
+            else:
+                acados_solver_common.ocp_nlp_cost_model_set(self.nlp_config, \
+                    self.nlp_dims, self.nlp_in, stage, field, <void *> &rows[stage, 0])
+
+
     def print_statistics(self):
         """
         prints statistics of previous solver run as a table:
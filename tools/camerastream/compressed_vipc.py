@@ -22,7 +22,30 @@ ENCODE_SOCKETS = {
   VisionStreamType.VISION_STREAM_DRIVER: "driverEncodeData",
 }
 
-def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False):
+# frames older than this (since the device encoded them) are decoded but not published,
+# unless they're the newest one received
+MAX_FRAME_LATENCY = 0.1
+
+
+def plane_view(plane, width, height):
+  # view of a decoder plane with the line padding stripped, no copy
+  return np.frombuffer(plane, dtype=np.uint8).reshape(-1, plane.line_size)[:height, :width]
+
+
+def frame_to_nv12(frame, out, W, H):
+  # write a decoded frame into a preallocated NV12 buffer, interleaving U/V in place
+  y = out[:H*W].reshape(H, W)
+  uv = out[H*W:].reshape(H//2, W//2, 2)
+  y[:] = plane_view(frame.planes[0], W, H)
+  if frame.format.name == 'nv12':
+    uv.reshape(H//2, W)[:] = plane_view(frame.planes[1], W, H//2)
+  else:
+    uv[:, :, 0] = plane_view(frame.planes[1], W//2, H//2)
+    uv[:, :, 1] = plane_view(frame.planes[2], W//2, H//2)
+  return out
+
+
+def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False, max_latency=MAX_FRAME_LATENCY):
   sock_name = ENCODE_SOCKETS[vst]
   if debug:
     print(f"start decoder for {sock_name}, {W}x{H}")
@@ -39,6 +62,7 @@ def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False):
     img_yuv = np.ndarray((H*W//2*3), dtype=np.uint8)
   else:
     codec = av.CodecContext.create("hevc", "r")
+    img_yuv = np.empty(H*W*3//2, dtype=np.uint8)
 
   os.environ["ZMQ"] = "1"
   messaging.context = messaging.Context()
@@ -47,10 +71,9 @@ def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False):
   last_idx = -1
   seen_iframe = False
 
-  time_q = []
   while 1:
     msgs = messaging.drain_sock(sock, wait_for_one=True)
-    for evt in msgs:
+    for i, evt in enumerate(msgs):
       evta = getattr(evt, evt.which())
       if debug and evta.idx.encodeId != 0 and evta.idx.encodeId != (last_idx+1):
         print("DROP PACKET!")
@@ -59,7 +82,7 @@ def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False):
         if debug:
           print("waiting for iframe")
         continue
-      time_q.append(time.monotonic())
+      recv_time = time.monotonic()
       network_latency = (int(time.time()*1e9) - evta.unixTimestampNanos)/1e6
       frame_latency = ((evta.idx.timestampEof/1e9) - (evta.idx.timestampSof/1e9))*1000
       process_latency = ((evt.logMonoTime/1e9) - (evta.idx.timestampEof/1e9))*1000
@@ -87,17 +110,20 @@ def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False):
             print("DROP SURFACE")
           continue
         assert len(frames) == 1
-        img_yuv = frames[0].to_ndarray(format=av.video.format.VideoFormat('yuv420p')).flatten()
-        uv_offset = H*W
-        y = img_yuv[:uv_offset]
-        uv = img_yuv[uv_offset:].reshape(2, -1).ravel('F')
-        img_yuv = np.hstack((y, uv))
 
-      vipc_server.send(vst, img_yuv.data, cnt, int(time_q[0]*1e9), int(time.monotonic()*1e9))
+        # behind, on the network or in decoding: every packet still has to be decoded,
+        # but only fresh frames are worth converting. Ages compare the device's and this machine's wall clocks
+        frame_age = time.time() - evta.unixTimestampNanos / 1e9
+        if i < len(msgs) - 1 and frame_age > max_latency:
+          if debug:
+            print("DROP STALE FRAME")
+          continue
+        frame_to_nv12(frames[0], img_yuv, W, H)
+
+      vipc_server.send(vst, img_yuv.data, cnt, int(recv_time*1e9), int(time.monotonic()*1e9))
       cnt += 1
 
-      pc_latency = (time.monotonic()-time_q[0])*1000
-      time_q = time_q[1:]
+      pc_latency = (time.monotonic()-recv_time)*1000
       if debug:
         print("%2d %4d %.3f %.3f roll %6.2f ms latency %6.2f ms + %6.2f ms + %6.2f ms = %6.2f ms"
               % (len(msgs), evta.idx.encodeId, evt.logMonoTime/1e9, evta.idx.timestampEof/1e6, frame_latency,
@@ -105,7 +131,7 @@ def decoder(addr, vipc_server, vst, nvidia, W, H, debug=False):
 
 
 class CompressedVipc:
-  def __init__(self, addr, vision_streams, nvidia=False, debug=False):
+  def __init__(self, addr, vision_streams, nvidia=False, debug=False, max_latency=MAX_FRAME_LATENCY):
     print("getting frame sizes")
     os.environ["ZMQ"] = "1"
     messaging.context = messaging.Context()
@@ -124,7 +150,7 @@ class CompressedVipc:
     self.procs = []
     for vst in vision_streams:
       ed = sm[ENCODE_SOCKETS[vst]]
-      p = multiprocessing.Process(target=decoder, args=(addr, self.vipc_server, vst, nvidia, ed.width, ed.height, debug))
+      p = multiprocessing.Process(target=decoder, args=(addr, self.vipc_server, vst, nvidia, ed.width, ed.height, debug, max_latency))
       p.start()
       self.procs.append(p)
 
@@ -143,6 +169,7 @@ if __name__ == "__main__":
   parser.add_argument("--nvidia", action="store_true", help="Use nvidia instead of ffmpeg")
   parser.add_argument("--cams", default="0,1,2", help="Cameras to decode")
   parser.add_argument("--silent", action="store_true", help="Suppress debug output")
+  parser.add_argument("--max-latency", type=float, default=MAX_FRAME_LATENCY, help="Drop frames older than this many seconds when behind")
   args = parser.parse_args()
 
   vision_streams = [
@@ -152,5 +179,5 @@ if __name__ == "__main__":
   ]
 
   vsts = [vision_streams[int(x)] for x in args.cams.split(",")]
-  cvipc = CompressedVipc(args.addr, vsts, args.nvidia, debug=(not args.silent))
+  cvipc = CompressedVipc(args.addr, vsts, args.nvidia, debug=(not args.silent), max_latency=args.max_latency)
   cvipc.join()
@@ -1,4 +1,5 @@
 import signal
+import time
 import threading
 import functools
 
@@ -7,6 +8,7 @@ from enum import Enum
 from multiprocessing import Process, Queue, Value
 from abc import ABC, abstractmethod
 
+from cereal import messaging
 from openpilot.common.params import Params
 from openpilot.common.numpy_fast import clip
 from openpilot.common.realtime import Ratekeeper
@@ -36,8 +38,9 @@ def rk_loop(function, hz, exit_event: threading.Event):
 
 class SimulatorBridge(ABC):
   TICKS_PER_FRAME = 5
+  LOCKSTEP_TIMEOUT = 1.  # seconds to wait for openpilot to consume a frame before moving on
 
-  def __init__(self, dual_camera, high_quality):
+  def __init__(self, dual_camera, high_quality, lockstep=False):
     set_params_enabled()
     self.params = Params()
     self.params.put_bool("ExperimentalLongitudinalEnabled", True)
@@ -46,6 +49,8 @@ class SimulatorBridge(ABC):
 
     self.dual_camera = dual_camera
     self.high_quality = high_quality
+    # in lockstep mode the simulation advances as fast as openpilot consumes camera frames, instead of in wall time
+    self.lockstep = lockstep
 
     self._exit_event = threading.Event()
     self._threads = []
@@ -97,19 +102,32 @@ Ignition: {self.simulator_state.ignition} Engaged: {self.simulator_state.is_enga
   def spawn_world(self, q: Queue) -> World:
     pass
 
+  def wait_for_frame_consumed(self, sm: messaging.SubMaster, frame_id: int):
+    # modeld isn't up yet, nothing to wait on
+    if sm.recv_frame['modelV2'] == 0:
+      sm.update(0)
+      return
+
+    deadline = time.monotonic() + self.LOCKSTEP_TIMEOUT
+    while sm['modelV2'].frameId < frame_id and self._keep_alive and time.monotonic() < deadline:
+      sm.update(10)
+
   def _run(self, q: Queue):
     self.world = self.spawn_world(q)
 
     self.simulated_car = SimulatedCar()
     self.simulated_sensors = SimulatedSensors(self.dual_camera)
 
-    self.simulated_car_thread = threading.Thread(target=rk_loop, args=(functools.partial(self.simulated_car.update, self.simulator_state),
-                                                                        100, self._exit_event))
-    self.simulated_car_thread.start()
+    if self.lockstep:
+      model_sm = messaging.SubMaster(['modelV2'])
+    else:
+      self.simulated_car_thread = threading.Thread(target=rk_loop, args=(functools.partial(self.simulated_car.update, self.simulator_state),
+                                                                          100, self._exit_event))
+      self.simulated_car_thread.start()
 
-    self.simulated_camera_thread = threading.Thread(target=rk_loop, args=(functools.partial(self.simulated_sensors.send_camera_images, self.world),
-                                                                        20, self._exit_event))
-    self.simulated_camera_thread.start()
+      self.simulated_camera_thread = threading.Thread(target=rk_loop, args=(functools.partial(self.simulated_sensors.send_camera_images, self.world),
+                                                                          20, self._exit_event))
+      self.simulated_camera_thread.start()
 
     # Simulation tends to be slow in the initial steps. This prevents lagging later
     for _ in range(20):
@@ -185,6 +203,8 @@ Ignition: {self.simulator_state.ignition} Engaged: {self.simulator_state.is_enga
       steer_out = steer_op if self.simulator_state.is_engaged else steer_manual
 
       self.world.apply_controls(steer_out, throttle_out, brake_out)
+      # in lockstep nothing moves on until the simulator has stepped with these controls
+      new_frame = self.world.wait_step() if self.lockstep else False
       self.world.read_state()
       self.world.read_sensors(self.simulator_state)
 
@@ -195,10 +215,19 @@ Ignition: {self.simulator_state.ignition} Engaged: {self.simulator_state.is_enga
         self.world.tick()
         self.world.read_cameras()
 
+      if self.lockstep:
+        self.simulated_car.update(self.simulator_state)
+        if new_frame:
+          self.simulated_sensors.send_camera_images(self.world)
+          self.wait_for_frame_consumed(model_sm, self.simulated_sensors.camerad.frame_road_id - 1)
+
       # don't print during test, so no print/IO Block between OP and metadrive processes
       if not self.test_run and self.rk.frame % 25 == 0:
         self.print_status()
 
       self.started.value = True
 
-      self.rk.keep_time()
+      if self.lockstep:
+        self.rk.monitor_time()
+      else:
+        self.rk.keep_time()
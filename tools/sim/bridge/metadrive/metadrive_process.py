@@ -50,7 +50,7 @@ def apply_metadrive_patches(arrive_dest_done=True):
 
 def metadrive_process(dual_camera: bool, config: dict, camera_array, wide_camera_array, image_lock,
                       controls_recv: Connection, simulation_state_send: Connection, vehicle_state_send: Connection,
-                      exit_event, op_engaged, test_duration, test_run):
+                      exit_event, op_engaged, test_duration, test_run, lockstep=False, step_send: Connection | None = None):
   arrive_dest_done = config.pop("arrive_dest_done", True)
   apply_metadrive_patches(arrive_dest_done)
 
@@ -97,8 +97,9 @@ def metadrive_process(dual_camera: bool, config: dict, camera_array, wide_camera
 
   steer_ratio = 8
   vc = [0,0]
+  steps = 0
 
-  while not exit_event.is_set():
+  def send_vehicle_state():
     vehicle_state = metadrive_vehicle_state(
       velocity=vec3(x=float(env.vehicle.velocity[0]), y=float(env.vehicle.velocity[1]), z=0),
       position=env.vehicle.position,
@@ -107,9 +108,24 @@ def metadrive_process(dual_camera: bool, config: dict, camera_array, wide_camera
     )
     vehicle_state_send.send(vehicle_state)
 
+  if lockstep:
+    # the bridge waits for a first state to know metadrive is up
+    send_vehicle_state()
+
+  while not exit_event.is_set():
+    if lockstep:
+      # step once per control message from the bridge, instead of in wall time
+      while not controls_recv.poll(0.1):
+        if exit_event.is_set():
+          return
+    else:
+      send_vehicle_state()
+
     if controls_recv.poll(0):
       while controls_recv.poll(0):
         steer_angle, gas, should_reset = controls_recv.recv()
+        if lockstep:
+          break
 
       steer_metadrive = steer_angle * 1 / (env.vehicle.MAX_STEERING * steer_ratio)
       steer_metadrive = np.clip(steer_metadrive, -1, 1)
@@ -124,7 +140,8 @@ def metadrive_process(dual_camera: bool, config: dict, camera_array, wide_camera
     if is_engaged and start_time is None:
       start_time = time.monotonic()
 
-    if rk.frame % 5 == 0:
+    render = rk.frame % 5 == 0
+    if render:
       _, _, terminated, _, _ = env.step(vc)
       timeout = True if start_time is not None and time.monotonic() - start_time >= test_duration else False
       lane_idx_curr, on_lane = get_current_lane_info(env.vehicle)
@@ -151,4 +168,11 @@ def metadrive_process(dual_camera: bool, config: dict, camera_array, wide_camera
       road_image[...] = get_cam_as_rgb("rgb_road")
       image_lock.release()
 
-    rk.keep_time()
+    if lockstep:
+      # the bridge reads this state and sends this step's camera frame and the next control only once it has the ack
+      send_vehicle_state()
+      steps += 1
+      step_send.send((steps, render))
+      rk.monitor_time()
+    else:
+      rk.keep_time()
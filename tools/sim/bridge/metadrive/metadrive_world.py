@@ -14,7 +14,7 @@ from openpilot.tools.sim.lib.camerad import W, H
 
 
 class MetaDriveWorld(World):
-  def __init__(self, status_q, config, test_duration, test_run, dual_camera=False):
+  def __init__(self, status_q, config, test_duration, test_run, dual_camera=False, lockstep=False):
     super().__init__(dual_camera)
     self.status_q = status_q
     self.camera_array = Array(ctypes.c_uint8, W*H*3)
@@ -27,6 +27,9 @@ class MetaDriveWorld(World):
     self.controls_send, self.controls_recv = Pipe()
     self.simulation_state_send, self.simulation_state_recv = Pipe()
     self.vehicle_state_send, self.vehicle_state_recv = Pipe()
+    # in lockstep, metadrive acks each control once it has stepped with it
+    self.step_send, self.step_recv = Pipe()
+    self.controls_sent = 0
 
     self.exit_event = multiprocessing.Event()
     self.op_engaged = multiprocessing.Event()
@@ -41,7 +44,8 @@ class MetaDriveWorld(World):
                               functools.partial(metadrive_process, dual_camera, config,
                                                 self.camera_array, self.wide_camera_array, self.image_lock,
                                                 self.controls_recv, self.simulation_state_send,
-                                                self.vehicle_state_send, self.exit_event, self.op_engaged, test_duration, self.test_run))
+                                                self.vehicle_state_send, self.exit_event, self.op_engaged, test_duration, self.test_run, lockstep,
+                                                self.step_send))
 
     self.metadrive_process.start()
     self.status_q.put(QueueMessage(QueueMessageType.START_STATUS, "starting"))
@@ -71,8 +75,17 @@ class MetaDriveWorld(World):
       self.vc[1] = 0
 
     self.controls_send.send([*self.vc, self.should_reset])
+    self.controls_sent += 1
     self.should_reset = False
 
+  def wait_step(self) -> bool:
+    while self.metadrive_process.is_alive() and not self.exit_event.is_set():
+      if self.step_recv.poll(0.1):
+        step, rendered = self.step_recv.recv()
+        if step == self.controls_sent:
+          return rendered
+    return False
+
   def read_state(self):
     while self.simulation_state_recv.poll(0):
       md_state: metadrive_simulation_state = self.simulation_state_recv.recv()
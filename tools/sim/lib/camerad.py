@@ -1,7 +1,5 @@
 import numpy as np
 import os
-import pyopencl as cl
-import pyopencl.array as cl_array
 
 from cereal.visionipc import VisionIpcServer, VisionStreamType
 from cereal import messaging
@@ -9,9 +7,92 @@ from cereal import messaging
 from openpilot.common.basedir import BASEDIR
 from openpilot.tools.sim.lib.common import W, H
 
+try:
+  import pyopencl as cl
+except ImportError:
+  cl = None
+
+
+class NumpyRGBToNV12:
+  """CPU version of rgb_to_nv12.cl, bit-exact with the OpenCL kernel. Input pixels are in BGR order."""
+  def __init__(self, w, h):
+    assert w % 2 == 0 and h % 2 == 0
+    self.w, self.h = w, h
+    self.yuv = np.empty(w * h * 3 // 2, dtype=np.uint8)
+    self.y_acc = np.empty((h, w), dtype=np.uint16)
+    self.y_tmp = np.empty((h, w), dtype=np.uint16)
+    # 2x averages of each 2x2 block, per channel, like AVERAGE() in the kernel
+    self.row_sum = np.empty((h // 2, w, 3), dtype=np.uint16)
+    self.avg = np.empty((h // 2, w // 2, 3), dtype=np.uint16)
+    self.uv_acc = np.empty((h // 2, w // 2), dtype=np.uint16)
+    self.uv_tmp = np.empty((h // 2, w // 2), dtype=np.uint16)
+
+  def _weighted(self, acc, tmp, bias, pos, neg):
+    # acc = bias + sum(c*x for pos) - sum(c*x for neg), never leaves uint16 range for these coefficients
+    acc.fill(bias)
+    for c, x in pos:
+      np.multiply(x, c, out=tmp, dtype=np.uint16)
+      acc += tmp
+    for c, x in neg:
+      np.multiply(x, c, out=tmp, dtype=np.uint16)
+      acc -= tmp
+    return acc
+
+  def __call__(self, bgr):
+    w, h = self.w, self.h
+    y = self.yuv[:w * h].reshape(h, w)
+    uv = self.yuv[w * h:].reshape(h // 2, w // 2, 2)
+
+    b, g, r = bgr[..., 0], bgr[..., 1], bgr[..., 2]
+    acc = self._weighted(self.y_acc, self.y_tmp, 64, ((13, b), (65, g), (33, r)), ())
+    acc >>= 7
+    acc += 16
+    y[:] = acc
+
+    np.add(bgr[0::2], bgr[1::2], out=self.row_sum, dtype=np.uint16)
+    np.add(self.row_sum[:, 0::2], self.row_sum[:, 1::2], out=self.avg)
+    self.avg += 1
+    self.avg >>= 1
+    ab, ag, ar = self.avg[..., 0], self.avg[..., 1], self.avg[..., 2]
+
+    acc = self._weighted(self.uv_acc, self.uv_tmp, 0x8080, ((56, ab),), ((37, ag), (19, ar)))
+    acc >>= 8
+    uv[..., 0] = acc
+    acc = self._weighted(self.uv_acc, self.uv_tmp, 0x8080, ((56, ar),), ((47, ag), (9, ab)))
+    acc >>= 8
+    uv[..., 1] = acc
+    return self.yuv
+
+
+class OpenCLRGBToNV12:
+  """Runs rgb_to_nv12.cl, device and host buffers are allocated once and reused for every frame"""
+  def __init__(self, w, h):
+    self.ctx = cl.create_some_context()
+    self.queue = cl.CommandQueue(self.ctx)
+    cl_arg = f" -DHEIGHT={h} -DWIDTH={w} -DRGB_STRIDE={w * 3} -DUV_WIDTH={w // 2} -DUV_HEIGHT={h // 2} -DRGB_SIZE={w * h} -DCL_DEBUG "
+
+    kernel_fn = os.path.join(BASEDIR, "tools/sim/rgb_to_nv12.cl")
+    with open(kernel_fn) as f:
+      prg = cl.Program(self.ctx, f.read()).build(cl_arg)
+      self.krnl = prg.rgb_to_nv12
+    self.Wdiv4 = w // 4 if (w % 4 == 0) else (w + (4 - w % 4)) // 4
+    self.Hdiv4 = h // 4 if (h % 4 == 0) else (h + (4 - h % 4)) // 4
+
+    self.yuv = np.empty(w * h * 3 // 2, dtype=np.uint8)
+    mf = cl.mem_flags
+    self.rgb_cl = cl.Buffer(self.ctx, mf.READ_ONLY, w * h * 3)
+    self.yuv_cl = cl.Buffer(self.ctx, mf.WRITE_ONLY, w * h * 3)
+
+  def __call__(self, bgr):
+    cl.enqueue_copy(self.queue, self.rgb_cl, np.ascontiguousarray(bgr))
+    self.krnl(self.queue, (self.Wdiv4, self.Hdiv4), None, self.rgb_cl, self.yuv_cl)
+    cl.enqueue_copy(self.queue, self.yuv, self.yuv_cl).wait()
+    return self.yuv
+
+
 class Camerad:
   """Simulates the camerad daemon"""
-  def __init__(self, dual_camera):
+  def __init__(self, dual_camera, use_opencl=None):
     self.pm = messaging.PubMaster(['roadCameraState', 'wideRoadCameraState'])
 
     self.frame_road_id = 0
@@ -24,17 +105,10 @@ class Camerad:
 
     self.vipc_server.start_listener()
 
-    # set up for pyopencl rgb to yuv conversion
-    self.ctx = cl.create_some_context()
-    self.queue = cl.CommandQueue(self.ctx)
-    cl_arg = f" -DHEIGHT={H} -DWIDTH={W} -DRGB_STRIDE={W * 3} -DUV_WIDTH={W // 2} -DUV_HEIGHT={H // 2} -DRGB_SIZE={W * H} -DCL_DEBUG "
-
-    kernel_fn = os.path.join(BASEDIR, "tools/sim/rgb_to_nv12.cl")
-    with open(kernel_fn) as f:
-      prg = cl.Program(self.ctx, f.read()).build(cl_arg)
-      self.krnl = prg.rgb_to_nv12
-    self.Wdiv4 = W // 4 if (W % 4 == 0) else (W + (4 - W % 4)) // 4
-    self.Hdiv4 = H // 4 if (H % 4 == 0) else (H + (4 - H % 4)) // 4
+    # rgb to yuv conversion, fall back to numpy on machines without pyopencl
+    if use_opencl is None:
+      use_opencl = cl is not None and os.getenv("SIM_CPU_CAMERA") is None
+    self.converter = OpenCLRGBToNV12(W, H) if use_opencl else NumpyRGBToNV12(W, H)
 
   def cam_send_yuv_road(self, yuv):
     self._send_yuv(yuv, self.frame_road_id, 'roadCameraState', VisionStreamType.VISION_STREAM_ROAD)
@@ -44,16 +118,12 @@ class Camerad:
     self._send_yuv(yuv, self.frame_wide_id, 'wideRoadCameraState', VisionStreamType.VISION_STREAM_WIDE_ROAD)
     self.frame_wide_id += 1
 
-  # Returns: yuv bytes
+  # Returns: yuv buffer, reused by the next call
   def rgb_to_yuv(self, rgb):
     assert rgb.shape == (H, W, 3), f"{rgb.shape}"
     assert rgb.dtype == np.uint8
 
-    rgb_cl = cl_array.to_device(self.queue, rgb)
-    yuv_cl = cl_array.empty_like(rgb_cl)
-    self.krnl(self.queue, (self.Wdiv4, self.Hdiv4), None, rgb_cl.data, yuv_cl.data).wait()
-    yuv = np.resize(yuv_cl.get(), rgb.size // 2)
-    return yuv.data.tobytes()
+    return self.converter(rgb)
 
   def _send_yuv(self, yuv, frame_id, pub_type, yuv_type):
     eof = int(frame_id * 0.05 * 1e9)
@@ -98,3 +98,7 @@ class World(ABC):
   @abstractmethod
   def reset(self):
     pass
+
+  @abstractmethod
+  def wait_step(self) -> bool:
+    """For lockstep: blocks until the simulator stepped with the last controls, returns whether it rendered new camera images"""
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+import unittest
+import numpy as np
+
+from openpilot.tools.sim.lib.camerad import NumpyRGBToNV12, cl, OpenCLRGBToNV12
+
+
+def rgb_to_nv12_reference(bgr):
+  # straight transcription of the macros in rgb_to_nv12.cl
+  b, g, r = (bgr[..., i].astype(np.int32) for i in range(3))
+  y = ((13 * b + 65 * g + 33 * r + 64) >> 7) + 16
+
+  def average(c):
+    return (c[0::2, 0::2] + c[0::2, 1::2] + c[1::2, 0::2] + c[1::2, 1::2] + 1) >> 1
+
+  ab, ag, ar = average(b), average(g), average(r)
+  u = (56 * ab - 37 * ag - 19 * ar + 0x8080) >> 8
+  v = (56 * ar - 47 * ag - 9 * ab + 0x8080) >> 8
+  return np.concatenate([y.ravel(), np.stack([u, v], axis=-1).ravel()]).astype(np.uint8)
+
+
+class TestSimCamerad(unittest.TestCase):
+  def setUp(self):
+    self.rng = np.random.default_rng(0)
+
+  def _images(self, w, h):
+    yield np.zeros((h, w, 3), dtype=np.uint8)
+    yield np.full((h, w, 3), 255, dtype=np.uint8)
+    for _ in range(3):
+      yield self.rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+
+  def test_numpy_matches_kernel(self):
+    for w, h in [(8, 4), (64, 48), (1928, 1208)]:
+      conv = NumpyRGBToNV12(w, h)
+      for img in self._images(w, h):
+        np.testing.assert_array_equal(conv(img), rgb_to_nv12_reference(img))
+
+  def test_buffers_reused(self):
+    conv = NumpyRGBToNV12(64, 48)
+    imgs = list(self._images(64, 48))
+    self.assertIs(conv(imgs[0]), conv(imgs[1]))
+
+  @unittest.skipIf(cl is None, "pyopencl not installed")
+  def test_opencl_matches_numpy(self):
+    w, h = 1928, 1208
+    try:
+      cl_conv = OpenCLRGBToNV12(w, h)
+    except cl.Error as e:
+      raise unittest.SkipTest(f"no OpenCL device: {e}") from e
+    np_conv = NumpyRGBToNV12(w, h)
+    for img in self._images(w, h):
+      np.testing.assert_array_equal(cl_conv(img), np_conv(img))
+
+
+if __name__ == "__main__":
+  unittest.main()
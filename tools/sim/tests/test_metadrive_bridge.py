@@ -11,5 +11,11 @@ class TestMetaDriveBridge(TestSimBridgeBase):
     return MetaDriveBridge(False, False)
 
 
+@pytest.mark.slow
+class TestMetaDriveBridgeLockstep(TestSimBridgeBase):
+  def create_bridge(self):
+    return MetaDriveBridge(False, False, lockstep=True)
+
+
 if __name__ == "__main__":
   unittest.main()